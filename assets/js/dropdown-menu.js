@@ -106,6 +106,26 @@
 
       $toggleLink.addClass('active')
       $dropdown.find('.dropdown-list').scrollTop(0)
+
+      loadLazyList()
+    }
+
+    // The items of some dropdowns are only loaded the first time they are opened
+    function loadLazyList() {
+      const url = $dropdown.attr('data-lazy-url')
+      if (!url || $dropdown.data('lazy-loaded')) {
+        return
+      }
+      $dropdown.data('lazy-loaded', true)
+
+      $.get(url)
+        .done(function(html) {
+          $dropdown.find('.dropdown-list').html(html)
+        })
+        .fail(function() {
+          // Try again the next time the dropdown is opened
+          $dropdown.data('lazy-loaded', false)
+        })
     }
 
     function cancelClosingTimer() {
@@ -0,0 +1,9 @@
+"""Benchmarks of the hot paths of the site (markdown rendering, content loading and publication, search indexing,
+forum pages).
+
+They run offline, on a test database filled with datasets of fixed sizes, with stand-ins of the zmarkdown server and
+of Elasticsearch (see ``benchmarks.stubs``). For each benchmark, the wall time, the number of SQL queries and the
+peak of memory are printed as JSON, so that two runs can be compared::
+
+    python -m benchmarks --size small --repeat 5 --output before.json
+"""
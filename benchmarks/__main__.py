@@ -0,0 +1,141 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import traceback
+import tracemalloc
+from datetime import datetime
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(prepared, repeat):
+    """Run a benchmark ``repeat`` times, then once more to get the peak of memory (which slows it down).
+
+    :param prepared: the operation to measure, or a tuple of an operation to run before each measure and of the
+                     operation to measure
+    :param repeat: number of measures
+    :type repeat: int
+    :rtype: dict
+    """
+
+    from benchmarks.stubs import FakeTransport, FakeZmdServer
+    from zds.utils.profiling import profile_block
+
+    setup, run = prepared if isinstance(prepared, tuple) else (None, prepared)
+
+    profiles = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        es_requests_count = FakeTransport.requests_count
+        zmd_requests_count = FakeZmdServer.requests_count
+        with profile_block() as profile:
+            run()
+        profiles.append(profile)
+    es_calls = FakeTransport.requests_count - es_requests_count
+    zmd_calls = FakeZmdServer.requests_count - zmd_requests_count
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = [profile.duration for profile in profiles]
+    return {
+        "repeat": repeat,
+        "wall_time": {
+            "min": min(durations),
+            "median": statistics.median(durations),
+            "mean": statistics.mean(durations),
+            "max": max(durations),
+        },
+        "queries": profiles[-1].queries,
+        "duplicated_queries": profiles[-1].duplicates,
+        "db_time": statistics.median(profile.db_time for profile in profiles),
+        "zmd_calls": zmd_calls,
+        "es_calls": es_calls,
+        "peak_memory": peak_memory,
+    }
+
+
+def main():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "zds.settings.benchmarks")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import get_runner, setup_test_environment
+
+    from benchmarks.cases import BENCHMARKS
+    from benchmarks.datasets import Dataset, SIZES
+    from benchmarks.stubs import FakeZmdServer
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the hot paths of the site.")
+    parser.add_argument("--size", choices=SIZES, default="small", help="Size of the datasets.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measures of each benchmark.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, metavar="NAME", help="Benchmarks to run.")
+    parser.add_argument("--output", help="File to write the results in (instead of the standard output).")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    runner = get_runner(settings)(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+
+    results = []
+    try:
+        # the code under measure may print its progress: keep the standard output for the results
+        with FakeZmdServer() as zmd_server, contextlib.redirect_stdout(sys.stderr):
+            settings.ZDS_APP["zmd"]["server"] = zmd_server.url
+            dataset = Dataset(args.size)
+            for name in args.only or BENCHMARKS:
+                print(f"Running {name}...", file=sys.stderr)
+                try:
+                    results.append(dict(name=name, **measure(BENCHMARKS[name](dataset), args.repeat)))
+                except Exception as e:
+                    traceback.print_exc()
+                    results.append({"name": name, "error": repr(e)})
+    finally:
+        runner.teardown_databases(old_config)
+        shutil.rmtree(getattr(settings, "BENCHMARKS_DIR", ""), ignore_errors=True)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "commit": get_commit(),
+            "size": args.size,
+            "dataset": SIZES[args.size],
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
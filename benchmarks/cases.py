@@ -0,0 +1,106 @@
+"""The measured hot paths.
+
+Each benchmark prepares what it needs from the dataset, and returns the operation to measure, and optionally an
+operation to run (without being measured) before each measure.
+"""
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+
+from benchmarks.stubs import setup_fake_es_connection
+from zds.forum.models import Post, Topic
+from zds.searchv2.models import ESIndexManager
+from zds.tutorialv2.models.database import PublishableContent, PublishedContent
+from zds.tutorialv2.publication_utils import publish_content
+from zds.utils.templatetags.emarkdown import render_markdown
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(prepare):
+        BENCHMARKS[name] = prepare
+        return prepare
+
+    return decorator
+
+
+@benchmark("render_markdown")
+def render_markdown_benchmark(dataset):
+    texts = dataset.texts
+
+    def run():
+        for text in texts:
+            render_markdown(text)
+
+    return run
+
+
+@benchmark("load_version")
+def load_version_benchmark(dataset):
+    content = dataset.content
+
+    def run():
+        content.load_version()
+
+    return run
+
+
+@benchmark("publish_content")
+def publish_content_benchmark(dataset):
+    content = dataset.content
+
+    def run():
+        db_object = PublishableContent.objects.get(pk=content.pk)
+        publish_content(db_object, db_object.load_version(), is_major_update=True)
+
+    return run
+
+
+@benchmark("TopicPostsListView")
+def topic_posts_list_view_benchmark(dataset):
+    topic = dataset.topic
+    client = Client()
+    client.force_login(dataset.reader.user)
+    last_page = (dataset.counts["posts"] - 1) // settings.ZDS_APP["forum"]["posts_per_page"] + 1
+
+    def run():
+        for page in (1, last_page):
+            response = client.get(topic.get_absolute_url(), {"page": page})
+            assert response.status_code == 200, response.status_code
+
+    return run
+
+
+def es_bulk_indexing_benchmark(model, get_dataset_object):
+    def prepare(dataset):
+        get_dataset_object(dataset)
+        with override_settings(ES_ENABLED=True):
+            manager = ESIndexManager("zds_benchmarks", connection_alias=setup_fake_es_connection())
+
+        def setup():
+            model.objects.update(es_flagged=True)
+
+        def run():
+            manager.es_bulk_indexing_of_model(model)
+
+        return setup, run
+
+    return prepare
+
+
+def _published_content(dataset):
+    content = dataset.content
+    if content.public_version is None:
+        content.public_version = publish_content(content, content.load_version(), is_major_update=True)
+        content.sha_public = content.sha_draft
+        content.save()
+    return content
+
+
+benchmark("es_bulk_indexing_of_model[Topic]")(es_bulk_indexing_benchmark(Topic, lambda dataset: dataset.topic))
+benchmark("es_bulk_indexing_of_model[Post]")(es_bulk_indexing_benchmark(Post, lambda dataset: dataset.topic))
+benchmark("es_bulk_indexing_of_model[PublishedContent]")(
+    es_bulk_indexing_benchmark(PublishedContent, _published_content)
+)
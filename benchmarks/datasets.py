@@ -0,0 +1,70 @@
+"""Generation of the datasets measured by the benchmarks. Their sizes are fixed, so that two runs can be compared."""
+
+from django.utils.functional import cached_property
+
+from zds.forum.tests.factories import create_category_and_forum, create_topic_in_forum, PostFactory
+from zds.member.tests.factories import ProfileFactory
+from zds.tutorialv2.tests.factories import ContainerFactory, ExtractFactory, PublishableContentFactory
+
+SIZES = {
+    "small": {"posts": 100, "chapters": 3, "extracts": 3, "texts": 50},
+    "medium": {"posts": 1000, "chapters": 10, "extracts": 5, "texts": 500},
+    "large": {"posts": 5000, "chapters": 20, "extracts": 10, "texts": 2000},
+}
+
+TEXT = (
+    "Un **paragraphe** avec du `code`, un [lien](https://zestedesavoir.com) et une mention de @{username}.\n\n"
+    "- une liste\n- de plusieurs éléments\n\n"
+    "```python\nprint('Bonjour {number} !')\n```\n"
+)
+
+
+def make_text(number, username="admin"):
+    return TEXT.format(number=number, username=username)
+
+
+class Dataset:
+    """The objects of a given size, created when a benchmark first needs them."""
+
+    def __init__(self, size):
+        self.size = size
+        self.counts = SIZES[size]
+
+    @cached_property
+    def author(self):
+        return ProfileFactory()
+
+    @cached_property
+    def reader(self):
+        return ProfileFactory()
+
+    @cached_property
+    def topic(self):
+        """A topic with ``posts`` posts, written by ten members."""
+
+        _, forum = create_category_and_forum()
+        authors = [self.author] + [ProfileFactory() for _ in range(9)]
+        topic = create_topic_in_forum(forum, self.author)
+        for position in range(2, self.counts["posts"] + 1):
+            author = authors[position % len(authors)]
+            text = make_text(position, author.user.username)
+            PostFactory(topic=topic, author=author.user, position=position, text=text, text_html=text)
+        return topic
+
+    @cached_property
+    def texts(self):
+        return [make_text(number) for number in range(self.counts["texts"])]
+
+    @cached_property
+    def content(self):
+        """A tutorial with ``chapters`` chapters of ``extracts`` extracts each."""
+
+        content = PublishableContentFactory(type="TUTORIAL", author_list=[self.author.user])
+        versioned = content.load_version()
+        for chapter_number in range(self.counts["chapters"]):
+            chapter = ContainerFactory(parent=versioned, db_object=content)
+            for extract_number in range(self.counts["extracts"]):
+                text = "\n\n".join(make_text(f"{chapter_number}.{extract_number}.{i}") for i in range(5))
+                ExtractFactory(container=chapter, db_object=content, text_content=text)
+        content.refresh_from_db()
+        return content
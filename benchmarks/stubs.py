@@ -0,0 +1,128 @@
+"""Stand-ins of the zmarkdown server and of Elasticsearch, so that the benchmarks run offline and only measure the
+code of the site.
+"""
+
+import html
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from elasticsearch import Transport
+from elasticsearch_dsl.connections import connections
+
+PING = re.compile(r"@\*\*(.+?)\*\*|@(\w+)")
+_requests_lock = threading.Lock()
+
+
+def _render(node, stats):
+    """Render a markdown text, or the texts of a manifest, as the zmarkdown server would (roughly)."""
+
+    if isinstance(node, str):
+        stats["signs"] += len(node)
+        stats["pings"].extend(first or second for first, second in PING.findall(node))
+        return "<p>" + html.escape(node) + "</p>" if node else ""
+
+    rendered = {}
+    for key, value in node.items():
+        if key in ("introduction", "conclusion", "text") and isinstance(value, str):
+            rendered[key] = _render(value, stats)
+        elif key == "children":
+            rendered[key] = [_render(child, stats) for child in value]
+        else:
+            rendered[key] = value
+    return rendered
+
+
+class _ZmdHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        with _requests_lock:
+            FakeZmdServer.requests_count += 1
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        stats = {"signs": 0, "pings": []}
+        content = _render(payload.get("md", ""), stats)
+        if self.path.startswith("/latex"):
+            content = "\\documentclass{article}\\begin{document}\\end{document}"
+
+        body = json.dumps([content, {"stats": {"signs": stats["signs"]}, "ping": stats["pings"]}, []]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeZmdServer:
+    """A zmarkdown server, which wraps the texts in paragraphs (and counts their signs and pings), listening on a
+    free local port.
+    """
+
+    # like ``FakeTransport.requests_count``, this also counts the requests made from other threads
+    requests_count = 0
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ZmdHandler)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeTransport(Transport):
+    """Transport of an in-process Elasticsearch: the indexed documents are kept in ``documents``, every index exists
+    and the searches find nothing.
+    """
+
+    documents = {}
+    # unlike the calls recorded by ``zds.utils.profiling``, this also counts the requests made from other threads
+    # (like the ones of ``elasticsearch.helpers.parallel_bulk()``)
+    requests_count = 0
+
+    def perform_request(self, method, url, params=None, body=None):
+        with _requests_lock:
+            FakeTransport.requests_count += 1
+        if method == "HEAD":
+            return True
+        if url.endswith("/_bulk"):
+            return self._bulk(body)
+        if url.endswith("/_search"):
+            return {"took": 0, "timed_out": False, "hits": {"total": 0, "max_score": None, "hits": []}}
+        return {"acknowledged": True}
+
+    def _bulk(self, body):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        lines = iter(line for line in body.split("\n") if line)
+
+        items = []
+        for line in lines:
+            action, meta = json.loads(line).popitem()
+            key = (meta.get("_index"), meta.get("_type"), str(meta.get("_id")))
+            if action == "delete":
+                self.documents.pop(key, None)
+            else:
+                self.documents[key] = json.loads(next(lines))
+            items.append({action: {"_index": key[0], "_type": key[1], "_id": key[2], "status": 200}})
+        return {"took": 0, "errors": False, "items": items}
+
+
+def setup_fake_es_connection(alias="benchmarks"):
+    """Create a connection to the in-process Elasticsearch.
+
+    :param alias: the alias of the connection
+    :type alias: str
+    :return: the alias
+    :rtype: str
+    """
+
+    FakeTransport.documents.clear()
+    connections.create_connection(alias, hosts=["localhost:9200"], transport_class=FakeTransport)
+    return alias
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from zds.forum.models import Forum, Post, Topic
+
+
+class Command(BaseCommand):
+    """
+    `python manage.py recount_forums`; compute again the number of posts of every topic, and the number of topics and
+    posts and the last post of every forum.
+
+    """
+
+    help = "Compute again the counters of the forums and topics"
+
+    def handle(self, *args, **options):
+        posts = Post.objects.filter(topic=OuterRef("pk")).order_by().values("topic").annotate(n=Count("pk")).values("n")
+        Topic.objects.update(post_count=Coalesce(Subquery(posts), 0))
+
+        for forum in Forum.objects.all():
+            old_counters = (forum.topic_count, forum.post_count, forum.last_post_id)
+            forum.recount()
+            if old_counters != (forum.topic_count, forum.post_count, forum.last_post_id):
+                self.stdout.write(f"Fixed the counters of « {forum.title} ».")
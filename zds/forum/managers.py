@@ -11,33 +11,26 @@ class ForumManager(models.Manager):
     Custom forum manager.
     """
 
-    def get_public_forums_of_category(self, category, with_count=False):
-        """load all public forums for a category
+    def get_public_forums_of_category(self, category):
+        """load all public forums for a category, with their last post
 
         :param category: the related category
         :type category: zds.forum.models.ForumCategory
-        :param with_count: optional parameter: if true, will preload thread and post number for each forum inside \
-        category
-        :type with_count: bool
         """
-        queryset = self.filter(category=category, groups__isnull=True).select_related("category").distinct()
-        if with_count:
-            # this request count the threads in each forum
-            thread_sub_query = "SELECT COUNT(*) FROM forum_topic WHERE forum_topic.forum_id=forum_forum.id"
-            # this request count the posts in each forum
-            post_sub_query = (
-                "SELECT COUNT(*) FROM forum_post WHERE forum_post.topic_id "
-                "IN(SELECT id FROM forum_topic WHERE forum_topic.forum_id=forum_forum.id)"
-            )
-
-            queryset = queryset.extra(select={"thread_count": thread_sub_query, "post_count": post_sub_query})
-        return queryset.all()
+        return (
+            self.filter(category=category, groups__isnull=True)
+            .select_related("category", "last_post__topic")
+            .distinct()
+            .all()
+        )
 
     def get_private_forums_of_category(self, category, user):
+        from zds.forum.models import get_readable_forum_pks
+
         return (
-            self.filter(category=category, groups__in=user.groups.all())
+            self.filter(category=category, groups__isnull=False, pk__in=get_readable_forum_pks(user))
             .order_by("position_in_category")
-            .select_related("category")
+            .select_related("category", "last_post__topic")
             .distinct()
             .all()
         )
@@ -54,10 +47,9 @@ class TopicManager(models.Manager):
         :param current_user:
         :return:
         """
-        if current_user.is_authenticated:
-            return Q(forum__groups__isnull=True) | Q(forum__groups__pk__in=current_user.profile.group_pks)
-        else:
-            return Q(forum__groups__isnull=True)
+        from zds.forum.models import get_readable_forum_pks
+
+        return Q(forum__pk__in=get_readable_forum_pks(current_user))
 
     def last_topics_of_a_member(self, author, user):
         """
@@ -121,9 +113,9 @@ class PostManager(InheritanceManager):
         :param current_user:
         :return:
         """
-        if current_user.is_authenticated:
-            return Q(topic__forum__groups__isnull=True) | Q(topic__forum__groups__pk__in=current_user.profile.group_pks)
-        return Q(topic__forum__groups__isnull=True)
+        from zds.forum.models import get_readable_forum_pks
+
+        return Q(topic__forum__pk__in=get_readable_forum_pks(current_user))
 
     def get_messages_of_a_topic(self, topic_pk):
         return (
@@ -191,8 +183,41 @@ class TopicReadManager(models.Manager):
 
         :param user: an authenticated user
         :param topic_sub_list: optional list of topics. If not ``None`` no subject out of this list will be selected
+            (and the topics of the list will know if they are read, see ``get_read_flags()``)
         :type topic_sub_list: list
         :return: the flat list of all topics primary key
         :rtype: list
         """
+        if topic_sub_list is not None:
+            return [pk for pk, is_read in self.get_read_flags(topic_sub_list, user).items() if is_read]
         return self.topic_read_by_user(user, topic_sub_list).values_list("topic__pk", flat=True)
+
+    def get_read_flags(self, topics, user):
+        """Check with a single query which topics the user has read (up to their last message). This is remembered by
+        the topics, so that ``Topic.is_read`` does not run a query for each of them afterwards.
+
+        :param topics: the topics
+        :type topics: list
+        :param user: the user
+        :return: whether each topic is read, by topic pk
+        :rtype: dict
+        """
+        topics = list(topics)
+        authenticated = user is not None and user.is_authenticated
+        read_posts = {}
+        if authenticated and topics:
+            for topic_pk, post_pk in self.filter(user=user, topic__in=[t.pk for t in topics]).values_list(
+                "topic_id", "post_id"
+            ):
+                read_posts.setdefault(topic_pk, set()).add(post_pk)
+
+        flags = {}
+        for topic in topics:
+            flags[topic.pk] = topic.last_message_id is not None and topic.last_message_id in read_posts.get(
+                topic.pk, ()
+            )
+            if authenticated:
+                if not hasattr(topic, "_is_read"):
+                    setattr(topic, "_is_read", {})
+                topic._is_read[user.username] = flags[topic.pk]
+        return flags
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.14 on 2026-10-18 08:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count(apps, schema_editor):
+    Forum = apps.get_model("forum", "Forum")
+    Topic = apps.get_model("forum", "Topic")
+    Post = apps.get_model("forum", "Post")
+
+    posts = Post.objects.filter(topic=OuterRef("pk")).order_by().values("topic").annotate(n=Count("pk")).values("n")
+    Topic.objects.update(post_count=Coalesce(Subquery(posts), 0))
+
+    topics = Topic.objects.filter(forum=OuterRef("pk")).order_by().values("forum")
+    last_posts = Post.objects.filter(topic__forum=OuterRef("pk")).order_by("-pubdate", "-pk").values("pk")[:1]
+    Forum.objects.update(
+        topic_count=Coalesce(Subquery(topics.annotate(n=Count("pk")).values("n")), 0),
+        post_count=Coalesce(Subquery(topics.annotate(n=Sum("post_count")).values("n")), 0),
+        last_post=Subquery(last_posts),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0023_allow_blank_solved_by_topic_field"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forum",
+            name="last_post",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="forum.post",
+                verbose_name="Dernier message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="forum",
+            name="post_count",
+            field=models.IntegerField(default=0, editable=False, verbose_name="Nombre de messages"),
+        ),
+        migrations.AddField(
+            model_name="forum",
+            name="topic_count",
+            field=models.IntegerField(default=0, editable=False, verbose_name="Nombre de sujets"),
+        ),
+        migrations.AddField(
+            model_name="topic",
+            name="post_count",
+            field=models.IntegerField(default=0, editable=False, verbose_name="Nombre de messages"),
+        ),
+        migrations.RunPython(count, migrations.RunPython.noop),
+    ]
@@ -1,23 +1,45 @@
 import logging
 from datetime import datetime, timedelta
 from math import ceil
+from uuid import uuid4
 
 from django.conf import settings
-from django.contrib.auth.models import Group, User, AnonymousUser
+from django.core.cache import cache
+from django.contrib.auth.models import Group, User
 from django.urls import reverse
 from django.db import models
+from django.db.models import F, Q
 from django.dispatch import receiver
-from django.db.models.signals import pre_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 
 from elasticsearch_dsl.field import Text, Keyword, Integer, Boolean, Float, Date
 
 from zds.forum.managers import TopicManager, ForumManager, PostManager, TopicReadManager
 from zds.forum import signals
-from zds.searchv2.models import AbstractESDjangoIndexable, delete_document_in_elasticsearch, ESIndexManager
+from zds.searchv2.models import (
+    AbstractESDjangoIndexable,
+    delete_document_in_elasticsearch,
+    update_document_in_elasticsearch,
+)
 from zds.utils import get_current_user, old_slugify
 from zds.utils.models import Comment, Tag
 
 
+def save_without_counters(instance, kwargs):
+    """Prevent ``save()`` from overwriting the denormalized counters of an existing object, as they are updated by
+    queries and the object may be stale.
+
+    :param instance: the object being saved
+    :param kwargs: the keyword arguments of ``save()``, updated in place
+    """
+    if not instance._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+        kwargs["update_fields"] = [
+            field.name
+            for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in instance.counter_fields
+        ]
+
+
 def sub_tag(tag):
     start = tag.group("start")
     end = tag.group("end")
@@ -56,17 +78,15 @@ class ForumCategory(models.Model):
     def get_absolute_url(self):
         return reverse("forum:cat-forums-list", kwargs={"slug": self.slug})
 
-    def get_forums(self, user, with_count=False):
+    def get_forums(self, user):
         """get all forums that user can access
 
         :param user: the related user
         :type user: User
-        :param with_count: If true will preload thread and post number for each forum of this category
-        :type with_count: bool
         :return: All forums in category, ordered by forum's position in category
         :rtype: list[Forum]
         """
-        forums_pub = Forum.objects.get_public_forums_of_category(self, with_count=with_count)
+        forums_pub = Forum.objects.get_public_forums_of_category(self)
         if user is not None and user.is_authenticated:
             forums_private = Forum.objects.get_private_forums_of_category(self, user)
             return list(forums_pub | forums_private)
@@ -94,6 +114,21 @@ class Forum(models.Model):
     position_in_category = models.IntegerField("Position dans la catégorie", null=True, blank=True, db_index=True)
 
     slug = models.SlugField(max_length=80, unique=True)
+
+    # Denormalized counters, updated when the topics and posts of the forum change (see ``recount()``).
+    topic_count = models.IntegerField("Nombre de sujets", default=0, editable=False)
+    post_count = models.IntegerField("Nombre de messages", default=0, editable=False)
+    last_post = models.ForeignKey(
+        "Post",
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Dernier message",
+        on_delete=models.SET_NULL,
+    )
+    counter_fields = ("topic_count", "post_count", "last_post")
+
     _nb_group = None
     objects = ForumManager()
 
@@ -104,37 +139,39 @@ class Forum(models.Model):
         return reverse("forum:topics-list", kwargs={"cat_slug": self.category.slug, "forum_slug": self.slug})
 
     def get_topic_count(self):
-        """Retrieve or aggregate the number of threads in this forum. If this number already exists, it must be stored \
-        in thread_count. Otherwise it will process a SQL query.
-
+        """
         :return: the number of threads in the forum.
         """
-        try:
-            return self.thread_count
-        except AttributeError:
-            return Topic.objects.filter(forum=self).count()
+        return self.topic_count
 
     def get_post_count(self):
-        """Retrieve or aggregate the number of posts in this forum. If this number already exists, it must be stored \
-        in post_count. Otherwise it will process a SQL query.
-
+        """
         :return: the number of posts for a forum.
         """
-        try:
-            return self.post_count
-        except AttributeError:
-            return Post.objects.filter(topic__forum=self).count()
+        return self.post_count
 
     def get_last_message(self):
         """
         :return: the last message on the forum, if there are any.
         """
-        try:
-            last_post = Post.objects.select_related("topic").filter(topic__forum=self).order_by("-pubdate").all()[0]
+        last_post = self.last_post
+        if last_post is not None:
             last_post.topic.forum = self
-            return last_post
-        except IndexError:
-            return None
+        return last_post
+
+    def recount(self):
+        """Compute again the counters of the forum, in case they drifted or when topics are moved."""
+        posts = Post.objects.filter(topic__forum=self)
+        self.topic_count = Topic.objects.filter(forum=self).count()
+        self.post_count = posts.count()
+        self.last_post = posts.order_by("-pubdate", "-pk").first()
+        Forum.objects.filter(pk=self.pk).update(
+            topic_count=self.topic_count, post_count=self.post_count, last_post=self.last_post
+        )
+
+    def save(self, *args, **kwargs):
+        save_without_counters(self, kwargs)
+        return super().save(*args, **kwargs)
 
     def can_read(self, user):
         """
@@ -142,19 +179,24 @@ class Forum(models.Model):
         The forum can be read if:
         - The forum has no access restriction (= no group), or
         - the user is in our database and is part of the restricted group which is needed to access this forum
+        (see ``get_readable_forum_pks()``)
         :param user: the user to check the rights
         :return: `True` if the user can read this forum, `False` otherwise.
         """
 
+        return self.pk in get_readable_forum_pks(user)
+
+    def filter_readable_by(self, queryset, user_field):
+        """
+        Filters a queryset to only keep the objects whose user can read current forum (see ``can_read()``), without
+        checking each user separately.
+        :param queryset: the queryset to filter
+        :param user_field: the name of the field of the objects of ``queryset`` pointing to the user
+        :return: the filtered queryset
+        """
         if not self.has_group:
-            return True
-        else:
-            # authentication is the best way to be sure groups are available in the user object
-            if user is not None:
-                groups = list(user.groups.all()) if not isinstance(user, AnonymousUser) else []
-                return Forum.objects.filter(groups__in=groups, pk=self.pk).exists()
-            else:
-                return False
+            return queryset
+        return queryset.filter(**{f"{user_field}__groups__in": self.groups.all()}).distinct()
 
     @property
     def has_group(self):
@@ -216,6 +258,10 @@ class Topic(AbstractESDjangoIndexable):
 
     tags = models.ManyToManyField(Tag, verbose_name="Tags du forum", blank=True, db_index=True)
 
+    # Denormalized counter, updated when posts are created or deleted.
+    post_count = models.IntegerField("Nombre de messages", default=0, editable=False)
+    counter_fields = ("post_count",)
+
     objects = TopicManager()
     _first_post = None
 
@@ -256,7 +302,7 @@ class Topic(AbstractESDjangoIndexable):
         """
         :return: the number of posts in the topic.
         """
-        return Post.objects.filter(topic__pk=self.pk).count()
+        return self.post_count
 
     def get_last_post(self):
         """
@@ -470,14 +516,41 @@ class Topic(AbstractESDjangoIndexable):
     def save(self, *args, **kwargs):
         """Overridden to handle the displacement of the topic to another forum"""
 
+        save_without_counters(self, kwargs)
         try:
             old_self = Topic.objects.get(pk=self.pk)
         except Topic.DoesNotExist:
-            pass
-        else:
-            if old_self.forum.pk != self.forum.pk or old_self.title != self.title:
-                Post.objects.filter(topic__pk=self.pk).update(es_flagged=True)
-        return super().save(*args, **kwargs)
+            result = super().save(*args, **kwargs)
+            update_topic_lists_version(self.forum_id)
+            return result
+
+        if old_self.forum.pk != self.forum.pk or old_self.title != self.title:
+            Post.objects.filter(topic__pk=self.pk).update(es_flagged=True)
+        result = super().save(*args, **kwargs)
+        if old_self.forum.pk != self.forum.pk:
+            old_self.forum.recount()
+            self.forum.recount()
+        # the fields deciding the place of the topic in the (filtered) lists of topics of its forum
+        if any(
+            getattr(old_self, field) != getattr(self, field)
+            for field in ("forum_id", "last_message_id", "is_sticky", "solved_by_id")
+        ):
+            update_topic_lists_version(old_self.forum_id, self.forum_id)
+        return result
+
+
+@receiver(post_save, sender=Topic)
+def count_new_topic(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Forum.objects.filter(pk=instance.forum_id).update(topic_count=F("topic_count") + 1)
+
+
+@receiver(post_delete, sender=Topic)
+def count_deleted_topic(sender, instance, **kwargs):
+    # the posts of the topic are deleted (and counted, see ``count_deleted_post()``) before it, while it still
+    # belonged to the forum: the counters are computed again once everything is deleted
+    for forum in Forum.objects.filter(pk=instance.forum_id):
+        forum.recount()
 
 
 @receiver(pre_delete, sender=Topic)
@@ -486,6 +559,88 @@ def delete_topic_in_elasticsearch(sender, instance, **kwargs):
     return delete_document_in_elasticsearch(instance)
 
 
+TOPIC_LISTS_VERSION_KEY = "forum_topic_lists_version_{}"
+
+
+def get_topic_lists_version(forum_pk):
+    """Get a value changing each time the order of the lists of topics of a forum may have changed (a topic is
+    created, answered, moved, deleted...)."""
+    version = cache.get(TOPIC_LISTS_VERSION_KEY.format(forum_pk))
+    if version is None:
+        version = update_topic_lists_version(forum_pk)
+    return version
+
+
+def update_topic_lists_version(*forum_pks):
+    version = uuid4().hex
+    cache.set_many({TOPIC_LISTS_VERSION_KEY.format(forum_pk): version for forum_pk in forum_pks}, None)
+    return version
+
+
+@receiver(post_delete, sender=Topic)
+def update_topic_lists_version_on_topic_deletion(sender, instance, **kwargs):
+    update_topic_lists_version(instance.forum_id)
+
+
+FORUM_PERMISSIONS_VERSION_KEY = "forum_permissions_version"
+
+
+def get_forum_permissions_version():
+    """Get a value changing each time the groups of a forum or of a user change, so that the cached permissions
+    (see ``get_readable_forum_pks()``) are not used anymore."""
+    version = cache.get(FORUM_PERMISSIONS_VERSION_KEY)
+    if version is None:
+        version = update_forum_permissions_version()
+    return version
+
+
+@receiver(post_save, sender=Forum)
+@receiver(post_delete, sender=Forum)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=Forum.groups.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def update_forum_permissions_version(*args, **kwargs):
+    version = uuid4().hex
+    cache.set(FORUM_PERMISSIONS_VERSION_KEY, version, None)
+    return version
+
+
+def get_readable_forum_pks(user):
+    """Get the primary keys of the forums a user can read: the public forums and the ones restricted to one of their
+    groups. The forums readable by each set of groups (and the groups of each user) are cached until a group changes,
+    and the result is remembered by the user object for the rest of the request.
+
+    :param user: the user (may be anonymous or ``None``)
+    :return: the primary keys of the readable forums
+    :rtype: frozenset
+    """
+    version = get_forum_permissions_version()
+    remembered = getattr(user, "_readable_forum_pks", None)
+    if remembered is not None and remembered[0] == version:
+        return remembered[1]
+
+    timeout = settings.ZDS_APP["forum"]["permissions_timeout"]
+    group_pks = []
+    if user is not None and user.is_authenticated:
+        groups_key = f"forum_permissions_{version}_user_{user.pk}_{user.date_joined.timestamp()}"
+        group_pks = cache.get(groups_key)
+        if group_pks is None:
+            group_pks = sorted(user.groups.values_list("pk", flat=True))
+            cache.set(groups_key, group_pks, timeout)
+
+    forums_key = "forum_permissions_{}_groups_{}".format(version, "-".join(str(pk) for pk in group_pks))
+    forum_pks = cache.get(forums_key)
+    if forum_pks is None:
+        forum_pks = frozenset(
+            Forum.objects.filter(Q(groups__isnull=True) | Q(groups__in=group_pks)).values_list("pk", flat=True)
+        )
+        cache.set(forums_key, forum_pks, timeout)
+
+    if user is not None:
+        user._readable_forum_pks = (version, forum_pks)
+    return forum_pks
+
+
 class Post(Comment, AbstractESDjangoIndexable):
     """
     A forum post written by a user.
@@ -567,12 +722,11 @@ class Post(Comment, AbstractESDjangoIndexable):
         return data
 
     def hide_comment_by_user(self, user, text_hidden):
-        """Overridden to directly hide the post in ES as well"""
+        """Overridden to hide the post in ES as well, as soon as possible"""
 
         super().hide_comment_by_user(user, text_hidden)
 
-        index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
-        index_manager.update_single_document(self, {"is_visible": False})
+        update_document_in_elasticsearch(self, {"is_visible": False})
 
 
 @receiver(pre_delete, sender=Post)
@@ -581,6 +735,28 @@ def delete_post_in_elasticsearch(sender, instance, **kwargs):
     return delete_document_in_elasticsearch(instance)
 
 
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Topic.objects.filter(pk=instance.topic_id).update(post_count=F("post_count") + 1)
+        Forum.objects.filter(topic=instance.topic_id).update(post_count=F("post_count") + 1, last_post=instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    Topic.objects.filter(pk=instance.topic_id).update(post_count=F("post_count") - 1)
+    Forum.objects.filter(topic=instance.topic_id).update(post_count=F("post_count") - 1)
+    # the last post of the forum was unset if it is the deleted one
+    for forum in Forum.objects.filter(topic=instance.topic_id, last_post__isnull=True):
+        forum.recount()
+
+
+@receiver(post_delete, sender=Post)
+def update_topic_lists_version_on_post_deletion(sender, instance, **kwargs):
+    # the last message of the topic was unset if it is the deleted post
+    update_topic_lists_version(*Topic.objects.filter(pk=instance.topic_id).values_list("forum_id", flat=True))
+
+
 class TopicRead(models.Model):
     """
     This model tracks the last post read in a topic by a user.
@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta
+from io import StringIO
 
 from django.conf import settings
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import AnonymousUser, Group, User
 from django.core import mail
+from django.core.management import call_command
 from django.urls import reverse
 from django.test import TestCase
 
 from zds.forum.commons import PostEditMixin
 from zds.forum.tests.factories import ForumCategoryFactory, ForumFactory, TopicFactory, PostFactory, TagFactory
-from zds.forum.models import Forum, TopicRead, Post, Topic
+from zds.forum.models import Forum, TopicRead, Post, Topic, get_readable_forum_pks
 from zds.member.tests.factories import ProfileFactory, StaffProfileFactory
 from zds.notification.models import TopicAnswerSubscription
 from zds.utils import old_slugify
@@ -1210,6 +1212,120 @@ class ManagerTests(TestCase):
         self.assertTrue(topic.is_read_by_user(self.staff.user, check_auth=False))
         self.assertFalse(topic.is_read_by_user(reader.user, check_auth=False))
 
+    def test_get_read_flags(self):
+        read_topic = TopicFactory(author=self.staff.user, forum=self.forum1)
+        PostFactory(topic=read_topic, position=1, author=self.staff.user)
+        unread_topic = TopicFactory(author=self.staff.user, forum=self.forum1)
+        first_post = PostFactory(topic=unread_topic, position=1, author=self.staff.user)
+        PostFactory(topic=unread_topic, position=2, author=self.staff.user)
+        TopicRead(post=read_topic.last_message, user=self.staff.user, topic=read_topic).save()
+        TopicRead(post=first_post, user=self.staff.user, topic=unread_topic).save()
+
+        topics = list(Topic.objects.filter(pk__in=[read_topic.pk, unread_topic.pk]))
+        with self.assertNumQueries(1):
+            flags = TopicRead.objects.get_read_flags(topics, self.staff.user)
+        self.assertEqual({read_topic.pk: True, unread_topic.pk: False}, flags)
+
+        # the topics now know if they are read
+        with self.assertNumQueries(0):
+            for topic in topics:
+                self.assertEqual(flags[topic.pk], topic.is_read_by_user(self.staff.user))
+
+    def test_readable_forums(self):
+        member = ProfileFactory()
+        public_forums = {self.forum1.pk, self.forum2.pk}
+        self.assertEqual(public_forums, get_readable_forum_pks(AnonymousUser()))
+        self.assertEqual(public_forums, get_readable_forum_pks(member.user))
+        self.assertEqual(public_forums | {self.forum3.pk}, get_readable_forum_pks(self.staff.user))
+
+        # the permissions are cached, then remembered by the user
+        staff_user = User.objects.get(pk=self.staff.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.forum3.can_read(staff_user))
+            self.assertFalse(self.forum3.can_read(member.user))
+            self.assertTrue(self.forum1.can_read(None))
+
+        # but forgotten when the groups change
+        group = Group.objects.create(name="readers")
+        member.user.groups.add(group)
+        self.assertFalse(self.forum3.can_read(member.user))
+        self.forum3.groups.add(group)
+        self.assertTrue(self.forum3.can_read(member.user))
+        self.forum3.groups.remove(group)
+        self.assertFalse(self.forum3.can_read(member.user))
+        self.forum3.groups.add(group)
+        member.user.groups.remove(group)
+        self.assertFalse(self.forum3.can_read(member.user))
+
+    def test_counters(self):
+        topic = TopicFactory(forum=self.forum1, author=self.staff.user)
+        PostFactory(topic=topic, position=1, author=self.staff.user)
+        last_post = PostFactory(topic=topic, position=2, author=self.staff.user)
+
+        forum = Forum.objects.get(pk=self.forum1.pk)
+        self.assertEqual(2, forum.get_topic_count())
+        self.assertEqual(2, forum.get_post_count())
+        self.assertEqual(last_post, forum.get_last_message())
+        self.assertEqual(2, Topic.objects.get(pk=topic.pk).get_post_count())
+
+        # saving a stale instance does not reset the counters
+        self.forum1.save()
+        self.assertEqual(2, Forum.objects.get(pk=self.forum1.pk).get_post_count())
+
+        # moving a topic
+        topic = Topic.objects.get(pk=topic.pk)
+        topic.forum = self.forum2
+        topic.save()
+        forum1, forum2 = Forum.objects.get(pk=self.forum1.pk), Forum.objects.get(pk=self.forum2.pk)
+        self.assertEqual((1, 0, None), (forum1.topic_count, forum1.post_count, forum1.last_post))
+        self.assertEqual((2, 2, last_post), (forum2.topic_count, forum2.post_count, forum2.last_post))
+
+        # deleting a post, then the topic
+        last_post.delete()
+        forum2 = Forum.objects.get(pk=self.forum2.pk)
+        self.assertEqual(1, forum2.post_count)
+        self.assertEqual(1, Topic.objects.get(pk=topic.pk).post_count)
+        self.assertEqual(topic.first_post(), forum2.last_post)
+        topic.delete()
+        forum2 = Forum.objects.get(pk=self.forum2.pk)
+        self.assertEqual((1, 0, None), (forum2.topic_count, forum2.post_count, forum2.last_post))
+
+    def test_counters_on_topic_deletion(self):
+        other_topic = TopicFactory(forum=self.forum1, author=self.staff.user)
+        other_post = PostFactory(topic=other_topic, position=1, author=self.staff.user)
+        topic = TopicFactory(forum=self.forum1, author=self.staff.user)
+        for position in range(1, 6):
+            last_post = PostFactory(topic=topic, position=position, author=self.staff.user)
+        forum = Forum.objects.get(pk=self.forum1.pk)
+        topic_count = forum.topic_count
+        self.assertEqual(6, forum.post_count)
+        self.assertEqual(last_post, forum.last_post)
+
+        # the topic holds the last post of the forum
+        topic.delete()
+        forum = Forum.objects.get(pk=self.forum1.pk)
+        self.assertEqual((topic_count - 1, 1, other_post), (forum.topic_count, forum.post_count, forum.last_post))
+
+        # the topic does not hold the last post of the forum
+        topic = TopicFactory(forum=self.forum1, author=self.staff.user)
+        PostFactory(topic=topic, position=1, author=self.staff.user)
+        PostFactory(topic=topic, position=2, author=self.staff.user)
+        last_post = PostFactory(topic=other_topic, position=2, author=self.staff.user)
+        topic.delete()
+        forum = Forum.objects.get(pk=self.forum1.pk)
+        self.assertEqual((topic_count - 1, 2, last_post), (forum.topic_count, forum.post_count, forum.last_post))
+
+    def test_recount_forums(self):
+        topic = TopicFactory(forum=self.forum1, author=self.staff.user)
+        post = PostFactory(topic=topic, position=1, author=self.staff.user)
+        Forum.objects.update(topic_count=0, post_count=0, last_post=None)
+        Topic.objects.update(post_count=0)
+
+        call_command("recount_forums", stdout=StringIO())
+        forum = Forum.objects.get(pk=self.forum1.pk)
+        self.assertEqual((2, 1, post), (forum.topic_count, forum.post_count, forum.last_post))
+        self.assertEqual(1, Topic.objects.get(pk=topic.pk).post_count)
+
 
 class TestMixins(TestCase):
     def test_double_unread_is_handled(self):
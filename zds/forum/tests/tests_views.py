@@ -1,13 +1,14 @@
 from datetime import datetime
 from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import Group
 from django.urls import reverse
 from django.test import TestCase
 
 from zds.forum.tests.factories import create_category_and_forum, create_topic_in_forum
 from zds.forum.tests.factories import PostFactory, TagFactory
-from zds.forum.models import Topic, Post
+from zds.forum.models import Topic, Post, get_topic_lists_version
 from zds.notification.models import TopicAnswerSubscription
 from zds.member.tests.factories import ProfileFactory, StaffProfileFactory
 from zds.utils.models import CommentEdit, Hat
@@ -225,6 +226,64 @@ class ForumTopicsListViewTest(TestCase):
         self.assertEqual(forum, response.context["forum"])
         self.assertEqual(2, len(response.context["topics"]))
 
+    def test_success_list_topics_of_a_deep_page(self):
+        profile = ProfileFactory()
+        category, forum = create_category_and_forum()
+        per_page = settings.ZDS_APP["forum"]["topics_per_page"]
+        for _ in range(per_page * 2 + 2):
+            create_topic_in_forum(forum, profile)
+        topics = list(Topic.objects.filter(forum=forum).order_by("-last_message__pubdate", "-pk"))
+        url = reverse("forum:topics-list", args=[category.slug, forum.slug])
+
+        for page in (3, 2, 3):
+            response = self.client.get(f"{url}?page={page}")
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(topics[(page - 1) * per_page : page * per_page], response.context["topics"])
+
+        # answering a topic moves it to the first page
+        PostFactory(topic=topics[-1], author=profile.user, position=2)
+        response = self.client.get(f"{url}?page=3")
+        self.assertEqual(topics[per_page * 2 - 1 : -1], response.context["topics"])
+
+    def test_success_list_topics_without_last_message(self):
+        profile = ProfileFactory()
+        category, forum = create_category_and_forum()
+        per_page = settings.ZDS_APP["forum"]["topics_per_page"]
+        topics = [create_topic_in_forum(forum, profile) for _ in range(per_page * 2 + 2)]
+        # e.g. when the last message of a topic was deleted
+        Topic.objects.filter(pk__in=[topic.pk for topic in topics[per_page - 2 : per_page + 2]]).update(
+            last_message=None
+        )
+        with_last_message = list(
+            Topic.objects.filter(forum=forum, last_message__isnull=False).order_by("-last_message__pubdate", "-pk")
+        )
+        without_last_message = list(Topic.objects.filter(forum=forum, last_message__isnull=True).order_by("-pk"))
+        topics = with_last_message + without_last_message
+        url = reverse("forum:topics-list", args=[category.slug, forum.slug])
+
+        for page in (1, 2, 3, 2, 3):
+            response = self.client.get(f"{url}?page={page}")
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(topics[(page - 1) * per_page : page * per_page], response.context["topics"])
+
+    def test_topic_lists_version(self):
+        profile = ProfileFactory()
+        _, forum = create_category_and_forum()
+        _, other_forum = create_category_and_forum()
+        topic = create_topic_in_forum(forum, profile)
+        other_topic = create_topic_in_forum(other_forum, profile)
+        version = get_topic_lists_version(forum.pk)
+
+        # the order of the topics of the forum does not change
+        topic.title = "Another title"
+        topic.save()
+        PostFactory(topic=other_topic, author=profile.user, position=2)
+        self.assertEqual(version, get_topic_lists_version(forum.pk))
+
+        # a topic is answered
+        PostFactory(topic=topic, author=profile.user, position=2)
+        self.assertNotEqual(version, get_topic_lists_version(forum.pk))
+
 
 class TopicPostsListViewTest(TestCase):
     def test_failure_list_all_posts_of_a_topic_of_a_forum_we_cannot_read(self):
@@ -261,6 +320,25 @@ class TopicPostsListViewTest(TestCase):
         self.assertIsNotNone(response.context["form"])
         self.assertIsNotNone(response.context["form_move"])
 
+    def test_success_list_posts_of_a_deep_page(self):
+        profile = ProfileFactory()
+        _, forum = create_category_and_forum()
+        topic = create_topic_in_forum(forum, profile)
+        per_page = settings.ZDS_APP["forum"]["posts_per_page"]
+        for position in range(2, per_page * 3 + 2):
+            PostFactory(topic=topic, author=profile.user, position=position)
+        posts = list(Post.objects.filter(topic=topic).order_by("position"))
+        url = reverse("forum:topic-posts-list", args=[topic.pk, topic.slug()])
+
+        for page in (3, 2, 3, 4):
+            response = self.client.get(f"{url}?page={page}")
+            self.assertEqual(200, response.status_code)
+            # the last post of the previous page is displayed too
+            self.assertEqual(posts[(page - 1) * per_page - 1 : page * per_page], response.context["posts"])
+
+        response = self.client.get(f"{url}?page=5")
+        self.assertEqual(404, response.status_code)
+
     def test_subscriber_count_of_a_topic(self):
         profile = ProfileFactory()
         _, forum = create_category_and_forum()
@@ -19,9 +19,18 @@ from django.views.generic.detail import SingleObjectMixin
 
 from zds.forum.commons import TopicEditMixin, PostEditMixin, SinglePostObjectMixin, ForumEditMixin
 from zds.forum.forms import TopicForm, PostForm, MoveTopicForm
-from zds.forum.models import ForumCategory, Forum, Topic, Post, mark_read, TopicRead
+from zds.forum.models import (
+    ForumCategory,
+    Forum,
+    Topic,
+    Post,
+    mark_read,
+    TopicRead,
+    get_readable_forum_pks,
+    get_topic_lists_version,
+)
 from zds.member.decorator import can_write_and_read_now
-from zds.member.models import user_readable_forums
+from zds.member.models import Profile
 from zds.forum import signals
 from zds.notification.models import NewTopicSubscription, TopicAnswerSubscription
 from zds.featured.mixins import FeatureableMixin
@@ -31,6 +40,7 @@ from zds.forum.utils import create_topic, send_post, CreatePostView
 from zds.utils.mixins import FilterMixin
 from zds.utils.models import Alert, Tag, CommentVote
 from zds.utils.paginator import ZdSPagingListView
+from zds.utils.templatetags.emarkdown import prefetch_markdown
 
 
 class CategoriesForumsListView(ListView):
@@ -42,7 +52,7 @@ class CategoriesForumsListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         for category in context.get("categories"):
-            category.forums = category.get_forums(self.request.user, with_count=True)
+            category.forums = category.get_forums(self.request.user)
         return context
 
 
@@ -70,7 +80,7 @@ class LastTopicsListView(ListView):
         query_order = {"creation": "-pubdate", "last_post": "-last_message__pubdate"}.get(ordering)
         topics = (
             Topic.objects.select_related("forum")
-            .filter(forum__in=user_readable_forums(self.request.user))
+            .filter(forum__in=get_readable_forum_pks(self.request.user))
             .order_by(query_order)[: settings.ZDS_APP["forum"]["topics_per_page"]]
         )
         return topics
@@ -87,6 +97,7 @@ class ForumTopicsListView(FilterMixin, ForumEditMixin, ZdSPagingListView, Update
 
     context_object_name = "topics"
     paginate_by = settings.ZDS_APP["forum"]["topics_per_page"]
+    paginate_keys = ("-last_message__pubdate", "-pk")
     template_name = "forum/category/forum.html"
     fields = "__all__"
     filter_url_kwarg = "filter"
@@ -118,7 +129,7 @@ class ForumTopicsListView(FilterMixin, ForumEditMixin, ZdSPagingListView, Update
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["topics"] = list(context["topics"].all())
+        context["topics"] = list(context["topics"])
         sticky = list(
             self.filter_queryset(
                 Topic.objects.get_all_topics_of_a_forum(self.object.pk, is_sticky=True), context["filter"]
@@ -158,6 +169,10 @@ class ForumTopicsListView(FilterMixin, ForumEditMixin, ZdSPagingListView, Update
         self.queryset = Topic.objects.get_all_topics_of_a_forum(self.object.pk)
         return super().get_queryset()
 
+    def get_keyset_cache_key(self, queryset):
+        # the topics are moved to the top of the list when they are answered
+        return f"{super().get_keyset_cache_key(queryset)}_{get_topic_lists_version(self.object.pk)}"
+
     def filter_queryset(self, queryset, filter_param):
         if filter_param == "solve":
             queryset = queryset.filter(solved_by__isnull=False)
@@ -172,6 +187,7 @@ class TopicPostsListView(ZdSPagingListView, FeatureableMixin, SingleObjectMixin)
 
     context_object_name = "posts"
     paginate_by = settings.ZDS_APP["forum"]["posts_per_page"]
+    paginate_keys = ("position", "pk")
     template_name = "forum/topic/index.html"
     object = None
 
@@ -192,6 +208,11 @@ class TopicPostsListView(ZdSPagingListView, FeatureableMixin, SingleObjectMixin)
         form.helper.form_action = reverse("forum:post-new") + "?sujet=" + str(self.object.pk)
 
         posts = self.build_list_with_previous_item(context["object_list"])
+        # render all the signatures of the page at once, instead of one by one in the template
+        prefetch_markdown(
+            Profile.objects.filter(user__in={post.author_id for post in posts}).values_list("sign", flat=True),
+            inline=True,
+        )
         context.update(
             {
                 "topic": self.object,
@@ -235,6 +256,10 @@ class TopicPostsListView(ZdSPagingListView, FeatureableMixin, SingleObjectMixin)
             raise Http404(f"Pas de forum avec l'identifiant {self.kwargs.get('topic_pk')}")
         return result
 
+    def get_keyset_cache_key(self, queryset):
+        # the posts are only added at the end of a topic, so the anchors of its pages never change
+        return f"topic_posts_{self.object.pk}_{self.object.pubdate.timestamp()}"
+
     def get_queryset(self):
         return Post.objects.get_messages_of_a_topic(self.object.pk)
 
@@ -447,6 +472,7 @@ class FindTopic(ZdSPagingListView, SingleObjectMixin):
                 "created_topics": True,
             }
         )
+        TopicRead.objects.get_read_flags(context["topics"], self.request.user)
         return context
 
     def get_queryset(self):
@@ -480,6 +506,7 @@ class FindFollowedTopic(ZdSPagingListView, SingleObjectMixin):
                 "followed_topics": True,
             }
         )
+        TopicRead.objects.get_read_flags(context["topics"], self.request.user)
         return context
 
     def get_queryset(self):
@@ -40,7 +40,7 @@ from zds.member.commons import (
     ProfileCreate,
     TokenGenerator,
 )
-from zds.member.models import Profile
+from zds.member.models import Profile, merge_pending_visits
 
 
 class PagingSearchListKeyConstructor(DefaultKeyConstructor):
@@ -226,6 +226,7 @@ class MemberMyDetailAPI(RetrieveAPIView):
               message: Not Authenticated
         """
         profile = self.get_object()
+        merge_pending_visits([profile])
         serializer = self.get_serializer(profile, show_email=True, is_authenticated=True)
         return Response(serializer.data)
 
@@ -267,6 +268,7 @@ class MemberDetailAPI(RetrieveUpdateAPIView):
               message: Not Found
         """
         profile = self.get_object()
+        merge_pending_visits([profile])
         serializer = self.get_serializer(
             profile, show_email=profile.show_email, is_authenticated=self.request.user.is_authenticated
         )
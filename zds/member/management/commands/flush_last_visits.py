@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from zds.member.models import flush_pending_visits
+
+
+class Command(BaseCommand):
+    """
+    `python manage.py flush_last_visits`; write in the database the last visits of the members, kept in the cache
+    by the `SetLastVisitMiddleware`. Run it regularly, and more often than
+    ``ZDS_APP["member"]["pending_visits_timeout"]``.
+
+    """
+
+    help = "Write the pending last visits of the members in the database"
+
+    def handle(self, *args, **options):
+        updated = flush_pending_visits()
+        if updated:
+            self.stdout.write(f"Wrote the last visit of {updated} members.")
@@ -5,6 +5,7 @@ from hashlib import md5
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.gis.geoip2 import GeoIP2
+from django.core.cache import cache
 from django.urls import reverse
 from django.db import models
 from django.dispatch import receiver
@@ -18,7 +19,7 @@ from zds.tutorialv2.models.database import PublishableContent
 from zds.utils import old_slugify
 from zds.utils.models import Alert, Licence, Hat
 
-from zds.forum.models import Forum
+from zds.forum.models import Forum, get_readable_forum_pks
 import homoglyphs as hg
 
 
@@ -557,9 +558,102 @@ def save_profile(backend, user, response, *args, **kwargs):
         profile.save()
 
 
+LAST_VISIT_CACHE_KEY = "last-visit-{}"
+PENDING_VISIT_CACHE_KEY = "last-visit-pending-{}"
+PENDING_VISITS_COUNT_CACHE_KEY = "last-visit-pending-count"
+FLUSHED_VISITS_COUNT_CACHE_KEY = "last-visit-flushed-count"
+
+
+def record_visit(profile, ip_address):
+    """Set the last visit (and IP address) of a member.
+
+    If ``ZDS_APP["member"]["buffer_last_visits"]`` is set, the visit is not written in the database: it waits in the
+    cache for ``flush_pending_visits()``, and the pending visits are numbered so that ``flush_pending_visits()`` finds
+    the members to update. A new IP address is written at once anyway, since the members of an IP address are looked
+    up in the database.
+
+    :param profile: the profile of the member
+    :type profile: Profile
+    :param ip_address: the IP address of the visit
+    :type ip_address: str
+    """
+
+    ip_address_changed = ip_address != profile.last_ip_address
+    profile.last_visit = datetime.now()
+    profile.last_ip_address = ip_address
+    if not settings.ZDS_APP["member"]["buffer_last_visits"]:
+        Profile.objects.filter(pk=profile.pk).update(last_visit=profile.last_visit, last_ip_address=ip_address)
+        return
+
+    if ip_address_changed:
+        Profile.objects.filter(pk=profile.pk).update(last_ip_address=ip_address)
+    timeout = settings.ZDS_APP["member"]["pending_visits_timeout"]
+    cache.set(LAST_VISIT_CACHE_KEY.format(profile.pk), (profile.last_visit, ip_address), timeout=timeout)
+
+    cache.add(PENDING_VISITS_COUNT_CACHE_KEY, 0, timeout=None)
+    try:
+        number = cache.incr(PENDING_VISITS_COUNT_CACHE_KEY)
+    except ValueError:  # the counter was evicted in the meantime
+        cache.set(PENDING_VISITS_COUNT_CACHE_KEY, 1, timeout=None)
+        number = 1
+    cache.set(PENDING_VISIT_CACHE_KEY.format(number), profile.pk, timeout=timeout)
+
+
+def merge_pending_visits(profiles):
+    """Replace the last visit (and IP address) of the profiles by the one waiting in the cache, if it is more recent.
+
+    :param profiles: the profiles
+    :type profiles: list[Profile]
+    """
+
+    pending = cache.get_many([LAST_VISIT_CACHE_KEY.format(profile.pk) for profile in profiles])
+    for profile in profiles:
+        visit = pending.get(LAST_VISIT_CACHE_KEY.format(profile.pk))
+        if visit is not None and (profile.last_visit is None or visit[0] > profile.last_visit):
+            profile.last_visit, profile.last_ip_address = visit
+
+
+def flush_pending_visits(batch_size=None):
+    """Write the visits recorded by ``record_visit()`` in the database, with one UPDATE (of the last visit and IP
+    address only) per batch of members.
+
+    :param batch_size: number of pending visits read at once
+    :type batch_size: int
+    :return: the number of visits written
+    :rtype: int
+    """
+
+    batch_size = batch_size or settings.ZDS_APP["member"]["pending_visits_batch_size"]
+    last_number = cache.get(PENDING_VISITS_COUNT_CACHE_KEY, 0)
+    flushed_number = cache.get(FLUSHED_VISITS_COUNT_CACHE_KEY, 0)
+    if flushed_number > last_number:  # the counter was evicted and started again
+        flushed_number = 0
+
+    updated = 0
+    for start in range(flushed_number + 1, last_number + 1, batch_size):
+        numbers = range(start, min(start + batch_size, last_number + 1))
+        number_keys = [PENDING_VISIT_CACHE_KEY.format(number) for number in numbers]
+        profile_pks = set(cache.get_many(number_keys).values())
+        visits = cache.get_many([LAST_VISIT_CACHE_KEY.format(pk) for pk in profile_pks])
+
+        profiles = []
+        for pk in profile_pks:
+            visit = visits.get(LAST_VISIT_CACHE_KEY.format(pk))
+            if visit is not None:
+                profiles.append(Profile(pk=pk, last_visit=visit[0], last_ip_address=visit[1]))
+        if profiles:
+            Profile.objects.bulk_update(profiles, ["last_visit", "last_ip_address"])
+            updated += len(profiles)
+
+        cache.delete_many(number_keys)
+        cache.set(FLUSHED_VISITS_COUNT_CACHE_KEY, numbers[-1], timeout=None)
+
+    return updated
+
+
 def user_readable_forums(user):
     """Returns a set of forums to which a user can access."""
-    return {f for f in Forum.objects.all() if f.can_read(user)}
+    return set(Forum.objects.filter(pk__in=get_readable_forum_pks(user)))
 
 
 class NewEmailProvider(models.Model):
@@ -22,7 +22,7 @@ from zds.member.commons import (
 )
 from zds.member.decorator import can_write_and_read_now
 from zds.member.forms import MiniProfileForm
-from zds.member.models import Profile, KarmaNote
+from zds.member.models import Profile, KarmaNote, merge_pending_visits
 import logging
 
 
@@ -31,14 +31,16 @@ import logging
 def member_from_ip(request, ip_address):
     """List users connected from a particular IP, and an IPV6 subnetwork."""
 
-    members = Profile.objects.filter(last_ip_address=ip_address).order_by("-last_visit")
+    members = list(Profile.objects.filter(last_ip_address=ip_address).order_by("-last_visit"))
+    merge_pending_visits(members)
     members_and_ip = {"members": members, "ip": ip_address}
 
     if ":" in ip_address:  # Check if it's an IPV6
         network_ip = ipaddress.ip_network(ip_address + "/64", strict=False).network_address  # Get the network / block
         # Remove the additional ":" at the end of the network adresse, so we can filter the IP adresses on this network
         network_ip = str(network_ip)[:-1]
-        network_members = Profile.objects.filter(last_ip_address__startswith=network_ip).order_by("-last_visit")
+        network_members = list(Profile.objects.filter(last_ip_address__startswith=network_ip).order_by("-last_visit"))
+        merge_pending_visits(network_members)
         members_and_ip["network_members"] = network_members
         members_and_ip["network_ip"] = network_ip
 
@@ -30,6 +30,7 @@ from zds.member.models import (
     KarmaNote,
     Ban,
     NewEmailProvider,
+    merge_pending_visits,
 )
 from zds.member.utils import get_bot_account
 from zds.notification.models import TopicAnswerSubscription, NewPublicationSubscription
@@ -143,6 +144,7 @@ class MemberDetail(DetailView):
         context = super().get_context_data(**kwargs)
         usr = context["usr"]
         profile = usr.profile
+        merge_pending_visits([profile])
         context["profile"] = profile
         context["topics"] = list(Topic.objects.last_topics_of_a_member(usr, self.request.user))
         followed_query_set = TopicAnswerSubscription.objects.get_objects_followed_by(self.request.user.id)
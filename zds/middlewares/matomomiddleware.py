@@ -1,18 +1,21 @@
+import atexit
 from _datetime import datetime
-from queue import Queue
+from queue import Empty, Full, Queue
+from time import monotonic
+from urllib.parse import urlencode
 
 import requests
 import logging
 
 from django.conf import settings
-from threading import Thread
+from threading import Lock, Thread
 
 from django.urls import reverse
 
 from zds.member.views import get_client_ip
 
 matomo_token_auth = settings.ZDS_APP["site"]["matomo_token_auth"]
-matomo_api_url = "{}/matomo.php?token_auth={}".format(settings.ZDS_APP["site"]["matomo_url"], matomo_token_auth)
+matomo_api_url = "{}/matomo.php".format(settings.ZDS_APP["site"]["matomo_url"])
 matomo_site_id = settings.ZDS_APP["site"]["matomo_site_id"]
 matomo_api_version = 1
 logger = logging.getLogger(__name__)
@@ -21,38 +24,178 @@ tracked_methods = ["GET"]
 excluded_paths = ["/contenus", "/mp", "/munin", "/api", "/static", "/media"]
 
 
-def _background_process(queue: Queue):
-    data = queue.get(block=True)
-    while data:
-        params = {
-            "idsite": matomo_site_id,
-            "action_name": data["r_path"],
-            "rec": 1,
-            "apiv": matomo_api_version,
-            "lang": data["client_accept_language"],
-            "ua": data["client_user_agent"],
-            "urlref": data["client_referer"],
-            "url": data["client_url"],
-            "h": data["datetime"].hour,
-            "m": data["datetime"].minute,
-            "s": data["datetime"].second,
+def _build_tracking_request(data):
+    """Build the query string of one hit, as expected by the Matomo bulk tracking API.
+
+    :param data: the hit, as queued by ``MatomoMiddleware.matomo_track()``
+    :type data: dict
+    :rtype: str
+    """
+    params = {
+        "idsite": matomo_site_id,
+        "action_name": data["r_path"],
+        "rec": 1,
+        "apiv": matomo_api_version,
+        "lang": data["client_accept_language"],
+        "ua": data["client_user_agent"],
+        "urlref": data["client_referer"],
+        "url": data["client_url"],
+        "h": data["datetime"].hour,
+        "m": data["datetime"].minute,
+        "s": data["datetime"].second,
+    }
+    if "search" in data:
+        params["search"] = data["search"]
+        params["search_cat"] = data["search_cat"]
+        params["search_count"] = data["search_count"]
+    if data["address_ip"] != "0.0.0.0":
+        params["cip"] = data["address_ip"]
+    return "?" + urlencode(params)
+
+
+class MatomoTracker:
+    """Send the hits to Matomo from a background thread.
+
+    The hits wait in a bounded queue: when it is full, a hit is dropped, at once (``"drop"`` policy) or if no slot
+    was freed after ``queue_timeout`` seconds (``"block"`` policy). The thread sends them by batches with the bulk
+    tracking API, over one keep-alive session, as soon as ``batch_size`` hits are waiting or ``flush_interval``
+    seconds after the first hit of the batch.
+    """
+
+    def __init__(
+        self,
+        api_url=None,
+        token_auth=None,
+        queue_size=None,
+        queue_full_policy=None,
+        queue_timeout=None,
+        batch_size=None,
+        flush_interval=None,
+    ):
+        site_settings = settings.ZDS_APP["site"]
+        self.api_url = api_url or matomo_api_url
+        self.token_auth = matomo_token_auth if token_auth is None else token_auth
+        self.queue_full_policy = queue_full_policy or site_settings["matomo_queue_full_policy"]
+        self.queue_timeout = site_settings["matomo_queue_timeout"] if queue_timeout is None else queue_timeout
+        self.batch_size = batch_size or site_settings["matomo_batch_size"]
+        self.flush_interval = site_settings["matomo_flush_interval"] if flush_interval is None else flush_interval
+        self.queue = Queue(maxsize=queue_size or site_settings["matomo_queue_size"])
+        self.worker = None
+
+        self._counters_lock = Lock()
+        self.dropped_count = 0
+        self.sent_count = 0
+        self.failed_count = 0
+
+    @property
+    def queue_depth(self):
+        """Number of hits waiting to be sent."""
+        return self.queue.qsize()
+
+    def get_stats(self):
+        """
+        :return: the queue depth, and the number of hits dropped (queue full), sent and lost (Matomo error)
+        :rtype: dict
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "dropped": self.dropped_count,
+            "sent": self.sent_count,
+            "failed": self.failed_count,
         }
-        if "search" in data:
-            params["search"] = data["search"]
-            params["search_cat"] = data["search_cat"]
-            params["search_count"] = data["search_count"]
+
+    def _count(self, counter, number=1):
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + number)
+
+    def start(self):
+        self.worker = Thread(target=self._background_process, daemon=True)
+        self.worker.start()
+
+    def stop(self, timeout=2):
+        """Send the pending hits, then stop the thread."""
+        if self.worker is not None:
+            try:
+                self.queue.put(False, timeout=timeout)
+            except Full:
+                pass
+            self.worker.join(timeout=timeout)
+            self.worker = None
+
+    def track(self, data):
+        """Queue a hit, or drop it if the queue is full.
+
+        :param data: the hit
+        :type data: dict
+        :return: ``True`` if the hit was queued
+        :rtype: bool
+        """
         try:
-            if data["address_ip"] != "0.0.0.0":
-                params["cip"] = data["address_ip"]
-            requests.get(
-                matomo_api_url,
-                params=params,
+            if self.queue_full_policy == "block":
+                self.queue.put(data, timeout=self.queue_timeout)
+            else:
+                self.queue.put_nowait(data)
+        except Full:
+            self._count("dropped_count")
+            logger.warning(f'Matomo queue is full, this link is not tracked : {data["client_url"]}')
+            return False
+        return True
+
+    def _background_process(self):
+        session = requests.Session()
+        batch = []
+        flush_at = None
+        running = True
+        while running:
+            try:
+                data = self.queue.get(block=True, timeout=max(0, flush_at - monotonic()) if batch else None)
+            except Empty:  # the batch waited long enough
+                data = None
+            if data is False:
+                running = False
+            elif data is not None:
+                try:
+                    batch.append(_build_tracking_request(data))
+                except Exception:
+                    logger.exception(f'Something went wrong with the tracking of the link {data["client_url"]}')
+                if len(batch) == 1:
+                    flush_at = monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._send(session, batch)
+                batch = []
+        session.close()
+
+    def _send(self, session, batch):
+        try:
+            response = session.post(
+                self.api_url, json={"requests": batch, "token_auth": self.token_auth}, timeout=self.flush_interval + 10
             )
-            logger.info(f'Matomo tracked this link : {data["client_url"]}')
+            response.raise_for_status()
+            self._count("sent_count", len(batch))
+            logger.info(f"Matomo tracked {len(batch)} links")
         except Exception:
-            logger.exception(f'Something went wrong with the tracking of the link {data["client_url"]}')
+            self._count("failed_count", len(batch))
+            logger.exception(f"Something went wrong with the tracking of {len(batch)} links")
+
+
+_tracker = None
 
-        data = queue.get(block=True)
+
+def get_matomo_tracker():
+    """Get the tracker of this process (it is started if the tracking is enabled, and sends its pending hits when
+    the process exits).
+
+    :rtype: MatomoTracker
+    """
+    global _tracker
+    if _tracker is None:
+        _tracker = MatomoTracker()
+        if settings.ZDS_APP["site"]["matomo_tracking_enabled"]:
+            _tracker.start()
+            atexit.register(_tracker.stop)
+    return _tracker
 
 
 def _compute_search_category(request):
@@ -67,11 +210,7 @@ def _compute_search_category(request):
 class MatomoMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        self.queue = Queue()
-        if settings.ZDS_APP["site"]["matomo_tracking_enabled"]:
-            self.worker = Thread(target=_background_process, args=(self.queue,))
-            self.worker.setDaemon(True)
-            self.worker.start()
+        self.tracker = get_matomo_tracker()
 
     def __call__(self, request):
         return self.process_response(request, self.get_response(request))
@@ -93,7 +232,7 @@ class MatomoMiddleware:
             }
             if search_data:
                 tracking_params.update(search_data)
-            self.queue.put(tracking_params)
+            self.tracker.track(tracking_params)
 
     def process_response(self, request, response):
         if response.status_code not in tracked_status_code or request.is_ajax():
@@ -126,8 +265,3 @@ class MatomoMiddleware:
                 logger.exception(f"Something failed with Matomo tracking system.")
 
         return response
-
-    def __del__(self):
-        if settings.ZDS_APP["site"]["matomo_tracking_enabled"]:
-            self.queue.put(False)
-            self.worker.join(timeout=2)
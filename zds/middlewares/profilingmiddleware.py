@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from zds.utils.profiling import profile_block, store_profile
+
+
+class ProfilingMiddleware:
+    """Record the SQL queries and the calls to zmarkdown and Elasticsearch of each request, by view (see
+    ``python manage.py profiling_report``). Only used if ``ZDS_APP["profiling"]["enabled"]`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ZDS_APP["profiling"]["enabled"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile_block() as profile:
+            response = self.get_response(request)
+
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None:
+            store_profile(resolver_match.view_name or resolver_match._func_path, profile)
+        return response
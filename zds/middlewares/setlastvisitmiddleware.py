@@ -3,6 +3,7 @@ import datetime
 from django.contrib.auth import logout
 
 from django.conf import settings
+from zds.member.models import merge_pending_visits, record_visit
 from zds.member.views import get_client_ip
 
 
@@ -14,7 +15,7 @@ class SetLastVisitMiddleware:
         return self.process_response(request, self.get_response(request))
 
     def process_response(self, request, response):
-        # Update last visit time after request finished processing.
+        # Update last visit time after request finished processing (see `record_visit()`).
         user = None
         try:
             if request.user.is_authenticated:
@@ -24,16 +25,13 @@ class SetLastVisitMiddleware:
 
         if user:
             profile = request.user.profile
-            if profile.last_visit is None:
-                profile.last_visit = datetime.datetime.now()
-                profile.last_ip_address = get_client_ip(request)
-                profile.save()
-            else:
-                duration = datetime.datetime.now() - profile.last_visit
-                if duration.seconds > settings.ZDS_APP["member"]["update_last_visit_interval"]:
-                    profile.last_visit = datetime.datetime.now()
-                    profile.last_ip_address = get_client_ip(request)
-                    profile.save()
+            merge_pending_visits([profile])
+            if (
+                profile.last_visit is None
+                or (datetime.datetime.now() - profile.last_visit).total_seconds()
+                > settings.ZDS_APP["member"]["update_last_visit_interval"]
+            ):
+                record_visit(profile, get_client_ip(request))
             if not profile.can_read:
                 logout(request)
         return response
@@ -0,0 +1,122 @@
+import json
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs
+
+from django.test import TestCase
+
+from zds.middlewares.matomomiddleware import MatomoTracker
+
+
+class FakeMatomoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.received.append(body)
+        self.send_response(self.server.status_code)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeMatomo:
+    """A local Matomo endpoint, which records the bulk tracking requests it receives."""
+
+    def __init__(self, status_code=200):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMatomoHandler)
+        self.server.received = []
+        self.server.status_code = status_code
+        self.url = "http://127.0.0.1:{}/matomo.php".format(self.server.server_address[1])
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def received(self):
+        return self.server.received
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_hit(path):
+    return {
+        "client_user_agent": "Mozilla",
+        "client_referer": "",
+        "client_accept_language": "fr",
+        "client_url": f"http://localhost{path}",
+        "datetime": datetime.now().time(),
+        "r_path": path,
+        "address_ip": "1.2.3.4",
+    }
+
+
+def wait_for(condition, timeout=5):
+    limit = time.monotonic() + timeout
+    while not condition() and time.monotonic() < limit:
+        time.sleep(0.01)
+    return condition()
+
+
+class MatomoTrackerTest(TestCase):
+    def setUp(self):
+        self.matomo = FakeMatomo()
+
+    def tearDown(self):
+        self.matomo.close()
+
+    def test_batch_is_sent_when_full(self):
+        tracker = MatomoTracker(api_url=self.matomo.url, token_auth="token", batch_size=3, flush_interval=60)
+        tracker.start()
+        for i in range(4):
+            tracker.track(make_hit(f"/page-{i}/"))
+
+        self.assertTrue(wait_for(lambda: len(self.matomo.received) == 1))
+        self.assertEqual(self.matomo.received[0]["token_auth"], "token")
+        hits = [parse_qs(request[1:]) for request in self.matomo.received[0]["requests"]]
+        self.assertEqual([hit["action_name"] for hit in hits], [["/page-0/"], ["/page-1/"], ["/page-2/"]])
+        self.assertEqual(hits[0]["cip"], ["1.2.3.4"])
+
+        # the last hit is sent when the tracker stops
+        tracker.stop()
+        self.assertEqual(len(self.matomo.received), 2)
+        self.assertEqual(len(self.matomo.received[1]["requests"]), 1)
+        self.assertEqual(tracker.get_stats(), {"queue_depth": 0, "dropped": 0, "sent": 4, "failed": 0})
+
+    def test_batch_is_sent_after_flush_interval(self):
+        tracker = MatomoTracker(api_url=self.matomo.url, batch_size=100, flush_interval=0.2)
+        tracker.start()
+        tracker.track(make_hit("/a/"))
+        tracker.track(make_hit("/b/"))
+
+        self.assertTrue(wait_for(lambda: tracker.sent_count == 2))
+        self.assertEqual(len(self.matomo.received), 1)
+        tracker.stop()
+
+    def test_full_queue(self):
+        # without the thread, nothing is taken out of the queue
+        tracker = MatomoTracker(api_url=self.matomo.url, queue_size=2, queue_full_policy="drop")
+        self.assertTrue(tracker.track(make_hit("/a/")))
+        self.assertTrue(tracker.track(make_hit("/b/")))
+        self.assertFalse(tracker.track(make_hit("/c/")))
+        self.assertEqual(tracker.queue_depth, 2)
+        self.assertEqual(tracker.dropped_count, 1)
+
+        tracker = MatomoTracker(api_url=self.matomo.url, queue_size=1, queue_full_policy="block", queue_timeout=0.1)
+        self.assertTrue(tracker.track(make_hit("/a/")))
+        start = time.monotonic()
+        self.assertFalse(tracker.track(make_hit("/b/")))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(tracker.dropped_count, 1)
+
+    def test_matomo_error(self):
+        self.matomo.server.status_code = 500
+        tracker = MatomoTracker(api_url=self.matomo.url, batch_size=2, flush_interval=60)
+        tracker.start()
+        tracker.track(make_hit("/a/"))
+        tracker.track(make_hit("/b/"))
+
+        self.assertTrue(wait_for(lambda: tracker.failed_count == 2))
+        self.assertEqual(tracker.sent_count, 0)
+        tracker.stop()
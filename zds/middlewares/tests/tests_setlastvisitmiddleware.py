@@ -6,18 +6,21 @@ from django.test.utils import override_settings
 from django.shortcuts import get_object_or_404
 
 from zds.member.tests.factories import ProfileFactory
-from zds.member.models import Profile
+from zds.member.models import LAST_VISIT_CACHE_KEY, Profile, flush_pending_visits
+from django.core.cache import cache
 from django.conf import settings
 from copy import deepcopy
 
 overridden_zds_app = deepcopy(settings.ZDS_APP)
 overridden_zds_app["member"]["update_last_visit_interval"] = 30
+overridden_zds_app["member"]["buffer_last_visits"] = True
 
 
 @override_settings(ZDS_APP=overridden_zds_app)
 class SetLastVisitMiddlewareTest(TestCase):
     def setUp(self):
         self.user = ProfileFactory()
+        cache.delete(LAST_VISIT_CACHE_KEY.format(self.user.pk))
 
     def test_process_response(self):
         profile_pk = self.user.pk
@@ -43,6 +46,40 @@ class SetLastVisitMiddlewareTest(TestCase):
         # load a page
         self.client.get(reverse("homepage"))
 
-        # the date of last visit should have been updated
+        # the date of last visit waits in the cache...
         profile = get_object_or_404(Profile, pk=profile_pk)
+        self.assertTrue(datetime.now() - profile.last_visit > timedelta(seconds=40))
+        response = self.client.get(reverse("member-detail", args=[self.user.user.username]))
+        self.assertTrue(datetime.now() - response.context["profile"].last_visit < timedelta(seconds=5))
+
+        # ... until it is written in the database
+        self.assertGreaterEqual(flush_pending_visits(), 1)
+        profile = get_object_or_404(Profile, pk=profile_pk)
+        self.assertTrue(datetime.now() - profile.last_visit < timedelta(seconds=5))
+        self.assertEqual(flush_pending_visits(), 0)
+
+    def test_new_ip_address_is_written_at_once(self):
+        self.client.force_login(self.user.user)
+        self.user.last_visit = datetime.now() - timedelta(seconds=45)
+        self.user.last_ip_address = "192.0.2.1"
+        self.user.save()
+
+        self.client.get(reverse("homepage"), REMOTE_ADDR="192.0.2.2")
+
+        # the members of an IP address are looked up in the database
+        profile = get_object_or_404(Profile, pk=self.user.pk)
+        self.assertEqual(profile.last_ip_address, "192.0.2.2")
+        self.assertTrue(datetime.now() - profile.last_visit > timedelta(seconds=40))
+
+    @override_settings(ZDS_APP=settings.ZDS_APP)
+    def test_process_response_without_buffer(self):
+        self.client.force_login(self.user.user)
+        self.user.last_visit = datetime.now() - timedelta(days=1)
+        self.user.save()
+
+        self.client.get(reverse("homepage"))
+
+        # the visit is written at once
+        profile = get_object_or_404(Profile, pk=self.user.pk)
         self.assertTrue(datetime.now() - profile.last_visit < timedelta(seconds=5))
+        self.assertIsNone(cache.get(LAST_VISIT_CACHE_KEY.format(self.user.pk)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from zds.munin.metrics import update_metrics
+
+
+class Command(BaseCommand):
+    """
+    `python manage.py update_munin_metrics`; compute the values served to Munin and store them in the cache. Run it
+    more often than ``ZDS_APP["munin"]["metrics_max_age"]``, so that the Munin views never compute them.
+
+    """
+
+    help = "Compute the metrics served to Munin"
+
+    def handle(self, *args, **options):
+        update_metrics()
@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from zds.forum.models import Forum, Topic
+from zds.mp.models import PrivatePost, PrivateTopic
+from zds.tutorialv2.models.database import ContentReaction, PublishableContent
+
+METRICS_CACHE_KEY = "munin-metrics"
+
+
+def compute_metrics():
+    """Compute the values of every Munin graph.
+
+    The number of topics and forum posts are the sum of the counters of the forums, and each table is read once.
+
+    :return: the values of each graph, by view name
+    :rtype: dict
+    """
+
+    forums = Forum.objects.aggregate(topics=Coalesce(Sum("topic_count"), 0), posts=Coalesce(Sum("post_count"), 0))
+
+    contents = {
+        content_type: {"total": 0, "online": 0, "featured": 0, "converted": 0}
+        for content_type in ("TUTORIAL", "ARTICLE", "OPINION")
+    }
+    for counters in (
+        PublishableContent.objects.order_by()
+        .values("type")
+        .annotate(
+            total=Count("pk"),
+            online=Count("pk", filter=Q(sha_public__isnull=False)),
+            featured=Count("pk", filter=Q(sha_picked__isnull=False)),
+            converted=Count("pk", filter=Q(converted_to__sha_public__isnull=False)),
+        )
+    ):
+        contents.setdefault(counters.pop("type"), {}).update(counters)
+
+    metrics = {
+        "total_topics": [
+            ("topics", forums["topics"]),
+            ("solved", Topic.objects.filter(solved_by__isnull=False).count()),
+        ],
+        "total_posts": [("posts", forums["posts"]), ("comments", ContentReaction.objects.count())],
+        "total_mps": [("mp", PrivateTopic.objects.count()), ("replies", PrivatePost.objects.count())],
+        "total_opinions": [
+            ("draft", contents["OPINION"]["total"] - contents["OPINION"]["online"]),
+            ("featured", contents["OPINION"]["featured"]),
+            ("published", contents["OPINION"]["online"]),
+            ("converted", contents["OPINION"]["converted"]),
+        ],
+    }
+    for view_name, label, content_type in (
+        ("total_tutorials", "tutorials", "TUTORIAL"),
+        ("total_articles", "articles", "ARTICLE"),
+    ):
+        counters = contents[content_type]
+        metrics[view_name] = [
+            (label, counters["total"]),
+            ("offline", counters["total"] - counters["online"]),
+            ("online", counters["online"]),
+        ]
+
+    return metrics
+
+
+def update_metrics():
+    """Compute the metrics and store them in the cache.
+
+    :return: the snapshot: the metrics and the (timestamp) date of their computation
+    :rtype: dict
+    """
+
+    snapshot = {"date": time.time(), "metrics": compute_metrics()}
+    cache.set(METRICS_CACHE_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def get_metrics():
+    """Get the metrics stored by the last ``update_metrics()``, or compute them again if they are missing or older
+    than ``ZDS_APP["munin"]["metrics_max_age"]`` seconds.
+
+    :return: the values of each graph, by view name
+    :rtype: dict
+    """
+
+    snapshot = cache.get(METRICS_CACHE_KEY)
+    if snapshot is None or time.time() - snapshot["date"] > settings.ZDS_APP["munin"]["metrics_max_age"]:
+        snapshot = update_metrics()
+    return snapshot["metrics"]
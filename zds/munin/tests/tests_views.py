@@ -0,0 +1,58 @@
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from zds.forum.tests.factories import create_category_and_forum, create_topic_in_forum, PostFactory
+from zds.member.tests.factories import ProfileFactory
+from zds.munin.metrics import METRICS_CACHE_KEY, get_metrics, update_metrics
+from zds.tutorialv2.models.database import PublishableContent
+from zds.tutorialv2.tests.factories import PublishableContentFactory
+
+overridden_zds_app = deepcopy(settings.ZDS_APP)
+overridden_zds_app["munin"]["metrics_max_age"] = 60
+
+
+@override_settings(ZDS_APP=overridden_zds_app)
+class MuninMetricsTest(TestCase):
+    def setUp(self):
+        cache.delete(METRICS_CACHE_KEY)
+        self.profile = ProfileFactory()
+        _, self.forum = create_category_and_forum()
+        topic = create_topic_in_forum(self.forum, self.profile, is_solved=True)
+        PostFactory(topic=topic, author=self.profile.user, position=2)
+        create_topic_in_forum(self.forum, self.profile)
+
+        author = self.profile.user
+        PublishableContentFactory(type="TUTORIAL", author_list=[author])
+        PublishableContentFactory(type="ARTICLE", author_list=[author])
+        online = PublishableContentFactory(type="ARTICLE", author_list=[author])
+        PublishableContent.objects.filter(pk=online.pk).update(sha_public=online.sha_draft)
+
+    def test_views_serve_the_metrics(self):
+        result = self.client.get(reverse("total_topics"))
+        self.assertEqual(result.content.decode(), "topics 2\nsolved 1")
+        result = self.client.get(reverse("total_posts"))
+        self.assertEqual(result.content.decode(), "posts 3\ncomments 0")
+        result = self.client.get(reverse("total_tutorial"))
+        self.assertEqual(result.content.decode(), "tutorials 1\noffline 1\nonline 0")
+        result = self.client.get(reverse("total_articles"))
+        self.assertEqual(result.content.decode(), "articles 2\noffline 1\nonline 1")
+
+    def test_metrics_are_cached(self):
+        update_metrics()
+        create_topic_in_forum(self.forum, self.profile)
+
+        # the metrics are not computed again...
+        with self.assertNumQueries(0):
+            self.assertEqual(get_metrics()["total_topics"], [("topics", 2), ("solved", 1)])
+
+        # ... unless they are too old
+        snapshot = cache.get(METRICS_CACHE_KEY)
+        snapshot["date"] = time.time() - 61
+        cache.set(METRICS_CACHE_KEY, snapshot)
+        self.assertEqual(get_metrics()["total_topics"], [("topics", 3), ("solved", 1)])
@@ -1,7 +1,5 @@
 from munin.helpers import muninview
-from zds.forum.models import Topic, Post
-from zds.mp.models import PrivateTopic, PrivatePost
-from zds.tutorialv2.models.database import PublishableContent, ContentReaction
+from zds.munin.metrics import get_metrics
 
 
 @muninview(
@@ -9,8 +7,7 @@ from zds.tutorialv2.models.database import PublishableContent, ContentReaction
 graph_vlabel topics"""
 )
 def total_topics(request):
-    topics = Topic.objects.all()
-    return [("topics", topics.count()), ("solved", topics.filter(solved_by__isnull=False).count())]
+    return get_metrics()["total_topics"]
 
 
 @muninview(
@@ -22,7 +19,7 @@ comments.label Article and Tutorial comments
 comments.draw STACK"""
 )
 def total_posts(request):
-    return [tuple(["posts", Post.objects.all().count()]), tuple(["comments", ContentReaction.objects.count()])]
+    return get_metrics()["total_posts"]
 
 
 @muninview(
@@ -30,7 +27,7 @@ def total_posts(request):
 graph_vlabel count"""
 )
 def total_mps(request):
-    return [("mp", PrivateTopic.objects.all().count()), ("replies", PrivatePost.objects.all().count())]
+    return get_metrics()["total_mps"]
 
 
 @muninview(
@@ -38,12 +35,7 @@ def total_mps(request):
 graph_vlabel tutorials"""
 )
 def total_tutorials(request):
-    tutorials = PublishableContent.objects.filter(type="TUTORIAL").all()
-    return [
-        ("tutorials", tutorials.count()),
-        ("offline", tutorials.filter(sha_public__isnull=True).count()),
-        ("online", tutorials.filter(sha_public__isnull=False).count()),
-    ]
+    return get_metrics()["total_tutorials"]
 
 
 @muninview(
@@ -51,12 +43,7 @@ def total_tutorials(request):
 graph_vlabel articles"""
 )
 def total_articles(request):
-    articles = PublishableContent.objects.filter(type="ARTICLE").all()
-    return [
-        ("articles", articles.count()),
-        ("offline", articles.filter(sha_public__isnull=True).count()),
-        ("online", articles.filter(sha_public__isnull=False).count()),
-    ]
+    return get_metrics()["total_articles"]
 
 
 @muninview(
@@ -70,10 +57,4 @@ converted.label Converted
 """
 )
 def total_opinions(request):
-    opinions = PublishableContent.objects.filter(type="OPINION").all()
-    return [
-        ("draft", opinions.filter(sha_public__isnull=True).count()),
-        ("featured", opinions.filter(sha_picked__isnull=False).count()),
-        ("published", opinions.filter(sha_public__isnull=False).count()),
-        ("converted", opinions.filter(converted_to__sha_public__isnull=False).count()),
-    ]
+    return get_metrics()["total_opinions"]
@@ -0,0 +1,119 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management import BaseCommand
+from django.db.models import Min, Q
+from django.utils.translation import gettext as _
+
+from zds.notification.models import QueuedEmail
+
+LOG = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send the queued notification emails (see ZDS_APP['notification']['email_outbox'])."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the emails ready to be sent, then stop, instead of waiting forever for new ones.",
+        )
+
+    def handle(self, *args, **options):
+        config = settings.ZDS_APP["notification"]["email_outbox"]
+        while True:
+            sent = self.process_batch(config)
+            if options["once"] and not sent:
+                break
+            if not sent:
+                time.sleep(config["poll_interval"])
+
+    def process_batch(self, config):
+        """Send the emails of (at most) ``batch_size`` recipients, over a single SMTP connection.
+
+        The emails queued for a recipient are only sent once the oldest one waited for ``coalesce_window`` seconds,
+        and are then sent as one message.
+
+        :return: the number of recipients handled
+        :rtype: int
+        """
+        now = datetime.now()
+        recipients = list(
+            QueuedEmail.objects.filter(Q(send_after__isnull=True) | Q(send_after__lte=now))
+            .values("recipient")
+            .annotate(oldest=Min("created"))
+            .filter(oldest__lte=now - timedelta(seconds=config["coalesce_window"]))
+            .order_by("oldest")
+            .values_list("recipient", flat=True)[: config["batch_size"]]
+        )
+        if not recipients:
+            return 0
+
+        queued_emails = OrderedDict()
+        for queued_email in (
+            QueuedEmail.objects.filter(recipient__in=recipients)
+            .filter(Q(send_after__isnull=True) | Q(send_after__lte=now))
+            .select_related("recipient")
+            .order_by("created", "pk")
+        ):
+            queued_emails.setdefault(queued_email.recipient_id, []).append(queued_email)
+
+        connection = get_connection()
+        try:
+            connection.open()
+            for emails in queued_emails.values():
+                self.send(connection, emails, config)
+        except (SMTPException, OSError):
+            # the connection itself failed, try again later
+            LOG.exception("Could not connect to the SMTP server")
+            self.retry_later(sum(queued_emails.values(), []), config)
+        finally:
+            connection.close()
+
+        return len(queued_emails)
+
+    def send(self, connection, emails, config):
+        message = self.build_message(emails)
+        try:
+            connection.send_messages([message])
+        except (SMTPException, OSError):
+            LOG.warning("Failed sending mail to %s", emails[0].recipient.username, exc_info=True)
+            self.retry_later(emails, config)
+        else:
+            QueuedEmail.objects.filter(pk__in=[email.pk for email in emails]).delete()
+
+    @staticmethod
+    def build_message(emails):
+        """Build a single message from the emails queued for a recipient."""
+        from_email = _("{} <{}>").format(
+            settings.ZDS_APP["site"]["literal_name"], settings.ZDS_APP["site"]["email_noreply"]
+        )
+        if len(emails) == 1:
+            subject, message_txt, message_html = emails[0].subject, emails[0].message_txt, emails[0].message_html
+        else:
+            subject = _("{} : {} nouvelles notifications").format(settings.ZDS_APP["site"]["literal_name"], len(emails))
+            message_txt = "\n\n----------\n\n".join(email.message_txt for email in emails)
+            message_html = "\n<hr>\n".join(email.message_html for email in emails)
+
+        message = EmailMultiAlternatives(subject, message_txt, from_email, [emails[0].recipient.email])
+        message.attach_alternative(message_html, "text/html")
+        return message
+
+    @staticmethod
+    def retry_later(emails, config):
+        for email in emails:
+            email.attempts += 1
+            if email.attempts >= config["max_attempts"]:
+                LOG.error("Giving up sending %s after %s attempts", email, email.attempts)
+                email.delete()
+            else:
+                email.send_after = datetime.now() + timedelta(
+                    seconds=config["retry_backoff"] * 2 ** (email.attempts - 1)
+                )
+                email.save(update_fields=["attempts", "send_after"])
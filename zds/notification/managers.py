@@ -169,7 +169,7 @@ class NewTopicSubscriptionManager(SubscriptionManager):
 
         notifications = Notification.objects.filter(
             content_type__pk=ContentType.objects.get_for_model(topic).pk, object_id=topic.pk
-        )
+        ).select_related("subscription__user")
         for notification in notifications:
             if not topic.forum.can_read(notification.subscription.user):
                 notification.is_read = True
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.14 on 2026-10-18 08:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("notification", "0017_clean_notifications_new_topic_forums_groups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedEmail",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subject", models.CharField(max_length=255, verbose_name="Sujet")),
+                ("message_txt", models.TextField(verbose_name="Message (texte)")),
+                ("message_html", models.TextField(verbose_name="Message (HTML)")),
+                ("created", models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Date de création")),
+                (
+                    "send_after",
+                    models.DateTimeField(
+                        blank=True, db_index=True, default=None, null=True, verbose_name="Ne pas envoyer avant"
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Nombre de tentatives d'envoi")),
+                (
+                    "recipient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="queued_emails",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Courriel en attente",
+                "verbose_name_plural": "Courriels en attente",
+            },
+        ),
+    ]
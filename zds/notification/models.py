@@ -1,3 +1,4 @@
+import contextlib
 import logging
 from smtplib import SMTPException
 
@@ -86,7 +87,7 @@ class Subscription(models.Model):
 
     def send_email(self, notification):
         """
-        Sends an email notification
+        Sends an email notification, or queues it (see ``QueuedEmail``) if the email outbox is enabled.
         """
 
         assert hasattr(self, "module")
@@ -118,6 +119,12 @@ class Subscription(models.Model):
             "email/notification/" + convert_camel_to_underscore(self._meta.object_name) + ".txt", context
         )
 
+        if settings.ZDS_APP["notification"]["email_outbox"]["enabled"]:
+            QueuedEmail.objects.create(
+                recipient=receiver, subject=subject, message_txt=message_txt, message_html=message_html
+            )
+            return
+
         msg = EmailMultiAlternatives(subject, message_txt, from_email, [receiver.email])
         msg.attach_alternative(message_html, "text/html")
         try:
@@ -158,19 +165,87 @@ class SingleNotificationMixin:
                 LOG.info("Duplicates deleted.")
 
             notification = self.build_notification(content, sender)
-            with transaction.atomic():
+            with _atomic_with_emails() as emails:
                 notification.save()
                 self.last_notification = notification
                 self.save()
 
-            if send_email and self.by_email:
-                self.send_email(notification)
+                if send_email and self.by_email:
+                    emails.append((self, notification))
         elif self.last_notification is not None and not self.last_notification.is_read:
             # Update last notification if the new content is older (marking answer as unread)
             if self.last_notification.pubdate > content.pubdate:
                 self.last_notification.content_object = content
                 self.last_notification.save()
 
+    @classmethod
+    def send_notifications(cls, subscriptions, content=None, send_email=True, sender=None):
+        """
+        Same as ``send_notification()``, for all the given subscriptions at once: the number of queries does not
+        depend on the number of subscriptions.
+
+        :param subscriptions: the subscriptions to notify
+        :type subscriptions: django.db.models.QuerySet
+        :param content:  the content the notification is about
+        :param sender: the user whose action triggered the notification
+        :param send_email : whether an email must be sent if the subscription by email is active
+        """
+        subscriptions = list(subscriptions.select_related("user", "last_notification"))
+        to_notify = [s for s in subscriptions if s.last_notification is None or s.last_notification.is_read]
+        unread = [
+            s.last_notification_id for s in subscriptions if s.last_notification and not s.last_notification.is_read
+        ]
+        content_type = ContentType.objects.get_for_model(content)
+
+        # Update last notification if the new content is older (marking answer as unread)
+        if unread:
+            Notification.objects.filter(pk__in=unread, pubdate__gt=content.pubdate).update(
+                content_type=content_type, object_id=content.pk
+            )
+        if not to_notify:
+            return
+
+        existing = {}
+        duplicates = []
+        for notification in Notification.objects.filter(subscription__in=to_notify).order_by("pk"):
+            if notification.subscription_id in existing:
+                duplicates.append(notification.pk)
+            else:
+                existing[notification.subscription_id] = notification
+        if duplicates:
+            LOG.error("Found %s duplicated notifications", len(duplicates))
+            Notification.objects.filter(pk__in=duplicates).delete()
+            LOG.info("Duplicates deleted.")
+
+        notifications = _build_notifications(to_notify, content, sender)
+        new_notifications = []
+        reused_notifications = {}
+        for subscription in to_notify:
+            notification = notifications[subscription.pk]
+            if subscription.pk in existing:
+                # If there is already a notification, it is reused
+                notification.pk = existing[subscription.pk].pk
+                reused_notifications.setdefault((notification.url, notification.title), []).append(notification.pk)
+            else:
+                new_notifications.append(notification)
+
+        with _atomic_with_emails() as emails:
+            # the url and the title are usually the same for all the notifications about the same content
+            for (url, title), pks in reused_notifications.items():
+                Notification.objects.filter(pk__in=pks).update(
+                    content_type=content_type,
+                    object_id=content.pk,
+                    sender=sender,
+                    url=url,
+                    title=title,
+                    pubdate=content.pubdate,
+                    is_read=False,
+                )
+            _save_last_notifications(to_notify, notifications, new_notifications)
+
+            if send_email:
+                emails.extend((s, notifications[s.pk]) for s in to_notify if s.by_email)
+
     def build_notification(self, content, sender):
         # If there isn't a notification yet or the last one is read, we generate a new one.
         try:
@@ -192,7 +267,10 @@ class SingleNotificationMixin:
         no need for more precision
         """
         if self.last_notification is not None:
-            Notification.objects.filter(pk=self.last_notification.pk).update(is_read=True)
+            if Notification.objects.filter(pk=self.last_notification.pk, is_read=False).update(is_read=True):
+                from zds.utils.header_notifications import invalidate_header_counters
+
+                invalidate_header_counters([self.user_id])
 
 
 class MultipleNotificationsMixin:
@@ -211,13 +289,37 @@ class MultipleNotificationsMixin:
             return
 
         notification = self.build_notification(content, sender)
-        with transaction.atomic():
+        with _atomic_with_emails() as emails:
             notification.save()
             self.last_notification = notification
             self.save()
 
-        if send_email and self.by_email:
-            self.send_email(notification)
+            if send_email and self.by_email:
+                emails.append((self, notification))
+
+    @classmethod
+    def send_notifications(cls, subscriptions, content=None, send_email=True, sender=None):
+        """
+        Same as ``send_notification()``, for all the given subscriptions at once: the number of queries does not
+        depend on the number of subscriptions.
+
+        :param subscriptions: the subscriptions to notify
+        :type subscriptions: django.db.models.QuerySet
+        :param content:  the content the notification is about
+        :param sender: the user whose action triggered the notification
+        :param send_email : whether an email must be sent if the subscription by email is active
+        """
+        subscriptions = subscriptions.select_related("user", "last_notification")
+        to_notify = [s for s in subscriptions if not s.last_notification or s.last_notification.is_read]
+        if not to_notify:
+            return
+
+        notifications = _build_notifications(to_notify, content, sender)
+        with _atomic_with_emails() as emails:
+            _save_last_notifications(to_notify, notifications, list(notifications.values()))
+
+            if send_email:
+                emails.extend((s, notifications[s.pk]) for s in to_notify if s.by_email)
 
     def build_notification(self, content, sender):
         notification = Notification(subscription=self, content_object=content, sender=sender)
@@ -267,6 +369,82 @@ class MultipleNotificationsMixin:
             LOG.exception("Could not save %s", notification)
 
 
+@contextlib.contextmanager
+def _atomic_with_emails():
+    """Save notifications in a transaction, and send the emails about them (as ``(subscription, notification)`` pairs
+    added to the yielded list).
+
+    If the email outbox is enabled, the emails are queued in the transaction, so only if the notifications are saved.
+    Otherwise, they are sent after it, so that the transaction is not kept open while talking to the SMTP server.
+    """
+    emails = []
+    queue_emails = settings.ZDS_APP["notification"]["email_outbox"]["enabled"]
+    with transaction.atomic():
+        yield emails
+        if queue_emails:
+            for subscription, notification in emails:
+                subscription.send_email(notification)
+    if not queue_emails:
+        for subscription, notification in emails:
+            subscription.send_email(notification)
+
+
+def _build_notifications(subscriptions, content, sender):
+    """Build (without saving them) the notifications of the given subscriptions about a content.
+
+    :return: the notifications, by subscription pk
+    :rtype: dict
+    """
+    notifications = {}
+    titles = {}
+    for subscription in subscriptions:
+        # the title usually depends on the followed object, so only compute it once per object
+        key = (subscription.content_type_id, subscription.object_id)
+        if key not in titles:
+            titles[key] = subscription.get_notification_title(content)
+        notification = Notification(subscription=subscription, content_object=content, sender=sender)
+        notification.url = subscription.get_notification_url(content)
+        notification.title = titles[key]
+        notification.pubdate = content.pubdate
+        notification.is_read = False
+        notifications[subscription.pk] = notification
+    return notifications
+
+
+def _save_last_notifications(subscriptions, notifications, new_notifications):
+    """Create the new notifications and make the notifications the last ones of their subscriptions, with a constant
+    number of queries.
+
+    :param subscriptions: the subscriptions
+    :param notifications: their notifications, by subscription pk
+    :type notifications: dict
+    :param new_notifications: the notifications to create
+    :type new_notifications: list
+    """
+    if new_notifications:
+        Notification.objects.bulk_create(new_notifications)
+        # not all database backends set the pk of the created objects
+        created_pks = (
+            Notification.objects.filter(subscription__in=[n.subscription_id for n in new_notifications])
+            .values("subscription_id")
+            .annotate(last_pk=models.Max("pk"))
+            .values_list("subscription_id", "last_pk")
+        )
+        for subscription_pk, notification_pk in created_pks:
+            notifications[subscription_pk].pk = notification_pk
+
+    for subscription in subscriptions:
+        subscription.last_notification = notifications[subscription.pk]
+    Subscription.objects.bulk_update(subscriptions, ["last_notification"])
+
+    # bulk operations do not send the post_save signal
+    from zds.notification.api.views import change_api_notification_updated_at
+    from zds.utils.header_notifications import invalidate_header_counters
+
+    change_api_notification_updated_at()
+    invalidate_header_counters([subscription.user_id for subscription in subscriptions])
+
+
 class AnswerSubscription(Subscription):
     """
     Subscription to new answer, either in a topic, a article or a tutorial
@@ -440,6 +618,28 @@ class Notification(models.Model):
         return Notification.has_read_permission(request) and self.subscription.user == request.user
 
 
+class QueuedEmail(models.Model):
+    """
+    An email waiting to be sent by the ``process_email_outbox`` command, so that sending emails does not slow down
+    the requests triggering them. Sent emails are deleted.
+    """
+
+    class Meta:
+        verbose_name = _("Courriel en attente")
+        verbose_name_plural = _("Courriels en attente")
+
+    recipient = models.ForeignKey(User, related_name="queued_emails", on_delete=models.CASCADE)
+    subject = models.CharField(_("Sujet"), max_length=255)
+    message_txt = models.TextField(_("Message (texte)"))
+    message_html = models.TextField(_("Message (HTML)"))
+    created = models.DateTimeField(_("Date de création"), auto_now_add=True, db_index=True)
+    send_after = models.DateTimeField(_("Ne pas envoyer avant"), null=True, blank=True, default=None, db_index=True)
+    attempts = models.PositiveIntegerField(_("Nombre de tentatives d'envoi"), default=0)
+
+    def __str__(self):
+        return f'<Courriel "{self.subject}" pour {self.recipient.username}>'
+
+
 class TopicFollowed(models.Model):
     """
     This model tracks which user follows which topic.
@@ -9,7 +9,7 @@ except ImportError:
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.db import DatabaseError
-from django.db.models.signals import post_save, m2m_changed, pre_delete
+from django.db.models.signals import post_delete, post_save, m2m_changed, pre_delete
 from django.dispatch import receiver
 
 from zds.forum.models import Topic, Post, Forum
@@ -30,7 +30,8 @@ import zds.notification.signals as notification_signals
 from zds.tutorialv2.models.database import PublishableContent, ContentReaction
 import zds.tutorialv2.signals as tuto_signals
 import zds.utils.signals as utils_signals
-from zds.utils.models import Tag
+from zds.utils.header_notifications import invalidate_alerts_counter, invalidate_header_counters
+from zds.utils.models import Alert, Tag
 
 logger = logging.getLogger(__name__)
 
@@ -128,7 +129,7 @@ def mark_topic_notifications_read(sender, *, instance, user, **__):
     notifications = list(
         Notification.objects.filter(
             subscription__user=user, object_id=instance.pk, content_type__pk=content_type.pk, is_read=False
-        )
+        ).select_related("subscription")
     )
 
     for notification in notifications:
@@ -260,14 +261,15 @@ def edit_topic_event(sender, *, topic, **kwargs):
 
 def _handle_added_tags(tag_content_type, topic):
     for tag in topic.tags.all():
-        subscriptions = NewTopicSubscription.objects.filter(
-            object_id=tag.id, content_type__pk=tag_content_type.pk, is_active=True
+        subscriptions = (
+            NewTopicSubscription.objects.filter(
+                object_id=tag.id, content_type__pk=tag_content_type.pk, is_active=True
+            ).exclude(user=topic.author)
+            # ignore the subscriptions already notified about this topic ("subscription" names their notifications)
+            .exclude(subscription__object_id=topic.id)
         )
-        for subscription in subscriptions:
-            notification = Notification.objects.filter(object_id=topic.id, subscription=subscription)
-            if not notification:
-                if subscription.user != topic.author and topic.forum.can_read(subscription.user):
-                    subscription.send_notification(content=topic, sender=topic.author)
+        subscriptions = topic.forum.filter_readable_by(subscriptions, "user")
+        NewTopicSubscription.send_notifications(subscriptions, content=topic, sender=topic.author)
 
 
 def _handle_deleted_tags(topic, topic_content_type):
@@ -303,7 +305,9 @@ def _handle_private_forum_moving(topic, topic_content_type, post_content_type):
     # If the topic is moved to a forum followed by the user, we update the subscription of the notification.
     # Otherwise, we update the notification as dead.
     notifications = list(
-        Notification.objects.filter(object_id=topic.pk, content_type__pk=topic_content_type.pk, is_read=False).all()
+        Notification.objects.filter(
+            object_id=topic.pk, content_type__pk=topic_content_type.pk, is_read=False
+        ).select_related("subscription")
     )
     for notification in notifications:
         subscription = notification.subscription
@@ -327,10 +331,9 @@ def new_topic_event(sender, *, instance, created=True, **__):
     if created:
         topic = instance
 
-        subscriptions = NewTopicSubscription.objects.get_subscriptions(topic.forum)
-        for subscription in subscriptions:
-            if subscription.user != topic.author and topic.forum.can_read(subscription.user):
-                subscription.send_notification(content=topic, sender=topic.author)
+        subscriptions = NewTopicSubscription.objects.get_subscriptions(topic.forum).exclude(user=topic.author)
+        subscriptions = topic.forum.filter_readable_by(subscriptions, "user")
+        NewTopicSubscription.send_notifications(subscriptions, content=topic, sender=topic.author)
 
 
 @receiver(post_save, sender=Post)
@@ -346,10 +349,8 @@ def answer_topic_event(sender, *, instance, created=True, **__):
     if created:
         post = instance
 
-        subscription_list = TopicAnswerSubscription.objects.get_subscriptions(post.topic)
-        for subscription in subscription_list:
-            if subscription.user != post.author:
-                subscription.send_notification(content=post, sender=post.author)
+        subscriptions = TopicAnswerSubscription.objects.get_subscriptions(post.topic).exclude(user=post.author)
+        TopicAnswerSubscription.send_notifications(subscriptions, content=post, sender=post.author)
 
         # Follow topic on answering
         TopicAnswerSubscription.objects.get_or_create_active(post.author, post.topic)
@@ -519,3 +520,26 @@ def ping_event(sender, *, instance, user, **__):
 def unping_event(sender, instance, user, **_):
     if user:
         PingSubscription.objects.deactivate_subscriptions(user, instance)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+@disable_for_loaddata
+def update_header_counters(sender, *, instance, **__):
+    # notifications saved in a loop should be fetched along with their subscription, so that this query is avoided
+    if Notification.subscription.is_cached(instance):
+        user_pks = [instance.subscription.user_id]
+    else:
+        user_pks = Subscription.objects.filter(pk=instance.subscription_id).values_list("user_id", flat=True)
+    invalidate_header_counters(user_pks)
+
+
+@receiver(post_delete, sender=User)
+def forget_header_counters(sender, *, instance, **__):
+    invalidate_header_counters([instance.pk])
+
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+def update_header_alerts_counter(sender, **__):
+    invalidate_alerts_counter()
@@ -1,11 +1,15 @@
 import copy
 from datetime import datetime, timedelta
+from smtplib import SMTPException
+from unittest.mock import patch
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
 from django.core import mail
 from django.urls import reverse
 from django.test import TestCase
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.core.management import call_command
 
 from django.conf import settings
 from zds.forum.tests.factories import (
@@ -28,6 +32,7 @@ from zds.notification.models import (
     PrivateTopicAnswerSubscription,
     NewTopicSubscription,
     NewPublicationSubscription,
+    QueuedEmail,
 )
 from zds.tutorialv2.tests.factories import (
     PublishableContentFactory,
@@ -148,6 +153,37 @@ class NotificationForumTest(TestCase):
         )
         self.assertTrue(subscription.is_active)
 
+    def test_send_notifications_in_bulk(self):
+        """
+        The number of queries needed to notify the subscribers of a topic does not depend on their number.
+        """
+        topic = TopicFactory(forum=self.forum11, author=self.user2)
+        PostFactory(topic=topic, author=self.user2, position=1)
+
+        def notify_subscribers(number):
+            for __ in range(number):
+                TopicAnswerSubscription.objects.get_or_create_active(ProfileFactory().user, topic)
+            post = PostFactory(topic=topic, author=self.user2, position=2)
+            # mark everything as read, to notify everybody again
+            Notification.objects.update(is_read=True)
+            subscriptions = TopicAnswerSubscription.objects.get_subscriptions(topic).exclude(user=self.user2)
+            with CaptureQueriesContext(connection) as queries:
+                TopicAnswerSubscription.send_notifications(subscriptions, content=post, sender=self.user2)
+            return post, len(queries)
+
+        post, few_subscribers_queries = notify_subscribers(2)
+        post, many_subscribers_queries = notify_subscribers(10)
+        self.assertEqual(few_subscribers_queries, many_subscribers_queries)
+
+        # one (reused) notification per subscription
+        subscriptions = TopicAnswerSubscription.objects.get_subscriptions(topic).exclude(user=self.user2)
+        self.assertEqual(subscriptions.count(), 12)
+        for subscription in subscriptions:
+            notification = Notification.objects.get(subscription=subscription)
+            self.assertEqual(subscription.last_notification, notification)
+            self.assertEqual(notification.content_object, post)
+            self.assertFalse(notification.is_read)
+
     def test_notification_read(self):
         """
         When we post on a topic, a notification is created for each subscriber. We can
@@ -979,3 +1015,70 @@ class NotificationTest(TestCase):
         self.assertEqual(0, len(notifications))
 
         self.assertTrue(Topic.objects.get(pk=topic.pk).is_read)
+
+    def test_emails_are_sent_after_the_transaction(self):
+        topic = TopicFactory(forum=create_category_and_forum()[1], author=self.user2)
+        PostFactory(topic=topic, author=self.user2, position=1)
+        TopicAnswerSubscription.objects.get_or_create_active(self.user1, topic).activate_email()
+        # the test case itself runs in a transaction
+        savepoints_count = len(connection.savepoint_ids)
+        savepoints_counts_when_sending = []
+
+        def send_messages(backend, messages):
+            savepoints_counts_when_sending.append(len(connection.savepoint_ids))
+            return len(messages)
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", send_messages):
+            PostFactory(topic=topic, author=self.user2, position=2)
+
+        self.assertEqual(savepoints_counts_when_sending, [savepoints_count])
+
+
+outbox_zds_app = copy.deepcopy(settings.ZDS_APP)
+outbox_zds_app["notification"]["email_outbox"]["enabled"] = True
+outbox_zds_app["notification"]["email_outbox"]["coalesce_window"] = 0
+
+
+@override_settings(ZDS_APP=outbox_zds_app)
+class EmailOutboxTest(TestCase):
+    def setUp(self):
+        self.user1 = ProfileFactory().user
+        self.user2 = ProfileFactory().user
+        self.topic = TopicFactory(forum=create_category_and_forum()[1], author=self.user2)
+        PostFactory(topic=self.topic, author=self.user2, position=1)
+        TopicAnswerSubscription.objects.get_or_create_active(self.user1, self.topic).activate_email()
+
+    def test_emails_are_queued_and_coalesced(self):
+        PostFactory(topic=self.topic, author=self.user2, position=2)
+        Notification.objects.update(is_read=True)
+        PostFactory(topic=self.topic, author=self.user2, position=3)
+
+        # nothing is sent in the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.filter(recipient=self.user1).count(), 2)
+
+        call_command("process_email_outbox", "--once")
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user1.email])
+        self.assertIn(self.topic.title, mail.outbox[0].body)
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_failed_emails_are_retried_later(self):
+        PostFactory(topic=self.topic, author=self.user2, position=2)
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=SMTPException):
+            call_command("process_email_outbox", "--once")
+
+        queued_email = QueuedEmail.objects.get(recipient=self.user1)
+        self.assertEqual(queued_email.attempts, 1)
+        self.assertGreater(queued_email.send_after, datetime.now())
+
+        # not yet
+        call_command("process_email_outbox", "--once")
+        self.assertEqual(len(mail.outbox), 0)
+
+        QueuedEmail.objects.update(send_after=datetime.now())
+        call_command("process_email_outbox", "--once")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(QueuedEmail.objects.exists())
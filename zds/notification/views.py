@@ -1,15 +1,18 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.utils.translation import gettext_lazy as _
-from django.shortcuts import redirect
+from django.shortcuts import redirect, render
 from django.urls import reverse
 
 from django.conf import settings
 from zds.mp.models import PrivateTopic
 from zds.notification.models import Notification
+from zds.utils.header_notifications import HEADER_LISTS, get_header_list, invalidate_header_counters
 from zds.utils.paginator import ZdSPagingListView
 from zds.forum.models import Post
 from zds.tutorialv2.models.database import ContentReaction
@@ -61,7 +64,22 @@ def mark_notifications_as_read(request):
             mark_content_read(notification.content_object.related_content, request.user)
 
     notifications.update(is_read=True)
+    invalidate_header_counters([request.user.pk])
 
     messages.success(request, _("Vos notifications ont bien été marquées comme lues."))
 
     return redirect(reverse("notification:list"))
+
+
+@login_required
+def header_dropdown(request, kind):
+    """
+    Render the items of one of the dropdowns of the header (private messages, notifications or alerts), which are
+    only loaded when the dropdown is opened.
+    """
+    if kind not in HEADER_LISTS:
+        raise Http404
+    items = get_header_list(request.user, kind)
+    if items is None:
+        raise PermissionDenied
+    return render(request, "notification/header_dropdown.html", {"kind": kind, "items": items})
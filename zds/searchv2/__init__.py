@@ -1,8 +1,12 @@
-from elasticsearch import TransportError
+import time
+
+from elasticsearch import Transport, TransportError
 from elasticsearch_dsl.connections import connections
 
 from django.conf import settings
 
+from zds.utils.profiling import record_call
+
 DEFAULT_ES_CONNECTIONS = {
     "default": {
         "hosts": ["localhost:9200"],
@@ -13,18 +17,30 @@ CONNECTIONS = getattr(settings, "ES_CONNECTIONS", DEFAULT_ES_CONNECTIONS)
 ENABLED = getattr(settings, "ES_ENABLED", False)
 
 
+class ProfiledTransport(Transport):
+    """Transport which records the duration of the requests to Elasticsearch (see ``zds.utils.profiling``)."""
+
+    def perform_request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().perform_request(*args, **kwargs)
+        finally:
+            record_call("es", time.perf_counter() - start)
+
+
 def setup_es_connections():
     """Create connection(s) to Elasticsearch from parameters defined in the settings.
 
     CONNECTIONS is a dict, where the keys are connection aliases and the values are parameters to the
     ``elasticsearch_dsl.connections.connection.create_connection()`` function (which are directly passed to an
     Elasticsearch object, see http://elasticsearch-py.readthedocs.io/en/master/api.html#elasticsearch for the options).
+    Unless another one is given, the requests go through ``ProfiledTransport``.
 
     """
 
     try:
         for alias, params in list(CONNECTIONS.items()):
-            connections.create_connection(alias, **params)
+            connections.create_connection(alias, **dict({"transport_class": ProfiledTransport}, **params))
     except TransportError:
         pass
 
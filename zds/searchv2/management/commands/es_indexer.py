@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from zds.searchv2.models import ESIndexManager, NeedIndex, get_django_indexable_objects
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Launch an indexer that pushes the changes (deletions, flagged objects...) to Elasticsearch within seconds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Push the pending changes, then stop instead of waiting for new ones.",
+        )
+
+    def handle(self, *args, **options):
+        self.index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+        self.models = get_django_indexable_objects()
+
+        while True:
+            close_old_connections()
+            try:
+                pushed = self.push_changes()
+            except NeedIndex:
+                logger.warning("The index does not exist, run `python manage.py es_manager index_all` first.")
+                pushed = 0
+            except:
+                logger.exception("Exception during one es_indexer run.")
+                pushed = 0
+
+            if options["once"]:
+                break
+            if not pushed:
+                time.sleep(settings.ZDS_APP["search"]["indexer_poll_interval"])
+
+    def push_changes(self):
+        """Push the recorded changes first (in their order), then index the flagged objects.
+
+        :return: the number of changes and objects pushed
+        :rtype: int
+        """
+
+        if not self.index_manager.connected_to_es:
+            return 0
+
+        pushed = self.index_manager.process_pending_changes()
+        for model in self.models:
+            pushed += self.index_manager.es_bulk_indexing_of_model(model) or 0
+        return pushed
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 
-from zds.searchv2.models import ESIndexManager, get_django_indexable_objects
+from zds.searchv2.models import ESIndexChange, ESIndexManager, get_django_indexable_objects
 from zds.tutorialv2.models.database import FakeChapter
 
 
@@ -58,7 +58,12 @@ class Command(BaseCommand):
     def index_documents(self, force_reindexing=False):
 
         if force_reindexing:
+            ESIndexChange.objects.all().delete()  # everything will be indexed again anyway
             self.setup_es()  # remove all previous data
+        else:
+            # push the deletions and partial updates first, if the es_indexer command does not run
+            while self.index_manager.process_pending_changes():
+                pass
 
         for model in self.models:
             if model is FakeChapter:
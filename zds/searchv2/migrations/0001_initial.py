@@ -0,0 +1,39 @@
+# Generated by Django 3.2.14 on 2026-10-18 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ESIndexChange",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("update", "Mise à jour partielle"),
+                            ("delete", "Suppression"),
+                            ("delete_by_query", "Suppression par requête"),
+                        ],
+                        max_length=20,
+                        verbose_name="Action",
+                    ),
+                ),
+                ("document_type", models.CharField(max_length=80, verbose_name="Type de document")),
+                ("document_id", models.CharField(blank=True, max_length=80, verbose_name="Identifiant du document")),
+                ("body", models.JSONField(blank=True, default=None, null=True, verbose_name="Contenu")),
+                ("date", models.DateTimeField(auto_now_add=True, verbose_name="Date")),
+            ],
+            options={
+                "verbose_name": "Modification à envoyer à ES",
+                "verbose_name_plural": "Modifications à envoyer à ES",
+            },
+        ),
+    ]
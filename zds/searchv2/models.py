@@ -1,5 +1,6 @@
 from functools import partial
 import logging
+import threading
 import time
 
 from django.apps import apps
@@ -217,22 +218,101 @@ class AbstractESDjangoIndexable(AbstractESIndexable, models.Model):
 
         self.es_flagged = kwargs.pop("es_flagged", True)
 
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        self.es_id = str(self.pk)  # the pk is only known now for a new object
+        return result
+
+
+class ESIndexChange(models.Model):
+    """A change to push to ES that cannot wait for the next indexing of the flagged objects (e.g. because the object is
+    deleted). Changes are recorded during the requests, then pushed in the order they were recorded by
+    ``ESIndexManager.process_pending_changes()`` (see the ``es_indexer`` command).
+    """
+
+    class Meta:
+        verbose_name = "Modification à envoyer à ES"
+        verbose_name_plural = "Modifications à envoyer à ES"
+
+    ACTIONS = (
+        ("update", "Mise à jour partielle"),
+        ("delete", "Suppression"),
+        ("delete_by_query", "Suppression par requête"),
+    )
+
+    action = models.CharField("Action", max_length=20, choices=ACTIONS)
+    document_type = models.CharField("Type de document", max_length=80)
+    document_id = models.CharField("Identifiant du document", max_length=80, blank=True)
+    # fields to update (for ``update``) or query (for ``delete_by_query``)
+    body = models.JSONField("Contenu", null=True, blank=True, default=None)
+    date = models.DateTimeField("Date", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.action} {self.document_type} {self.document_id}"
+
+    def get_es_bulk_action(self, index):
+        """Create the action for a ``_bulk`` operation (not available for ``delete_by_query``).
+
+        :param index: the index
+        :type index: str
+        :rtype: dict
+        """
+
+        document = {"_op_type": self.action, "_index": index, "_type": self.document_type, "_id": self.document_id}
+        if self.action == "update":
+            document["doc"] = self.body
+        return document
+
+
+def record_es_change(action, document_type, document_id="", body=None):
+    """Record a change to push to ES (see ``ESIndexChange``), so that it is not done during the request.
+
+    :param action: either "update", "delete" or "delete_by_query"
+    :type action: str
+    :param document_type: the type of the document(s)
+    :type document_type: str
+    :param document_id: the id of the document (for "update" and "delete")
+    :type document_id: str
+    :param body: the fields to update (for "update") or the query (for "delete_by_query")
+    :type body: dict
+    """
+
+    if settings.ES_ENABLED:
+        ESIndexChange.objects.create(action=action, document_type=document_type, document_id=document_id, body=body)
 
 
 def delete_document_in_elasticsearch(instance):
-    """Delete a ESDjangoIndexable from ES database.
+    """Delete a ESDjangoIndexable from ES database (asynchronously, see ``record_es_change()``).
     Must be implemented by all classes that derive from AbstractESDjangoIndexable.
 
     :param instance: the document to delete
     :type instance: AbstractESIndexable
     """
 
-    index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+    record_es_change("delete", instance.get_es_document_type(), instance.es_id)
+
 
-    if index_manager.index_exists:
-        index_manager.delete_document(instance)
-        index_manager.refresh_index()
+def update_document_in_elasticsearch(instance, doc):
+    """Update given fields of a document in ES database (asynchronously, see ``record_es_change()``).
+
+    :param instance: the document
+    :type instance: AbstractESIndexable
+    :param doc: fields to update
+    :type doc: dict
+    """
+
+    record_es_change("update", instance.get_es_document_type(), instance.es_id, doc)
+
+
+def delete_by_query_in_elasticsearch(doc_type, query):
+    """Delete the documents matching a query from ES database (asynchronously, see ``record_es_change()``).
+
+    :param doc_type: the document type
+    :type doc_type: str
+    :param query: the query to match all document to be deleted
+    :type query: elasticsearch_dsl.query.Query
+    """
+
+    record_es_change("delete_by_query", doc_type, body=query.to_dict())
 
 
 def get_django_indexable_objects():
@@ -246,6 +326,151 @@ class NeedIndex(Exception):
     pass
 
 
+class ESHealthState:
+    """Process-wide knowledge about the availability of an ES cluster (and of its indices), shared by all the
+    managers using the same connection.
+
+    + The first check is synchronous, then the state is considered fresh for ``health_check_ttl`` seconds.
+      Once this delay is expired, the state is refreshed in a background thread while the previous one is still used.
+    + If the cluster cannot be reached, the circuit is opened: the cluster is considered as unavailable without
+      any network round-trip for ``unavailable_retry_delay`` seconds. Then, a single caller tries again.
+    """
+
+    def __init__(self, es):
+        """
+        :param es: the connection to the cluster
+        :type es: elasticsearch.Elasticsearch
+        """
+
+        self.es = es
+        self.available = False
+        self.checked_at = None
+        self.retry_at = 0
+        self.indices = {}
+
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self):
+        """Ping the cluster and update the state accordingly."""
+
+        try:
+            self.es.info()
+        except ConnectionError:
+            self.mark_unavailable()
+        else:
+            if not self.available:
+                self.logger.info("connected to ES cluster")
+            self.available = True
+            self.indices = {}
+            self.checked_at = time.monotonic()
+
+    def mark_unavailable(self):
+        """Open the circuit: the cluster will not be contacted again before ``unavailable_retry_delay`` seconds."""
+
+        if self.available or self.checked_at is None:
+            self.logger.warning("failed to connect to ES cluster")
+
+        now = time.monotonic()
+        self.available = False
+        self.indices = {}
+        self.checked_at = now
+        self.retry_at = now + settings.ZDS_APP["search"]["unavailable_retry_delay"]
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def is_available(self):
+        """Check if the cluster is available, contacting it only if the known state is too old.
+
+        :rtype: bool
+        """
+
+        if self.checked_at is None:
+            with self._lock:
+                if self.checked_at is None:
+                    self.refresh()
+        elif not self.available:
+            if time.monotonic() >= self.retry_at and self._lock.acquire(blocking=False):
+                try:
+                    if time.monotonic() >= self.retry_at:
+                        self.refresh()
+                finally:
+                    self._lock.release()
+        elif time.monotonic() - self.checked_at > settings.ZDS_APP["search"]["health_check_ttl"]:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+
+        return self.available
+
+    def index_exists(self, index):
+        """Check if a given index exists, the answer being cached until the next refresh of the state.
+
+        :param index: the index name
+        :type index: str
+        :rtype: bool
+        """
+
+        if not self.is_available():
+            return False
+
+        if index not in self.indices:
+            try:
+                self.indices[index] = self.es.indices.exists(index)
+            except ConnectionError:
+                self.mark_unavailable()
+                return False
+
+        return self.indices[index]
+
+
+_health_states = {}
+_index_managers = {}
+_registry_lock = threading.RLock()
+
+
+def get_health_state(connection_alias="default"):
+    """Get the (process-wide) health state of a given connection.
+
+    :param connection_alias: the alias for connection
+    :type connection_alias: str
+    :rtype: ESHealthState
+    """
+
+    with _registry_lock:
+        if connection_alias not in _health_states:
+            _health_states[connection_alias] = ESHealthState(connections.get_connection(alias=connection_alias))
+        return _health_states[connection_alias]
+
+
+def get_index_manager(name=None, shards=5, replicas=0, connection_alias="default"):
+    """Get the (process-wide) manager of a given index, creating it if needed.
+
+    Unlike a direct instantiation of ``ESIndexManager``, this is meant to be used in the request path: the manager,
+    its connection pool and the health state of the cluster are reused from one request to another.
+    Without parameters, the manager of ``settings.ES_SEARCH_INDEX`` is returned.
+
+    :rtype: ESIndexManager
+    """
+
+    if name is None:
+        return get_index_manager(**settings.ES_SEARCH_INDEX)
+
+    key = (settings.ES_ENABLED, name, shards, replicas, connection_alias)
+
+    with _registry_lock:
+        if key not in _index_managers:
+            _index_managers[key] = ESIndexManager(name, shards, replicas, connection_alias)
+        return _index_managers[key]
+
+
 class ESIndexManager:
     """Manage a given index with different taylor-made functions"""
 
@@ -263,7 +488,6 @@ class ESIndexManager:
         """
 
         self.index = name
-        self.index_exists = False
 
         self.number_of_shards = shards
         self.number_of_replicas = replicas
@@ -271,23 +495,28 @@ class ESIndexManager:
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}:{self.index}")
 
         self.es = None
-        self.connected_to_es = False
+        self.health = None
 
         if settings.ES_ENABLED:
-            self.es = connections.get_connection(alias=connection_alias)
-            self.connected_to_es = True
+            self.health = get_health_state(connection_alias)
+            self.es = self.health.es
 
-            # test connection:
-            try:
-                self.es.info()
-            except ConnectionError:
-                self.connected_to_es = False
-                self.logger.warn("failed to connect to ES cluster")
-            else:
-                self.logger.info("connected to ES cluster")
+    @property
+    def connected_to_es(self):
+        """Whether the cluster is reachable (see ``ESHealthState.is_available()``)."""
+
+        return self.health is not None and self.health.is_available()
+
+    @property
+    def index_exists(self):
+        """Whether the index exists (see ``ESHealthState.index_exists()``)."""
 
-            if self.connected_to_es:
-                self.index_exists = self.es.indices.exists(self.index)
+        return self.health is not None and self.health.index_exists(self.index)
+
+    @index_exists.setter
+    def index_exists(self, value):
+        if self.health is not None:
+            self.health.indices[self.index] = value
 
     def clear_es_index(self):
         """Clear index"""
@@ -621,6 +850,65 @@ class ESIndexManager:
             self.es.delete(**arguments)
             self.logger.info(f"delete {document.get_es_document_type()} with id {document.es_id}")
 
+    def process_pending_changes(self, batch_size=None):
+        """Push the oldest recorded changes (see ``ESIndexChange``) to the index, then forget them.
+
+        Changes are applied in the order they were recorded. The deletions and partial updates are sent with
+        ``parallel_bulk``, but a document never appears twice in the same bulk, so that the changes of a given
+        document are still applied in order.
+
+        :param batch_size: maximum number of changes to push (``ZDS_APP["search"]["indexer_batch_size"]`` by default)
+        :type batch_size: int
+        :return: the number of processed changes
+        :rtype: int
+        """
+
+        if not self.connected_to_es:
+            return 0
+
+        batch_size = batch_size or settings.ZDS_APP["search"]["indexer_batch_size"]
+        changes = list(ESIndexChange.objects.order_by("pk")[:batch_size])
+        if not changes:
+            return 0
+
+        if self.index_exists:  # otherwise, there is nothing to delete or update
+            bulk_changes = []
+            for change in changes:
+                if change.action == "delete_by_query":
+                    self._bulk_apply_changes(bulk_changes)
+                    bulk_changes = []
+                    self.delete_by_query(change.document_type, change.body)
+                else:
+                    bulk_changes.append(change)
+            self._bulk_apply_changes(bulk_changes)
+
+        ESIndexChange.objects.filter(pk__in=[change.pk for change in changes]).delete()
+        return len(changes)
+
+    def _bulk_apply_changes(self, changes):
+        # the n-th change of each document goes in the n-th bulk
+        bulks = []
+        positions = {}
+        for change in changes:
+            key = (change.document_type, change.document_id)
+            position = positions.get(key, 0)
+            positions[key] = position + 1
+            if position == len(bulks):
+                bulks.append([])
+            bulks[position].append(change.get_es_bulk_action(self.index))
+
+        for actions in bulks:
+            for ok, hit in parallel_bulk(self.es, actions, raise_on_error=False, request_timeout=30):
+                action = list(hit.keys())[0]
+                if ok:
+                    self.logger.info("{} {} with id {}".format(action, hit[action]["_type"], hit[action]["_id"]))
+                elif hit[action].get("status") != 404:  # a document that was never indexed is not a problem
+                    self.logger.warning(
+                        "failed to {} {} with id {}: {}".format(
+                            action, hit[action]["_type"], hit[action]["_id"], hit[action].get("error")
+                        )
+                    )
+
     def delete_by_query(self, doc_type="", query=MatchAll()):
         """Perform a deletion trough the ``_delete_by_query`` API.
 
@@ -632,7 +920,7 @@ class ESIndexManager:
         :param doc_type: the document type
         :type doc_type: str
         :param query: the query to match all document to be deleted
-        :type query: elasticsearch_dsl.query.Query
+        :type query: elasticsearch_dsl.query.Query|dict
         """
 
         if not self.connected_to_es:
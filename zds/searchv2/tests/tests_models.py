@@ -1,13 +1,22 @@
+from unittest.mock import MagicMock, patch
+
+from elasticsearch import ConnectionError
 from elasticsearch_dsl import Search
 from elasticsearch_dsl.query import MatchAll
 
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from zds.forum.tests.factories import TopicFactory, PostFactory, Topic, Post
 from zds.forum.tests.factories import create_category_and_forum
 from zds.member.tests.factories import ProfileFactory, StaffProfileFactory
-from zds.searchv2.models import ESIndexManager
+from zds.searchv2.models import (
+    ESIndexChange,
+    ESIndexManager,
+    ESHealthState,
+    delete_document_in_elasticsearch,
+    get_index_manager,
+)
 from zds.tutorialv2.tests.factories import PublishableContentFactory, ContainerFactory, ExtractFactory, publish_content
 from zds.tutorialv2.models.database import PublishedContent, FakeChapter, PublishableContent
 from zds.tutorialv2.tests import TutorialTestMixin, override_for_contents
@@ -244,6 +253,7 @@ class ESIndexManagerTests(TutorialTestMixin, TestCase):
         # 5. Test that the deletion of an object also triggers its deletion in ES
         post = Post.objects.get(pk=post.pk)
         post.delete()
+        self.manager.process_pending_changes()
         self.manager.refresh_index()
 
         s = Search()
@@ -327,6 +337,7 @@ class ESIndexManagerTests(TutorialTestMixin, TestCase):
         first_publication = PublishedContent.objects.get(pk=first_publication.pk)
         self.assertTrue(first_publication.must_redirect)  # .. including the first one, for redirection
 
+        self.manager.process_pending_changes()
         self.manager.refresh_index()
 
         s = Search()
@@ -364,3 +375,105 @@ class ESIndexManagerTests(TutorialTestMixin, TestCase):
 
         # delete index:
         self.manager.clear_es_index()
+
+
+class ESHealthStateTests(TestCase):
+    def setUp(self):
+        self.es = MagicMock()
+        self.es.indices.exists.return_value = True
+        self.health = ESHealthState(self.es)
+
+    def test_state_is_cached(self):
+        self.assertTrue(self.health.is_available())
+        self.assertTrue(self.health.index_exists("zds_search"))
+        self.assertTrue(self.health.is_available())
+        self.assertTrue(self.health.index_exists("zds_search"))
+
+        self.assertEqual(self.es.info.call_count, 1)
+        self.assertEqual(self.es.indices.exists.call_count, 1)
+
+    def test_circuit_breaker(self):
+        self.es.info.side_effect = ConnectionError("N/A", "unreachable", None)
+
+        self.assertFalse(self.health.is_available())
+        self.assertFalse(self.health.index_exists("zds_search"))
+        self.assertFalse(self.health.is_available())
+        self.assertEqual(self.es.info.call_count, 1)  # no new attempt while the circuit is opened
+
+        # once the delay is expired, a new attempt is made
+        self.es.info.side_effect = None
+        with patch("zds.searchv2.models.time.monotonic", return_value=self.health.retry_at + 1):
+            self.assertTrue(self.health.is_available())
+        self.assertEqual(self.es.info.call_count, 2)
+
+    def test_index_manager_is_shared(self):
+        with patch("zds.searchv2.models.connections.get_connection", return_value=self.es), patch.dict(
+            "zds.searchv2.models._health_states", clear=True
+        ), patch.dict("zds.searchv2.models._index_managers", clear=True):
+            manager = get_index_manager(name="zds_search_shared_test")
+            self.assertIs(manager, get_index_manager(name="zds_search_shared_test"))
+            self.assertIsNot(manager, get_index_manager(name="zds_search_other_test"))
+
+
+@override_settings(ES_ENABLED=True)
+class ESIndexChangeTests(TestCase):
+    def setUp(self):
+        self.user = ProfileFactory().user
+        self.staff = StaffProfileFactory().user
+        _, self.forum = create_category_and_forum()
+
+    def test_changes_are_recorded(self):
+        topic = TopicFactory(forum=self.forum, author=self.user)
+        post = PostFactory(topic=topic, author=self.user, position=1)
+
+        post.hide_comment_by_user(self.staff, "Caché")
+        change = ESIndexChange.objects.get()
+        self.assertEqual(
+            ("update", "post", str(post.pk), {"is_visible": False}),
+            (change.action, change.document_type, change.document_id, change.body),
+        )
+
+        topic_id, post_id = str(topic.pk), str(post.pk)
+        topic.delete()  # and its post
+        self.assertEqual(
+            [("update", "post", post_id), ("delete", "post", post_id), ("delete", "topic", topic_id)],
+            [(c.action, c.document_type, c.document_id) for c in ESIndexChange.objects.order_by("pk")],
+        )
+
+        with override_settings(ES_ENABLED=False):
+            delete_document_in_elasticsearch(post)
+        self.assertEqual(3, ESIndexChange.objects.count())
+
+    def test_process_pending_changes(self):
+        ESIndexChange.objects.create(action="update", document_type="post", document_id="1", body={"is_visible": False})
+        ESIndexChange.objects.create(action="delete", document_type="post", document_id="1")
+        ESIndexChange.objects.create(action="delete", document_type="topic", document_id="1")
+        ESIndexChange.objects.create(action="delete_by_query", document_type="chapter", body={"match_all": {}})
+        ESIndexChange.objects.create(action="delete", document_type="post", document_id="2")
+
+        manager = ESIndexManager(name="zds_search_test")
+        manager.health = MagicMock()
+        manager.es = MagicMock()
+        bulks = []
+
+        def fake_parallel_bulk(es, actions, **kwargs):
+            bulks.append([(action["_op_type"], action["_type"], action["_id"]) for action in actions])
+            return [(True, {a["_op_type"]: {"_type": a["_type"], "_id": a["_id"]}}) for a in actions]
+
+        with patch("zds.searchv2.models.parallel_bulk", side_effect=fake_parallel_bulk):
+            self.assertEqual(5, manager.process_pending_changes())
+
+        # the changes of a given document are never sent in the same bulk, and the queries are done in order
+        self.assertEqual(
+            [
+                [("update", "post", "1"), ("delete", "topic", "1")],
+                [("delete", "post", "1")],
+                [("delete", "post", "2")],
+            ],
+            bulks,
+        )
+        manager.es.delete_by_query.assert_called_once_with(
+            index="zds_search_test", doc_type="chapter", body={"query": {"match_all": {}}}
+        )
+        self.assertFalse(ESIndexChange.objects.exists())
+        self.assertEqual(0, manager.process_pending_changes())
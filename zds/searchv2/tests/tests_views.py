@@ -203,6 +203,7 @@ class ViewsTests(TutorialTestMixin, TestCase):
 
         # 2. Hide, reindex and search again:
         post_1.hide_comment_by_user(self.staff, "Un abus de pouvoir comme un autre ;)")
+        self.manager.process_pending_changes()
         self.manager.refresh_index()
 
         result = self.client.get(
@@ -15,7 +15,7 @@ from django.views.generic import CreateView
 from django.views.generic.detail import SingleObjectMixin
 
 from zds.searchv2.forms import SearchForm
-from zds.searchv2.models import ESIndexManager
+from zds.searchv2.models import get_index_manager
 from zds.utils.paginator import ZdSPagingListView
 from zds.utils.templatetags.authorized_forums import get_authorized_forums
 from functools import reduce
@@ -30,7 +30,7 @@ class SimilarTopicsView(CreateView, SingleObjectMixin):
         """Overridden because the index manager must NOT be initialized elsewhere."""
 
         super().__init__(**kwargs)
-        self.index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+        self.index_manager = get_index_manager()
 
     def get(self, request, *args, **kwargs):
         if "q" in request.GET:
@@ -82,7 +82,7 @@ class SuggestionContentView(CreateView, SingleObjectMixin):
         """Overridden because the index manager must NOT be initialized elsewhere."""
 
         super().__init__(**kwargs)
-        self.index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+        self.index_manager = get_index_manager()
 
     def get(self, request, *args, **kwargs):
         if "q" in request.GET:
@@ -152,7 +152,7 @@ class SearchView(ZdSPagingListView):
         """Overridden because the index manager must NOT be initialized elsewhere."""
 
         super().__init__(**kwargs)
-        self.index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+        self.index_manager = get_index_manager()
 
     def get(self, request, *args, **kwargs):
         """Overridden to catch the request and fill the form."""
@@ -95,6 +95,8 @@ FILE_UPLOAD_HANDLERS = (
 )
 
 MIDDLEWARE = (
+    # Only used if ZDS_APP["profiling"]["enabled"] is set, first to profile the whole request.
+    "zds.middlewares.profilingmiddleware.ProfilingMiddleware",
     # CorsMiddleware needs to be before CommonMiddleware.
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
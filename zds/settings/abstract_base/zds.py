@@ -72,6 +72,14 @@ ZDS_APP = {
         "matomo_site_id": zds_config.get("matomo_site_id", 4),
         "matomo_url": zds_config.get("matomo_url", "https://matomo.zestedesavoir.com"),
         "matomo_token_auth": zds_config.get("matomo_token_auth", ""),
+        # hits waiting to be sent to Matomo: when the queue is full, a hit is either dropped at once ("drop") or after
+        # waiting at most `matomo_queue_timeout` seconds for a free slot ("block")
+        "matomo_queue_size": zds_config.get("matomo_queue_size", 10000),
+        "matomo_queue_full_policy": zds_config.get("matomo_queue_full_policy", "drop"),
+        "matomo_queue_timeout": zds_config.get("matomo_queue_timeout", 0.5),
+        # hits are sent by batches, as soon as a batch is full or `matomo_flush_interval` seconds after its first hit
+        "matomo_batch_size": zds_config.get("matomo_batch_size", 50),
+        "matomo_flush_interval": zds_config.get("matomo_flush_interval", 5),
         "association": {
             "name": "Zeste de Savoir",
             "email": "zestedesavoir@gmail.com",
@@ -138,6 +146,11 @@ ZDS_APP = {
         "users_in_hats_list": 5,
         "requested_hats_per_page": 100,
         "update_last_visit_interval": 600,  # seconds
+        # if enabled, the last visits are kept in the cache until `flush_last_visits` writes them, by batches, in the
+        # database (the cache must then be shared by all the processes)
+        "buffer_last_visits": False,
+        "pending_visits_timeout": 60 * 60 * 24,
+        "pending_visits_batch_size": 500,
     },
     "hats": {
         "moderation": "Staff",
@@ -167,6 +180,13 @@ ZDS_APP = {
         # or 'extra_content_generation_policy': 'NOTHING'
         "extra_content_generation_policy": "WATCHDOG",
         "extra_content_watchdog_dir": BASE_DIR / "watchdog-build",
+        # only render again the changed containers when publishing a new version of a content
+        "incremental_publication": True,
+        "extra_content_watchdog_poll_interval": 60,
+        # maximum number of events of a given format handled at the same time by the watchdog
+        "extra_content_watchdog_max_per_format": {"pdf": 1},
+        # events running for longer than that (in seconds) are considered as lost by a crashed watchdog
+        "extra_content_watchdog_stale_after": 2 * 60 * 60,
         "max_tree_depth": 3,
         "default_licence_pk": 7,
         "content_per_page": 42,
@@ -176,6 +196,14 @@ ZDS_APP = {
         "notes_per_page": 25,
         "helps_per_page": 20,
         "commits_per_page": 20,
+        # the number of commits of a history is cached for each head
+        "commits_count_timeout": 60 * 60 * 24 * 7,
+        "blob_index_cache_size": 64,
+        "manifest_cache": {
+            "local_size": 256,
+            "use_django_cache": False,
+            "timeout": 60 * 60 * 24,
+        },
         "suggestions_per_page": 2,
         "feed_length": 5,
         "user_page_number": 5,
@@ -207,6 +235,8 @@ ZDS_APP = {
         "top_tag_exclu": ["bug", "suggestion", "tutoriel", "beta", "article"],
         "greetings": ["salut", "bonjour", "yo ", "hello", "bon matin", "tout le monde se secoue"],
         "description_size": 120,
+        # the forums readable by each set of groups are cached (and invalidated when the groups change)
+        "permissions_timeout": 60 * 60 * 24,
     },
     "topic": {
         "home_number": 5,
@@ -221,11 +251,36 @@ ZDS_APP = {
     },
     "notification": {
         "per_page": 50,
+        # the unread counters displayed in the header are cached (and invalidated when they change)
+        "header_counters_timeout": 60 * 60,
+        "email_outbox": {
+            # if enabled, notification emails are sent by the process_email_outbox command
+            "enabled": False,
+            "batch_size": 100,
+            # the emails to the same recipient queued within this delay (in seconds) are sent as one message
+            "coalesce_window": 120,
+            "max_attempts": 5,
+            "retry_backoff": 60,
+            "poll_interval": 10,
+        },
+    },
+    "paginator": {"folding_limit": 4, "keyset_anchors_timeout": 60 * 60 * 24},
+    # record the SQL queries and the calls to zmarkdown and Elasticsearch of the last requests of each view
+    "profiling": {
+        "enabled": zds_config.get("profiling_enabled", False),
+        "samples_per_view": 100,
+        "timeout": 60 * 60 * 24,
     },
-    "paginator": {"folding_limit": 4},
+    # the Munin views serve the metrics computed by `update_munin_metrics`, computed again if older than this
+    "munin": {"metrics_max_age": 60 * 15},
     "search": {
         "mark_keywords": ["javafx", "haskell", "groovy", "powershell", "latex", "linux", "windows"],
         "results_per_page": 20,
+        "health_check_ttl": 30,
+        "unavailable_retry_delay": 15,
+        # the es_indexer command looks for changes to push every few seconds, and pushes them by batches
+        "indexer_poll_interval": 2,
+        "indexer_batch_size": 500,
         "search_groups": {
             "content": (_("Contenus publiés"), ["publishedcontent", "chapter"]),
             "topic": (_("Sujets du forum"), ["topic"]),
@@ -260,6 +315,18 @@ ZDS_APP = {
     },
     "visual_changes": [],
     "display_search_bar": True,
-    "zmd": {"server": "http://127.0.0.1:27272", "disable_pings": False},
+    "zmd": {
+        "server": "http://127.0.0.1:27272",
+        "disable_pings": False,
+        "pool_size": 10,
+        "timeouts": {"html": 10, "epub": 10, "tex": 120, "texfile": 120, "manifest": 120},
+        "retry_backoff": 0.1,
+        "batch_workers": 4,
+        "cache": {
+            "local_size": 1000,
+            "use_django_cache": False,
+            "timeout": 60 * 60 * 24,
+        },
+    },
     "very_top_banner": {},
 }
@@ -0,0 +1,31 @@
+import tempfile
+from pathlib import Path
+
+from .abstract_base import *
+from .abstract_test import *
+
+# Settings of `python -m benchmarks`: the contents are written in a temporary directory, and the stand-ins of the
+# zmarkdown server and of Elasticsearch are set up by the benchmarks themselves.
+
+BENCHMARKS_DIR = Path(tempfile.mkdtemp(prefix="zds-benchmarks-"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+ES_ENABLED = False
+
+MEDIA_ROOT = BENCHMARKS_DIR / "media"
+
+ZDS_APP["content"]["repo_private_path"] = BENCHMARKS_DIR / "contents-private"
+ZDS_APP["content"]["repo_public_path"] = BENCHMARKS_DIR / "contents-public"
+ZDS_APP["content"]["extra_content_watchdog_dir"] = BENCHMARKS_DIR / "watchdog-build"
+ZDS_APP["content"]["extra_content_generation_policy"] = "NOTHING"
+ZDS_APP["content"]["build_pdf_when_published"] = False
+# every rendering is measured, not the cache of the renderings
+ZDS_APP["zmd"]["cache"]["local_size"] = 0
+
+for logger in LOGGING["loggers"].values():
+    logger["level"] = "ERROR"
@@ -154,6 +154,10 @@ ZDS_APP["article"]["repo_path"] = "/opt/zds/data/articles-data"
 ZDS_APP["content"]["repo_private_path"] = "/opt/zds/data/contents-private"
 ZDS_APP["content"]["repo_public_path"] = "/opt/zds/data/contents-public"
 ZDS_APP["content"]["extra_content_generation_policy"] = "WATCHDOG"
+ZDS_APP["content"]["manifest_cache"]["use_django_cache"] = True
+ZDS_APP["zmd"]["cache"]["use_django_cache"] = True
+ZDS_APP["notification"]["email_outbox"]["enabled"] = True
+ZDS_APP["member"]["buffer_last_visits"] = True
 
 ZDS_APP["visual_changes"] = zds_config.get("visual_changes", [])
 
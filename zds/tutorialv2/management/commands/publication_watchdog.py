@@ -1,16 +1,111 @@
 import logging
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 
 from pathlib import Path
 
+from django.conf import settings
 from django.core.management import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Q
 
 from zds.tutorialv2.models.database import PublicationEvent
-from zds.tutorialv2.publication_utils import PublicatorRegistry, FailureDuringPublication
+from zds.tutorialv2.publication_utils import PublicatorRegistry, FailureDuringPublication, get_watchdog_marker_path
 
 logger = logging.getLogger(__name__)
 
 
+def claim_publication_event(excluded_formats=()):
+    """Atomically mark the oldest requested publication event as running and return it.
+
+    Events locked by another watchdog are skipped, so that several workers never handle the same event.
+
+    :param excluded_formats: formats that must not be claimed (e.g. because too many of them are already running)
+    :return: the claimed event, or ``None`` if there is nothing to do
+    :rtype: zds.tutorialv2.models.database.PublicationEvent
+    """
+    while True:
+        with transaction.atomic():
+            publication_event = (
+                PublicationEvent.objects.select_for_update(skip_locked=True)
+                .filter(state_of_processing="REQUESTED")
+                .exclude(format_requested__in=excluded_formats)
+                .order_by("date", "pk")
+                .first()
+            )
+            if publication_event is None:
+                return None
+
+            # on backends that do not support row locking, this update is what makes the claim atomic
+            claimed_date = datetime.now()
+            claimed = PublicationEvent.objects.filter(pk=publication_event.pk, state_of_processing="REQUESTED").update(
+                state_of_processing="RUNNING", claimed=claimed_date
+            )
+            if claimed:
+                publication_event.state_of_processing = "RUNNING"
+                publication_event.claimed = claimed_date
+                return publication_event
+
+
+def fail_stale_publication_events():
+    """Mark as failed the events claimed by a watchdog that crashed while handling them.
+
+    As several watchdogs may run at the same time, only the events running for longer than
+    ``extra_content_watchdog_stale_after`` seconds are considered lost.
+
+    :return: the number of failed events
+    :rtype: int
+    """
+    stale_after = timedelta(seconds=settings.ZDS_APP["content"]["extra_content_watchdog_stale_after"])
+    return PublicationEvent.objects.filter(
+        Q(claimed__isnull=True) | Q(claimed__lt=datetime.now() - stale_after), state_of_processing="RUNNING"
+    ).update(state_of_processing="FAILURE")
+
+
+def process_publication_event(publication_event_pk):
+    """Generate the format requested by a (claimed) publication event.
+
+    :param publication_event_pk: pk of the publication event
+    :type publication_event_pk: int
+    :return: the pk of the event and its final state
+    :rtype: tuple
+    """
+    publication_event = PublicationEvent.objects.select_related(
+        "published_object", "published_object__content", "published_object__content__image"
+    ).get(pk=publication_event_pk)
+    content = publication_event.published_object
+
+    try:
+        extra_content_dir = content.get_extra_contents_directory()
+        building_extra_content_path = Path(
+            str(Path(extra_content_dir).parent) + "__building", "extra_contents", content.content_public_slug
+        )
+        if not building_extra_content_path.exists():
+            building_extra_content_path.mkdir(parents=True, exist_ok=True)
+        base_name = str(building_extra_content_path)
+        md_file_path = base_name + ".md"
+
+        logger.info("Exporting « %s » as %s", content.title(), publication_event.format_requested)
+
+        publicator = PublicatorRegistry.get(publication_event.format_requested)
+        publicator.publish(md_file_path, base_name)
+    except:
+        # Update and save the publication state before logging, in case
+        # content.title() would raise an exception (it already used to
+        # happen!).
+        publication_event.state_of_processing = "FAILURE"
+        publication_event.save(update_fields=["state_of_processing"])
+        logger.exception("Failed to export « %s » as %s", content.title(), publication_event.format_requested)
+    else:
+        publication_event.state_of_processing = "SUCCESS"
+        publication_event.save(update_fields=["state_of_processing"])
+        logger.info("Succeed to export « %s » as %s", content.title(), publication_event.format_requested)
+
+    return publication_event.pk, publication_event.state_of_processing
+
+
 class Command(BaseCommand):
     help = "Launch a watchdog that generate all exported formats (epub, pdf...) files without blocking request handling"
 
@@ -20,59 +115,143 @@ class Command(BaseCommand):
             action="store_true",
             help="Do not wait forever for publication requests.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes generating the exported formats at the same time (default: 1, in process).",
+        )
 
     def handle(self, *args, **options):
-        # We mark running events as failure, in case this command failed while running
-        running_events = PublicationEvent.objects.filter(state_of_processing="RUNNING")
-        for publication_event in running_events.iterator():
-            publication_event.state_of_processing = "FAILURE"
-            publication_event.save()
+        # We mark running events as failure, in case a watchdog failed while running
+        fail_stale_publication_events()
 
-        while True:
-            requested_events = PublicationEvent.objects.filter(state_of_processing="REQUESTED")
+        self.once = options["once"]
+        self.max_per_format = settings.ZDS_APP["content"]["extra_content_watchdog_max_per_format"]
+        self.marker_path = get_watchdog_marker_path()
+        self.marker_mtime = self.get_marker_mtime()
 
-            if requested_events.count() == 0:
-                if options["once"]:
-                    break
-                else:
-                    time.sleep(60)
-            else:
+        workers = max(options["workers"], 1)
+        if workers == 1:
+            self.run_sequentially()
+        else:
+            self.run_in_pool(workers)
+
+    def run_sequentially(self):
+        while True:
+            publication_event = claim_publication_event()
+            if publication_event is not None:
                 try:
-                    self.run()
+                    process_publication_event(publication_event.pk)
                 except:
                     logger.exception("Exception during one publication_watchdog run.")
-
-    def run(self):
-        requested_events = PublicationEvent.objects.select_related(
-            "published_object", "published_object__content", "published_object__content__image"
-        ).filter(state_of_processing="REQUESTED")
-
-        for publication_event in requested_events.iterator():
-            try:
-                content = publication_event.published_object
-                extra_content_dir = content.get_extra_contents_directory()
-                building_extra_content_path = Path(
-                    str(Path(extra_content_dir).parent) + "__building", "extra_contents", content.content_public_slug
-                )
-                if not building_extra_content_path.exists():
-                    building_extra_content_path.mkdir(parents=True)
-                base_name = str(building_extra_content_path)
-                md_file_path = base_name + ".md"
-
-                logger.info("Exporting « %s » as %s", content.title(), publication_event.format_requested)
-                publication_event.state_of_processing = "RUNNING"
-                publication_event.save()
-
-                publicator = PublicatorRegistry.get(publication_event.format_requested)
-                publicator.publish(md_file_path, base_name)
-            except:
-                # Update and save the publication state before logging, in case
-                # content.title() would raise an exception (it already used to
-                # happen!).
-                publication_event.state_of_processing = "FAILURE"
-                publication_event.save()
-                logger.exception("Failed to export « %s » as %s", content.title(), publication_event.format_requested)
+            elif self.once:
+                break
             else:
-                publication_event.state_of_processing = "SUCCESS"
-                publication_event.save()
-                logger.info("Succeed to export « %s » as %s", content.title(), publication_event.format_requested)
+                self.wait_for_new_events()
+
+    def run_in_pool(self, workers):
+        executor = ProcessPoolExecutor(max_workers=workers)
+        running = {}  # future -> claimed event
+
+        try:
+            while True:
+                while len(running) < workers:
+                    formats = [publication_event.format_requested for publication_event in running.values()]
+                    publication_event = claim_publication_event(self.get_saturated_formats(formats))
+                    if publication_event is None:
+                        break
+                    # forked workers must not share the database connections of this process
+                    connections.close_all()
+                    try:
+                        future = executor.submit(process_publication_event, publication_event.pk)
+                    except BrokenProcessPool:
+                        logger.exception("Exception during one publication_watchdog run.")
+                        self.fail_publication_events([publication_event])
+                        executor = self.replace_broken_executor(executor, running, workers)
+                        continue
+                    running[future] = publication_event
+
+                if not running:
+                    if self.once:
+                        break
+                    self.wait_for_new_events()
+                    continue
+
+                # wake up as soon as a worker is done or new events are requested
+                poll_interval = settings.ZDS_APP["content"]["extra_content_watchdog_poll_interval"]
+                deadline = time.monotonic() + poll_interval
+                while time.monotonic() < deadline:
+                    done, __ = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                    if done or (len(running) < workers and self.has_new_events()):
+                        break
+
+                broken = False
+                for future in [f for f in running if f.done()]:
+                    publication_event = running.pop(future)
+                    try:
+                        future.result()
+                    except BrokenProcessPool:
+                        # the worker died before updating the event
+                        logger.exception("Exception during one publication_watchdog run.")
+                        self.fail_publication_events([publication_event])
+                        broken = True
+                    except:
+                        logger.exception("Exception during one publication_watchdog run.")
+                if broken:
+                    executor = self.replace_broken_executor(executor, running, workers)
+        finally:
+            executor.shutdown()
+
+    def replace_broken_executor(self, executor, running, workers):
+        """Mark the events handled by a broken pool of workers as failed, and return a new pool.
+
+        :param executor: the broken pool
+        :param running: the running events, by future (it is emptied)
+        :type running: dict
+        :param workers: number of workers of the new pool
+        :type workers: int
+        :rtype: concurrent.futures.ProcessPoolExecutor
+        """
+        logger.error("The pool of workers is broken, a new one is created.")
+        wait(running)  # a broken pool ends all its pending futures
+        self.fail_publication_events(running.values())
+        running.clear()
+        executor.shutdown(wait=False)
+        return ProcessPoolExecutor(max_workers=workers)
+
+    @staticmethod
+    def fail_publication_events(publication_events):
+        """Mark the given events as failed, unless they were handled in the meantime."""
+        PublicationEvent.objects.filter(
+            pk__in=[publication_event.pk for publication_event in publication_events], state_of_processing="RUNNING"
+        ).update(state_of_processing="FAILURE")
+
+    def get_saturated_formats(self, running_formats):
+        running_formats = list(running_formats)
+        return [
+            requested_format
+            for requested_format, max_running in self.max_per_format.items()
+            if running_formats.count(requested_format) >= max_running
+        ]
+
+    def get_marker_mtime(self):
+        try:
+            return self.marker_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def has_new_events(self):
+        """Check (cheaply) if the marker touched on each new publication changed since the last check."""
+        mtime = self.get_marker_mtime()
+        if mtime != self.marker_mtime:
+            self.marker_mtime = mtime
+            return True
+        return False
+
+    def wait_for_new_events(self):
+        """Wait until new events are requested, checking the database anyway every ``poll_interval`` seconds
+        (in case the marker cannot be seen by this process)."""
+        deadline = time.monotonic() + settings.ZDS_APP["content"]["extra_content_watchdog_poll_interval"]
+        while time.monotonic() < deadline and not self.has_new_events():
+            time.sleep(1)
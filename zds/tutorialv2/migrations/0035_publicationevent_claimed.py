@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorialv2", "0034_goals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="publicationevent",
+            name="claimed",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="date de prise en charge"),
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.urls import reverse
-from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect, StreamingHttpResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponsePermanentRedirect, StreamingHttpResponse
 from django.template.loader import render_to_string
 from django.shortcuts import redirect
 from django.utils.translation import gettext_lazy as _
@@ -507,7 +507,8 @@ class DownloadViewMixin(View):
     (inspired from https://djangosnippets.org/snippets/2549/ and
     http://stackoverflow.com/questions/16286666/send-a-file-through-django-class-based-views)
 
-    You just need to override `get_contents()` to make it works
+    You just need to override `get_contents()` to make it works. It may return the content itself, an opened file
+    or an iterable of chunks: the last two are streamed instead of being loaded in memory.
     """
 
     mimetype = None
@@ -527,9 +528,14 @@ class DownloadViewMixin(View):
         Access to a file with only get method then write the file content in response stream.
         Properly sets Content-Type and Content-Disposition headers
         """
-        response = HttpResponse(content_type=self.get_mimetype())
-        response["Content-Disposition"] = "filename=" + self.get_filename()
-        response.write(self.get_contents())
+        contents = self.get_contents()
+        if isinstance(contents, (bytes, str)):
+            response = HttpResponse(contents, content_type=self.get_mimetype())
+        elif hasattr(contents, "read"):
+            response = FileResponse(contents, content_type=self.get_mimetype())
+        else:
+            response = StreamingHttpResponse(contents, content_type=self.get_mimetype())
+        response["Content-Disposition"] = f'attachment; filename="{self.get_filename()}"'
 
         return response
 
@@ -29,15 +29,23 @@ from zds.mp.models import PrivateTopic
 from zds.searchv2.models import (
     AbstractESDjangoIndexable,
     AbstractESIndexable,
+    delete_by_query_in_elasticsearch,
     delete_document_in_elasticsearch,
-    ESIndexManager,
+    get_index_manager,
 )
 from zds.tutorialv2.managers import PublishedContentManager, PublishableContentManager, ReactionManager
 from zds.tutorialv2.models import TYPE_CHOICES, STATUS_CHOICES, CONTENT_TYPES_REQUIRING_VALIDATION, PICK_OPERATIONS
 from zds.tutorialv2.models.goals import Goal
 from zds.tutorialv2.models.mixins import TemplatableContentModelMixin, OnlineLinkableContentMixin
 from zds.tutorialv2.models.versioned import NotAPublicVersion
-from zds.tutorialv2.utils import get_content_from_json, BadManifestError, get_blob
+from zds.tutorialv2.utils import (
+    get_content_from_json,
+    BadManifestError,
+    get_blob,
+    get_manifest_cache_key,
+    get_cached_manifest,
+    set_cached_manifest,
+)
 from zds.utils import get_current_user
 from zds.utils.models import SubCategory, Licence, Comment, Tag
 from zds.tutorialv2.models.help_requests import HelpWriting
@@ -376,8 +384,14 @@ class PublishableContent(models.Model, TemplatableContentModelMixin):
             if sha != public.sha_public:
                 raise NotAPublicVersion
 
-            with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
-                manifest = json_handler.loads(f.read())
+            cache_key = get_manifest_cache_key(self.pk, sha, True, path)
+            data = get_cached_manifest(cache_key)
+            if data is None:
+                with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+                    data = f.read()
+                set_cached_manifest(cache_key, data)
+
+            manifest = json_handler.loads(data)
 
         else:  # draft version, use the repository (slower, but allows manipulation)
             path = self.get_repo_path()
@@ -385,8 +399,11 @@ class PublishableContent(models.Model, TemplatableContentModelMixin):
             if not os.path.isdir(path):
                 raise OSError(path)
 
-            repo = Repo(path)
-            data = get_blob(repo.commit(sha).tree, "manifest.json")
+            cache_key = get_manifest_cache_key(self.pk, sha, False, path)
+            data = get_cached_manifest(cache_key)
+            if data is None:
+                repo = Repo(path)
+                data = get_blob(repo.commit(sha).tree, "manifest.json")
             try:
                 manifest = json_handler.loads(data)
                 logger.debug("loaded json")
@@ -394,6 +411,7 @@ class PublishableContent(models.Model, TemplatableContentModelMixin):
                 raise BadManifestError(
                     _("Une erreur est survenue lors de la lecture du manifest.json, est-ce du JSON ?")
                 )
+            set_cached_manifest(cache_key, data)
 
         return manifest
 
@@ -1034,7 +1052,7 @@ class PublishedContent(AbstractESDjangoIndexable, TemplatableContentModelMixin,
     def get_es_indexable(cls, force_reindexing=False):
         """Overridden to also include chapters"""
 
-        index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
+        index_manager = get_index_manager()
 
         # fetch initial batch
         last_pk = 0
@@ -1123,10 +1141,8 @@ def delete_published_content_in_elasticsearch(sender, instance, **kwargs):
     chapters.
     """
 
-    index_manager = ESIndexManager(**settings.ES_SEARCH_INDEX)
-
-    if index_manager.index_exists:
-        index_manager.delete_by_query(FakeChapter.get_es_document_type(), ES_Q("match", _routing=instance.es_id))
+    if settings.ES_ENABLED:
+        delete_by_query_in_elasticsearch(FakeChapter.get_es_document_type(), ES_Q("match", _routing=instance.es_id))
 
     return delete_document_in_elasticsearch(instance)
 
@@ -1435,6 +1451,7 @@ class PublicationEvent(models.Model):
     # 25 for formats such as "printable.pdf", if tomorrow we want other "long" formats this will be ready
     format_requested = models.CharField(blank=False, null=False, max_length=25)
     created = models.DateTimeField(verbose_name="date de création", name="date", auto_now_add=True)
+    claimed = models.DateTimeField(verbose_name="date de prise en charge", null=True, blank=True)
 
     def __str__(self):
         return f"{self.published_object.title()}: {self.format_requested} - {self.state_of_processing}"
@@ -17,7 +17,7 @@ from django.template.loader import render_to_string
 from zds.tutorialv2.models.mixins import TemplatableContentModelMixin
 from zds.tutorialv2.models import SINGLE_CONTAINER_CONTENT_TYPES, CONTENT_TYPES_BETA, CONTENT_TYPES_REQUIRING_VALIDATION
 from zds.tutorialv2.utils import default_slug_pool, export_content, get_commit_author, InvalidOperationError
-from zds.tutorialv2.utils import get_blob
+from zds.tutorialv2.utils import get_commit_blob
 from zds.utils.validators import InvalidSlugError, check_slug
 from zds.utils.misc import compute_hash
 from zds.utils.templatetags.emarkdown import emarkdown
@@ -428,10 +428,10 @@ class Container:
         :rtype: str
         """
         if self.introduction:
+            top_container = self.top_container()
             return (
-                get_blob(
-                    self.top_container().repository.commit(self.top_container().current_version).tree,
-                    self.introduction.replace("\\", "/"),
+                get_commit_blob(
+                    top_container.repository, top_container.current_version, self.introduction.replace("\\", "/")
                 )
                 or ""
             )
@@ -443,10 +443,10 @@ class Container:
         :rtype: str
         """
         if self.conclusion:
+            top_container = self.top_container()
             return (
-                get_blob(
-                    self.top_container().repository.commit(self.top_container().current_version).tree,
-                    self.conclusion.replace("\\", "/"),
+                get_commit_blob(
+                    top_container.repository, top_container.current_version, self.conclusion.replace("\\", "/")
                 )
                 or ""
             )
@@ -1024,9 +1024,9 @@ class Extract:
         :rtype: str
         """
         if self.text:
-            return get_blob(
-                self.container.top_container().repository.commit(self.container.top_container().current_version).tree,
-                self.text.replace("\\", "/"),
+            top_container = self.container.top_container()
+            return get_commit_blob(
+                top_container.repository, top_container.current_version, self.text.replace("\\", "/")
             )
         return ""
 
@@ -1,9 +1,12 @@
 import contextlib
 import copy
+import hashlib
+import json
 import logging
 import os
 import shutil
 import subprocess
+import time
 import zipfile
 from datetime import datetime
 from os import makedirs, path
@@ -11,14 +14,19 @@ from pathlib import Path
 
 import requests
 from django.core.exceptions import ObjectDoesNotExist
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.template.loader import get_template, render_to_string
 from django.utils import translation
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from git import Repo, GitError
+from gitdb.exc import BadName, BadObject
+
+from zds import __version__, git_version
 from zds.tutorialv2 import signals
 from zds.tutorialv2.epub_utils import build_ebook
 from zds.tutorialv2.models.database import ContentReaction, PublishedContent, PublicationEvent
-from zds.tutorialv2.publish_container import publish_use_manifest
+from zds.tutorialv2.publish_container import publish_use_manifest, publish_changed_containers
 from zds.tutorialv2.signals import content_unpublished
 from zds.tutorialv2.utils import export_content
 from zds.forum.utils import send_post, lock_topic
@@ -26,6 +34,9 @@ from zds.utils.templatetags.emarkdown import render_markdown, MD_PARSING_ERROR
 from zds.utils.templatetags.smileys_def import SMILEYS_BASE_PATH, LICENSES_BASE_PATH
 
 logger = logging.getLogger(__name__)
+
+# written in the public directory of a content, to know if its next publication can be incremental
+PUBLICATION_INFO_FILENAME = "publication.json"
 licences = {
     "by-nc-nd": "by-nc-nd.svg",
     "by-nc-sa": "by-nc-sa.svg",
@@ -76,8 +87,27 @@ def publish_content(db_object, versioned, is_major_update=True):
 
     # render HTML:
     altered_version = copy.deepcopy(versioned)
-    char_count = publish_use_manifest(db_object, tmp_path, altered_version)
+    changed_paths = get_changed_paths_since_publication(db_object, versioned)
+    if changed_paths is None:
+        signs = publish_use_manifest(db_object, tmp_path, altered_version)
+    else:
+        signs = publish_incrementally(db_object, tmp_path, versioned, altered_version, changed_paths)
+    char_count = sum(signs.values())
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path.join(tmp_path, "manifest.json"))  # may be a hard link to the previous publication
     altered_version.dump_json(path.join(tmp_path, "manifest.json"))
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path.join(tmp_path, PUBLICATION_INFO_FILENAME))  # may be a hard link to the previous publication
+    with open(path.join(tmp_path, PUBLICATION_INFO_FILENAME), "w", encoding="utf-8") as info_file:
+        json.dump(
+            {
+                "sha": versioned.current_version,
+                "js_support": db_object.js_support,
+                "fingerprint": get_rendering_fingerprint(),
+                "signs": signs,
+            },
+            info_file,
+        )
 
     # make room for 'extra contents'
     build_extra_contents_path = path.join(tmp_path, settings.ZDS_APP["content"]["extra_contents_dirname"])
@@ -121,8 +151,8 @@ def publish_content(db_object, versioned, is_major_update=True):
         public_version.authors.add(author)
 
     # this puts the manifest.json and base json file on the prod path.
-    shutil.rmtree(public_version.get_prod_path(), ignore_errors=True)
-    shutil.copytree(tmp_path, public_version.get_prod_path())
+    replace_directory(tmp_path, public_version.get_prod_path())
+    makedirs(path.join(build_extra_contents_path, "images"))  # was moved with the rest of the building directory
     db_object.sha_public = versioned.current_version
     public_version.save()
     if settings.ZDS_APP["content"]["extra_content_generation_policy"] == "SYNC":
@@ -134,15 +164,159 @@ def publish_content(db_object, versioned, is_major_update=True):
     return public_version
 
 
+def get_changed_paths_since_publication(db_object, versioned):
+    """Get the files changed since the previous publication of a content, if only the texts changed (so that
+    ``publish_incrementally()`` can be used).
+
+    :param db_object: Database representation of the content
+    :type db_object: zds.tutorialv2.models.database.PublishableContent
+    :param versioned: version of the content to publish
+    :type versioned: zds.tutorialv2.models.versioned.VersionedContent
+    :return: the paths (relative to the repository) of the changed files, or ``None`` if the whole content has to be
+        published again
+    :rtype: set
+    """
+    if not settings.ZDS_APP["content"]["incremental_publication"]:
+        return None
+
+    public_version = db_object.public_version
+    if not public_version or public_version.char_count is None or public_version.content_public_slug != versioned.slug:
+        return None
+
+    # check that the previous publication is complete and was done with the same parameters
+    previous_publication = get_publication_info(public_version)
+    if (
+        previous_publication.get("sha") != public_version.sha_public
+        or previous_publication.get("js_support") != db_object.js_support
+        or previous_publication.get("fingerprint") != get_rendering_fingerprint()
+        or not isinstance(previous_publication.get("signs"), dict)
+    ):
+        return None
+
+    try:
+        repository = Repo(db_object.get_repo_path())
+        diff = repository.commit(public_version.sha_public).diff(versioned.current_version)
+    except (GitError, BadName, BadObject, ValueError, OSError):
+        logger.warning("Cannot compute the changes of « %s » since its publication", versioned.title, exc_info=True)
+        return None
+
+    changed_paths = set()
+    for changed_file in diff:
+        changed_paths.update(p for p in (changed_file.a_path, changed_file.b_path) if p)
+
+    if "manifest.json" in changed_paths:  # the structure of the content changed
+        return None
+    return changed_paths
+
+
+def publish_incrementally(db_object, base_dir, versioned, altered_version, changed_paths):
+    """Publish a new version of a content whose structure did not change since its previous publication: only the
+    changed containers are rendered, the other files are hard linked (or copied) from the previous publication.
+
+    :param db_object: Database representation of the content
+    :type db_object: zds.tutorialv2.models.database.PublishableContent
+    :param base_dir: the building directory
+    :param versioned: version of the content to publish
+    :type versioned: zds.tutorialv2.models.versioned.VersionedContent
+    :param altered_version: copy of ``versioned``, altered to be dumped in the public manifest
+    :type altered_version: zds.tutorialv2.models.versioned.VersionedContent
+    :param changed_paths: see ``get_changed_paths_since_publication()``
+    :type changed_paths: set
+    :return: the number of signs of each published container (see ``publish_use_manifest()``)
+    :rtype: dict
+    """
+    public_version = db_object.public_version
+    shutil.copytree(
+        public_version.get_prod_path(),
+        base_dir,
+        copy_function=link_or_copy,
+        ignore=shutil.ignore_patterns(settings.ZDS_APP["content"]["extra_contents_dirname"]),
+    )
+
+    signs = get_publication_info(public_version)["signs"]
+    signs.update(publish_changed_containers(db_object, base_dir, altered_version, changed_paths))
+
+    logger.info(
+        "Incremental publication of « %s »: %d file(s) changed since the previous publication",
+        versioned.title,
+        len(changed_paths),
+    )
+    return signs
+
+
+def get_publication_info(public_version):
+    """Read the information written along the files of a publication (see ``PUBLICATION_INFO_FILENAME``).
+
+    :param public_version: the publication
+    :type public_version: zds.tutorialv2.models.database.PublishedContent
+    :return: the information, or an empty dictionary if the publication has none (e.g. if it was interrupted)
+    :rtype: dict
+    """
+    try:
+        with open(path.join(public_version.get_prod_path(), PUBLICATION_INFO_FILENAME), encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return info if isinstance(info, dict) else {}
+
+
+def get_rendering_fingerprint():
+    """Identify what the HTML files of a publication depend on, besides the content itself: the version of the
+    website, the one of zmarkdown, its options and the template of the chapters. The files of a previous
+    publication are only reused if it was done with the same fingerprint.
+
+    :rtype: str
+    """
+    zmarkdown_version = None
+    with contextlib.suppress(OSError, ValueError, KeyError):
+        with open(Path(settings.BASE_DIR, "zmd", "package.json"), encoding="utf-8") as f:
+            zmarkdown_version = json.load(f)["dependencies"]["zmarkdown"]
+    template_hash = None
+    with contextlib.suppress(OSError, AttributeError, TypeError):
+        template_hash = hashlib.sha256(
+            Path(get_template("tutorialv2/export/chapter.html").origin.name).read_bytes()
+        ).hexdigest()
+    parameters = {
+        "version": __version__,
+        "git_version": git_version,
+        "zmarkdown": zmarkdown_version,
+        "disable_pings": settings.ZDS_APP["zmd"]["disable_pings"],
+        "template": template_hash,
+    }
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def replace_directory(new_path, target_path):
+    """Replace ``target_path`` by ``new_path`` with two renames, instead of removing and copying the whole directory.
+
+    :param new_path: the new directory (it is moved)
+    :param target_path: the directory to replace
+    """
+    old_path = target_path + "__old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    with contextlib.suppress(FileNotFoundError):
+        os.rename(target_path, old_path)
+    os.rename(new_path, target_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
 def update_existing_publication(db_object, versioned):
     public_version = db_object.public_version
-    # the content has been published in the past, so clean up old files!
-    old_path = public_version.get_prod_path()
-    logging.getLogger(__name__).debug("erase " + old_path)
-    shutil.rmtree(old_path)
     # if the slug has changed, create a new object instead of reusing the old one
     # this allows us to handle permanent redirection so that SEO is not impacted.
     if versioned.slug != public_version.content_public_slug:
+        # the content has been published in the past, so clean up old files!
+        # (otherwise, they are replaced by the new ones at once)
+        old_path = public_version.get_prod_path()
+        logging.getLogger(__name__).debug("erase " + old_path)
+        shutil.rmtree(old_path)
         public_version.must_redirect = True  # set redirection
         public_version.save(update_fields=["must_redirect"])
         publication_date = public_version.publication_date
@@ -360,6 +534,8 @@ class ZMarkdownRebberLatexPublicator(Publicator):
     Use zmarkdown and rebber stringifier to produce latex & pdf output.
     """
 
+    max_draft_passes = 2
+
     def __init__(self, extension=".pdf", latex_classes=""):
         self.extension = extension
         self.doc_type = extension[1:]
@@ -380,7 +556,9 @@ class ZMarkdownRebberLatexPublicator(Publicator):
         public_versionned_source = published_content_entity.content.load_version(
             sha=published_content_entity.sha_public
         )
-        base_directory = Path(base_name).parent
+        # the building directory of the content is removed by each publication: build in a directory of our own,
+        # so that the next build can reuse the auxiliary files of this one
+        base_directory = get_latex_build_directory(published_content_entity.content_pk)
         image_dir = base_directory / "images"
         with contextlib.suppress(FileExistsError):
             image_dir.mkdir(parents=True)
@@ -443,8 +621,8 @@ class ZMarkdownRebberLatexPublicator(Publicator):
                 luatex_dir_link = base_directory / "utf8.lua"
                 luatex_dir_link.symlink_to(zmd_class_dir_path / "utf8.lua", target_is_directory=True)
         true_latex_extension = ".".join(self.extension.split(".")[:-1]) + ".tex"
-        latex_file_path = base_name + true_latex_extension
-        pdf_file_path = base_name + self.extension
+        latex_file_path = str(base_directory / Path(base_name).name) + true_latex_extension
+        pdf_file_path = str(base_directory / Path(base_name).name) + self.extension
         default_logo_original_path = Path(__file__).parent / ".." / ".." / "assets" / "images" / "logo@2x.png"
         with contextlib.suppress(FileExistsError):
             shutil.copy(str(default_logo_original_path), str(base_directory / "default_logo.png"))
@@ -452,13 +630,98 @@ class ZMarkdownRebberLatexPublicator(Publicator):
             latex_file.write(content)
         shutil.copy2(latex_file_path, published_content_entity.get_extra_contents_directory())
 
-        self.full_tex_compiler_call(latex_file_path, draftmode="-draftmode")
-        self.full_tex_compiler_call(latex_file_path, draftmode="-draftmode")
-        self.make_glossary(base_name.split("/")[-1], latex_file_path)
-        self.full_tex_compiler_call(latex_file_path)
+        self.compile(latex_file_path, pdf_file_path)
 
         shutil.copy2(pdf_file_path, published_content_entity.get_extra_contents_directory())
 
+    def compile(self, latex_file_path, pdf_file_path):
+        """Compile the LaTeX file into the PDF file, unless the PDF was already built from the same sources.
+
+        The auxiliary files of the previous build (see ``get_latex_build_directory()``) are reused: draft passes are
+        done until they stop changing the auxiliary files (at most ``max_draft_passes``), then the glossary is built (if any) before the final pass.
+
+        :param latex_file_path: path to the LaTeX file
+        :param pdf_file_path: path to the PDF file to produce
+        """
+        build_info_path = Path(pdf_file_path + ".build")
+        sources_hash = self.get_sources_hash(latex_file_path)
+        previous_build = {}
+        with contextlib.suppress(OSError, ValueError):
+            previous_build = json.loads(build_info_path.read_text(encoding="utf-8"))
+
+        if previous_build.get("sources") == sources_hash and Path(pdf_file_path).exists():
+            logger.info(
+                "%s is up to date, skipped PDF generation (saved %.1fs)",
+                pdf_file_path,
+                previous_build.get("duration", 0),
+            )
+            return
+
+        # remove the build info first, in case the compilation fails
+        with contextlib.suppress(FileNotFoundError):
+            build_info_path.unlink()
+
+        start = time.monotonic()
+        passes = 0
+        aux_hash = self.get_aux_hash(latex_file_path)
+        for __ in range(self.max_draft_passes):
+            self.full_tex_compiler_call(latex_file_path, draftmode="-draftmode")
+            passes += 1
+            previous_aux_hash, aux_hash = aux_hash, self.get_aux_hash(latex_file_path)
+            if aux_hash == previous_aux_hash:
+                break
+
+        glossary_path = Path(path.splitext(latex_file_path)[0] + ".glo")
+        if glossary_path.exists() and glossary_path.stat().st_size > 0:
+            self.make_glossary(glossary_path.stem, latex_file_path)
+        self.full_tex_compiler_call(latex_file_path)
+        passes += 1
+
+        duration = time.monotonic() - start
+        skipped_passes = self.max_draft_passes + 1 - passes
+        logger.info(
+            "%s built in %.1fs with %d lualatex passes (saved ~%.1fs by skipping %d passes)",
+            pdf_file_path,
+            duration,
+            passes,
+            skipped_passes * duration / passes,
+            skipped_passes,
+        )
+        build_info_path.write_text(json.dumps({"sources": sources_hash, "duration": duration}), encoding="utf-8")
+
+    @staticmethod
+    def get_sources_hash(latex_file_path):
+        """Hash the LaTeX file and everything it may include (images, LaTeX class, logo...).
+
+        The images are downloaded again by zmarkdown on each build, so their content is hashed, not their metadata.
+        """
+        sources_hash = hashlib.sha256()
+        with open(latex_file_path, "rb") as latex_file:
+            sources_hash.update(latex_file.read())
+
+        base_directory = Path(latex_file_path).parent
+        for asset in ("zmdocument.cls", "utf8.lua", "default_logo.png"):
+            with contextlib.suppress(OSError):
+                sources_hash.update(asset.encode("utf-8") + (base_directory / asset).read_bytes())
+
+        image_dir = base_directory / "images"
+        if image_dir.is_dir():
+            for image in sorted(image_dir.iterdir()):
+                with contextlib.suppress(OSError):
+                    sources_hash.update(image.name.encode("utf-8") + image.read_bytes())
+
+        return sources_hash.hexdigest()
+
+    @staticmethod
+    def get_aux_hash(latex_file_path):
+        """Hash the auxiliary files read by lualatex, to know if another pass is needed."""
+        aux_hash = hashlib.sha256()
+        base_path = path.splitext(latex_file_path)[0]
+        for extension in (".aux", ".toc", ".glo", ".gls"):
+            with contextlib.suppress(OSError):
+                aux_hash.update(extension.encode("utf-8") + Path(base_path + extension).read_bytes())
+        return aux_hash.hexdigest()
+
     def full_tex_compiler_call(self, latex_file, draftmode: str = ""):
         success_flag = self.tex_compiler(latex_file, draftmode)
         if not success_flag:
@@ -575,6 +838,37 @@ class WatchdogFilePublicator(Publicator):
                 published_object=published_content,
                 format_requested=requested_format[0],
             )
+        transaction.on_commit(notify_watchdog)
+
+
+def get_watchdog_marker_path():
+    """Return the path of the file touched each time publication events are requested, so that the publication
+    watchdog can notice them without querying the database.
+
+    :rtype: pathlib.Path
+    """
+    return Path(settings.ZDS_APP["content"]["extra_content_watchdog_dir"], "requested")
+
+
+def get_latex_build_directory(content_pk):
+    """Return the directory where the PDF of a content is built. Unlike the building directory of the content, it is
+    kept between two publications.
+
+    :param content_pk: pk of the content
+    :type content_pk: int
+    :rtype: pathlib.Path
+    """
+    return Path(settings.ZDS_APP["content"]["extra_content_watchdog_dir"], "latex", str(content_pk))
+
+
+def notify_watchdog():
+    marker_path = get_watchdog_marker_path()
+    try:
+        marker_path.parent.mkdir(parents=True, exist_ok=True)
+        marker_path.touch()
+    except OSError:
+        # the watchdog will still see the new events when polling the database
+        logger.warning("Unable to touch %s", marker_path, exc_info=True)
 
 
 class FailureDuringPublication(Exception):
@@ -651,6 +945,7 @@ def unpublish_content(db_object, moderator=None):
         public_version.content.update(public_version=None, sha_public=None)
         if path.exists(old_path):
             shutil.rmtree(old_path)
+        shutil.rmtree(get_latex_build_directory(db_object.pk), ignore_errors=True)
         return True
 
     return False
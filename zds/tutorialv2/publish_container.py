@@ -10,18 +10,38 @@ from django.utils.translation import gettext_lazy as _
 
 from zds.tutorialv2.models.database import PublishableContent
 from zds.tutorialv2.models.versioned import Container, VersionedContent
-from zds.tutorialv2.utils import export_content
-from zds.utils.templatetags.emarkdown import emarkdown, render_markdown
+from zds.tutorialv2.utils import export_container
+from zds.utils.templatetags.emarkdown import emarkdown, render_markdown, map_concurrently
 
 
 def publish_use_manifest(db_object, base_dir, versionable_content: VersionedContent):
-    base_content = export_content(versionable_content, with_text=True)
+    """Publish the whole content. Its containers are rendered concurrently (see ``map_concurrently()``), each one on
+    its own so that its number of signs is known when a new version is published with
+    ``publish_changed_containers()``.
 
-    md, metadata, __ = render_markdown(
-        base_content, disable_jsfiddle=not db_object.js_support, full_json=True, stats=True
+    :return: the number of signs of each published container (see ``get_container_key()``)
+    :rtype: dict
+    """
+    containers = list(iter_published_containers(versionable_content))
+    # the texts are read beforehand, the git repository cannot be used by several threads
+    exported = [export_container_markdown(container) for container in containers]
+    renderings = dict(
+        zip(
+            (get_container_key(container) for container in containers),
+            map_concurrently(lambda md: render_container_markdown(db_object, md), exported),
+        )
     )
-    publish_container_new(db_object, base_dir, versionable_content, md)
-    return metadata.get("stats", {}).get("signs", 0)
+
+    def nest_rendered(container):
+        rendered = renderings[get_container_key(container)][0]
+        if not container.has_extracts():
+            rendered["children"] = [
+                nest_rendered(child) if child.ready_to_publish else None for child in container.children
+            ]
+        return rendered
+
+    publish_container_new(db_object, base_dir, versionable_content, nest_rendered(versionable_content))
+    return {key: signs for key, (__, signs) in renderings.items()}
 
 
 def publish_container_new(
@@ -80,6 +100,141 @@ def publish_container_new(
             render_conclusion(base_dir, container, ctx, file_ext, relative_ccl_path, rendered)
 
 
+def publish_changed_containers(
+    db_object,
+    base_dir,
+    container: Container,
+    changed_paths,
+    template="tutorialv2/export/chapter.html",
+    file_ext="html",
+):
+    """
+    Same as ``publish_container_new``, but for a new version of an already published content whose structure did not
+    change: only the containers whose introduction, conclusion or extracts changed are rendered and written, the
+    files of the other ones are expected to be already in ``base_dir``.
+
+    :param db_object:
+    :type db_object: zds.tutorialv2.models.database.PublishableContent
+    :param base_dir: ``contents-public/{tutorial_slug}``
+    :param container: tutorial/part/chapter depending of the depth of recursivity
+    :type container: zds.tutorialv2.models.versionable.Container
+    :param changed_paths: paths of the files changed since the previous publication (see ``container_has_changed``)
+    :type changed_paths: set
+    :param template: template to render a Container with extract
+    :param file_ext: html (for zds) for xml, please see ``publish_content``
+    :return: the number of signs of each rendered container (see ``get_container_key()``)
+    :rtype: dict
+    """
+    signs = {}
+    rendered = None
+    if container_has_changed(container, changed_paths):
+        rendered, signs[get_container_key(container)] = render_container_markdown(
+            db_object, export_container_markdown(container)
+        )
+
+    if container.has_extracts():
+        if rendered:
+            render_chapter_or_minituto(base_dir, container, {}, rendered, template)
+        else:
+            for extract in container.children:
+                extract.text = None
+            container.introduction = None
+            container.conclusion = None
+        return signs
+
+    relative_ccl_path = "../."
+    if container.introduction and container.get_introduction():
+        if rendered:
+            render_introduction(base_dir, container, {}, file_ext, relative_ccl_path, rendered)
+        else:
+            container.introduction = str(Path(container.get_prod_path(relative=True), "introduction." + file_ext))
+    children = copy.copy(container.children)
+    container.children = []
+    container.children_dict = {}
+
+    for child in children:
+        if not child.ready_to_publish:
+            continue
+        altered_version = copy.copy(child)
+        container.children.append(altered_version)
+        container.children_dict[altered_version.slug] = altered_version
+        signs.update(
+            publish_changed_containers(db_object, base_dir, altered_version, changed_paths, template, file_ext)
+        )
+
+    if container.conclusion and container.get_conclusion():
+        if rendered:
+            render_conclusion(base_dir, container, {}, file_ext, relative_ccl_path, rendered)
+        else:
+            container.conclusion = str(Path(container.get_prod_path(relative=True), "conclusion." + file_ext))
+    return signs
+
+
+def iter_published_containers(container: Container):
+    """Yield the published containers of a content (the given one included).
+
+    :param container: the top container
+    :type container: zds.tutorialv2.models.versionable.Container
+    :rtype: collections.Iterable[zds.tutorialv2.models.versionable.Container]
+    """
+    yield container
+    if not container.has_extracts():
+        for child in container.children:
+            if child.ready_to_publish:
+                yield from iter_published_containers(child)
+
+
+def get_container_key(container: Container):
+    """Identify a container among the ones of its content, e.g. in the publication information (see
+    ``zds.tutorialv2.publication_utils.PUBLICATION_INFO_FILENAME``).
+
+    :param container: the container
+    :type container: zds.tutorialv2.models.versionable.Container
+    :return: its path, relative to the repository, with ``/``
+    :rtype: str
+    """
+    return str(container.get_path(relative=True)).replace("\\", "/")
+
+
+def container_has_changed(container: Container, changed_paths):
+    """Check if the introduction, the conclusion or (if any) the extracts of a container are in ``changed_paths``.
+
+    :param container: the container
+    :type container: zds.tutorialv2.models.versionable.Container
+    :param changed_paths: paths (relative to the repository, with ``/``) of the files changed
+    :type changed_paths: set
+    :rtype: bool
+    """
+    paths = [container.introduction, container.conclusion]
+    if container.has_extracts():
+        paths.extend(extract.text for extract in container.children)
+    return any(path_ and str(path_).replace("\\", "/") in changed_paths for path_ in paths)
+
+
+def export_container_markdown(container: Container):
+    """Export the introduction, the conclusion and (if any) the extracts of a container, but not its sub-containers,
+    to be rendered by ``render_container_markdown()``.
+
+    :rtype: dict
+    """
+    exported = export_container(container, with_text=True)
+    if not container.has_extracts():
+        exported["children"] = []
+    return exported
+
+
+def render_container_markdown(db_object, exported):
+    """Render a container exported by ``export_container_markdown()``.
+
+    :return: the rendered container (as ``render_markdown(..., full_json=True)`` does) and its number of signs
+    :rtype: tuple
+    """
+    rendered, metadata, __ = render_markdown(
+        exported, disable_jsfiddle=not db_object.js_support, full_json=True, stats=True
+    )
+    return rendered, metadata.get("stats", {}).get("signs", 0)
+
+
 def render_conclusion(base_dir, container, ctx, file_ext, relative_ccl_path, rendered):
     part_path = Path(container.get_prod_path(relative=True), "conclusion." + file_ext)
     args = {"text": container.get_conclusion()}
@@ -255,6 +410,9 @@ def write_chapter_file(base_dir, container, part_path, parsed, path_to_title_dic
     if not full_path.parent.exists():
         with contextlib.suppress(OSError):
             full_path.parent.mkdir(parents=True)
+    # the file may be a hard link to the previous publication (see ``publish_content``), do not alter it
+    with contextlib.suppress(FileNotFoundError):
+        full_path.unlink()
     with full_path.open("w", encoding="utf-8") as chapter_file:
         try:
             chapter_file.write(parsed)
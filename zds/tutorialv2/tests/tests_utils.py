@@ -1,7 +1,14 @@
 import os
 import shutil
+import tempfile
+import tracemalloc
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import sha256
 from pathlib import Path
 import datetime
+from unittest.mock import patch
 
 from django.conf import settings
 from django.test import TestCase
@@ -24,12 +31,36 @@ from zds.tutorialv2.utils import (
     BadManifestError,
     get_content_from_json,
     get_commit_author,
+    get_blob,
+    get_blob_index,
+    get_commit_blob,
+    get_manifest_cache_key,
+    stream_zip_of_git_tree,
+    CommitHistory,
 )
 from zds.utils.validators import slugify_raise_on_invalid, InvalidSlugError, check_slug
 from zds.tutorialv2.publication_utils import publish_content, unpublish_content
-from zds.tutorialv2.models.database import PublishableContent, PublishedContent, ContentReaction, ContentRead
+from zds.tutorialv2.models.database import (
+    PublishableContent,
+    PublishedContent,
+    ContentReaction,
+    ContentRead,
+    PublicationEvent,
+)
+from zds.tutorialv2.management.commands.publication_watchdog import (
+    claim_publication_event,
+    fail_stale_publication_events,
+    process_publication_event,
+)
 from django.core.management import call_command
-from zds.tutorialv2.publication_utils import Publicator, PublicatorRegistry, ZMarkdownRebberLatexPublicator
+from zds.tutorialv2.publication_utils import (
+    Publicator,
+    PublicatorRegistry,
+    ZMarkdownRebberLatexPublicator,
+    get_latex_build_directory,
+    PUBLICATION_INFO_FILENAME,
+)
+from zds.tutorialv2.publish_container import iter_published_containers
 from zds.tutorialv2.tests import TutorialTestMixin, override_for_contents
 from zds import json_handler
 from zds.utils.tests.factories import LicenceFactory
@@ -537,6 +568,360 @@ class UtilsTests(TutorialTestMixin, TestCase):
         published = PublishedContent.objects.get(pk=published.pk)
         self.assertEqual(published.char_count, published.get_char_count())
 
+    def test_get_blob(self):
+        extract = ExtractFactory(container=self.chapter1, db_object=self.tuto)
+        sha = extract.repo_update("Extract", "Some text")
+        self.tuto_draft.current_version = sha
+        repository = self.tuto_draft.repository
+        tree = repository.commit(sha).tree
+
+        self.assertEqual(get_blob(tree, extract.text), "Some text")
+        self.assertEqual(get_blob(tree, "./" + extract.text), "Some text")
+        self.assertIsNone(get_blob(tree, "does/not/exist.md"))
+        self.assertEqual(get_commit_blob(repository, sha, extract.text), "Some text")
+        self.assertEqual(extract.get_text(), "Some text")
+
+        # the index is only built once
+        self.assertIs(get_blob_index(tree), get_blob_index(repository.commit(sha).tree))
+
+        # another commit does not use the same index
+        new_sha = extract.repo_update("Extract", "Some other text")
+        self.assertEqual(get_commit_blob(repository, new_sha, extract.text), "Some other text")
+        self.assertEqual(get_commit_blob(repository, sha, extract.text), "Some text")
+
+    def test_stream_zip_of_git_tree(self):
+        # a synthetic content with a big file (enough to see if it is loaded in memory)
+        versioned = self.tuto.load_version()
+        repository = versioned.repository
+        big_file_size = 32 * 1024 * 1024
+        big_data = os.urandom(big_file_size)
+        Path(versioned.get_path(), "images").mkdir(exist_ok=True)
+        Path(versioned.get_path(), "images", "big.bin").write_bytes(big_data)
+        big_data_sha = sha256(big_data).hexdigest()
+        del big_data
+        repository.index.add(["images/big.bin"])
+        sha = repository.index.commit("Big file", **get_commit_author()).hexsha
+
+        with tempfile.TemporaryFile() as zip_file:
+            tracemalloc.start()
+            try:
+                for chunk in stream_zip_of_git_tree(repository.commit(sha).tree):
+                    zip_file.write(chunk)
+                __, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, big_file_size / 8)
+
+            zip_file.seek(0)
+            archive = zipfile.ZipFile(zip_file)
+            self.assertEqual(archive.getinfo("images/big.bin").file_size, big_file_size)
+            with archive.open("images/big.bin") as big_file:
+                digest = sha256()
+                for chunk in iter(lambda: big_file.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self.assertEqual(digest.hexdigest(), big_data_sha)
+            self.assertEqual(str(archive.read("manifest.json"), "utf-8"), versioned.get_json())
+
+    def test_commit_history(self):
+        versioned = self.tuto.load_version()
+        for i in range(5):
+            versioned.repo_update(f"Title {i}", "intro", "conclusion")
+        repository = versioned.repository
+        all_commits = list(repository.iter_commits("HEAD"))
+
+        history = CommitHistory(repository)
+        self.assertEqual(len(all_commits), history.count())
+        self.assertEqual([c.hexsha for c in all_commits[2:4]], [c.hexsha for c in history[2:4]])
+        self.assertEqual(all_commits[0].hexsha, history[0].hexsha)
+        self.assertEqual(all_commits[-1].hexsha, history[-1].hexsha)
+        self.assertEqual([], history[len(all_commits) :])
+        with self.assertRaises(IndexError):
+            history[len(all_commits)]
+
+        # the count is cached for this head
+        with patch("git.cmd.Git.execute", side_effect=AssertionError("git should not be run")):
+            self.assertEqual(len(all_commits), CommitHistory(repository).count())
+
+        # and the history of a new head is counted again
+        versioned.repo_update("New title", "intro", "conclusion")
+        self.assertEqual(len(all_commits) + 1, CommitHistory(repository).count())
+
+    def test_manifest_cache(self):
+        sha = self.tuto.sha_draft
+        manifest = self.tuto.load_manifest()
+
+        # only full sha are cached
+        self.assertIsNone(get_manifest_cache_key(self.tuto.pk, "HEAD", False, self.tuto.get_repo_path()))
+        key = get_manifest_cache_key(self.tuto.pk, sha, False, self.tuto.get_repo_path())
+        self.assertIsNotNone(key)
+        self.assertNotEqual(key, get_manifest_cache_key(self.tuto.pk, sha, True, self.tuto.get_repo_path()))
+
+        # modifying the loaded manifest does not alter the cached one
+        manifest["title"] = "Modified"
+        self.assertNotEqual(self.tuto.load_manifest(sha=sha)["title"], "Modified")
+        self.assertEqual(self.tuto.load_version(sha=sha).title, self.tuto.title)
+
+        # a new version is not hidden by the cache
+        versioned = self.tuto.load_version()
+        new_sha = versioned.repo_update("New title", "intro", "conclusion")
+        self.assertEqual(self.tuto.load_manifest(sha=new_sha)["title"], "New title")
+        self.assertEqual(self.tuto.load_manifest(sha=sha)["title"], self.tuto.title)
+
+    def test_claim_publication_event(self):
+        published = PublishedContent.objects.create(
+            content=self.tuto, content_pk=self.tuto.pk, content_type=self.tuto.type, content_public_slug=self.tuto.slug
+        )
+        pdf = PublicationEvent.objects.create(
+            published_object=published, state_of_processing="REQUESTED", format_requested="pdf"
+        )
+        epub = PublicationEvent.objects.create(
+            published_object=published, state_of_processing="REQUESTED", format_requested="epub"
+        )
+
+        # oldest first, unless its format is excluded
+        self.assertEqual(claim_publication_event(["pdf"]), epub)
+        self.assertEqual(PublicationEvent.objects.get(pk=epub.pk).state_of_processing, "RUNNING")
+        self.assertEqual(claim_publication_event(), pdf)
+        self.assertEqual(PublicationEvent.objects.get(pk=pdf.pk).state_of_processing, "RUNNING")
+
+        # an event is never claimed twice
+        self.assertIsNone(claim_publication_event())
+
+    def test_fail_stale_publication_events(self):
+        published = PublishedContent.objects.create(
+            content=self.tuto, content_pk=self.tuto.pk, content_type=self.tuto.type, content_public_slug=self.tuto.slug
+        )
+        running = PublicationEvent.objects.create(
+            published_object=published, state_of_processing="RUNNING", format_requested="pdf"
+        )
+        self.assertEqual(claim_publication_event(), None)
+        PublicationEvent.objects.filter(pk=running.pk).update(state_of_processing="REQUESTED")
+        self.assertEqual(claim_publication_event(), running)
+        lost = PublicationEvent.objects.create(
+            published_object=published,
+            state_of_processing="RUNNING",
+            format_requested="epub",
+            claimed=datetime.datetime.now() - datetime.timedelta(days=1),
+        )
+
+        # the event handled by another watchdog is left alone
+        self.assertEqual(fail_stale_publication_events(), 1)
+        self.assertEqual(PublicationEvent.objects.get(pk=running.pk).state_of_processing, "RUNNING")
+        self.assertEqual(PublicationEvent.objects.get(pk=lost.pk).state_of_processing, "FAILURE")
+
+    def test_watchdog_replaces_broken_pool(self):
+        published = PublishedContent.objects.create(
+            content=self.tuto, content_pk=self.tuto.pk, content_type=self.tuto.type, content_public_slug=self.tuto.slug
+        )
+        events = [
+            PublicationEvent.objects.create(
+                published_object=published, state_of_processing="REQUESTED", format_requested=requested_format
+            )
+            for requested_format in ("pdf", "epub", "md")
+        ]
+        executors = []
+
+        class FakeExecutor:
+            """The first pool dies while handling its first event, the others work."""
+
+            def __init__(self, max_workers):
+                self.submitted = 0
+                self.broken = False
+                self.first = not executors
+                executors.append(self)
+
+            def submit(self, fn, *args):
+                if self.broken:
+                    raise BrokenProcessPool()
+                future = Future()
+                if self.first:
+                    self.broken = True
+                    future.set_exception(BrokenProcessPool())
+                else:
+                    future.set_result(fn(*args))
+                return future
+
+            def shutdown(self, wait=True):
+                pass
+
+        def fake_process_publication_event(publication_event_pk):
+            PublicationEvent.objects.filter(pk=publication_event_pk).update(state_of_processing="SUCCESS")
+
+        module = "zds.tutorialv2.management.commands.publication_watchdog"
+        with patch(f"{module}.ProcessPoolExecutor", FakeExecutor), patch(
+            f"{module}.process_publication_event", fake_process_publication_event
+        ):
+            call_command("publication_watchdog", "--once", "--workers", "2")
+
+        # the event of the dead worker and the one submitted to the broken pool failed, the last one was handled
+        self.assertEqual(
+            [PublicationEvent.objects.get(pk=event.pk).state_of_processing for event in events],
+            ["FAILURE", "FAILURE", "SUCCESS"],
+        )
+        self.assertEqual(len(executors), 2)
+
+    def test_pdf_compilation_passes(self):
+        publicator = ZMarkdownRebberLatexPublicator(".pdf")
+
+        def fake_tex_compiler(texfile, draftmode=""):
+            base_path = os.path.splitext(texfile)[0]
+            Path(base_path + ".aux").write_text("stable")
+            if not draftmode:
+                Path(base_path + ".pdf").write_text("pdf")
+            return True
+
+        with tempfile.TemporaryDirectory() as directory, patch.object(
+            publicator, "tex_compiler", side_effect=fake_tex_compiler
+        ) as tex_compiler, patch.object(publicator, "make_glossary") as make_glossary:
+            latex_file_path = os.path.join(directory, "content.tex")
+            pdf_file_path = os.path.join(directory, "content.pdf")
+            Path(latex_file_path).write_text("First version")
+
+            # two draft passes are needed to produce stable auxiliary files, then the final one
+            publicator.compile(latex_file_path, pdf_file_path)
+            self.assertEqual(tex_compiler.call_count, 3)
+            self.assertFalse(make_glossary.called)  # no glossary
+
+            # nothing changed, nothing to do
+            publicator.compile(latex_file_path, pdf_file_path)
+            self.assertEqual(tex_compiler.call_count, 3)
+
+            # the auxiliary files of the previous build are still valid
+            Path(latex_file_path).write_text("Second version")
+            publicator.compile(latex_file_path, pdf_file_path)
+            self.assertEqual(tex_compiler.call_count, 5)
+
+            # glossary
+            Path(directory, "content.glo").write_text("entry")
+            Path(latex_file_path).write_text("Third version")
+            publicator.compile(latex_file_path, pdf_file_path)
+            self.assertTrue(make_glossary.called)
+
+    def test_pdf_build_kept_between_publications(self):
+        previous_policy = self.overridden_zds_app["content"]["extra_content_generation_policy"]
+        previous_publicator = PublicatorRegistry.registry.get("pdf")
+
+        def restore():
+            self.overridden_zds_app["content"]["extra_content_generation_policy"] = previous_policy
+            PublicatorRegistry.unregister("pdf")
+            if previous_publicator is not None:
+                PublicatorRegistry.registry["pdf"] = previous_publicator
+
+        self.addCleanup(restore)
+        self.addCleanup(shutil.rmtree, get_latex_build_directory(self.tuto.pk), ignore_errors=True)
+        self.overridden_zds_app["content"]["extra_content_generation_policy"] = "WATCHDOG"
+        PublicatorRegistry.registry["pdf"] = publicator = ZMarkdownRebberLatexPublicator(".pdf")
+
+        def fake_tex_compiler(texfile, draftmode=""):
+            base_path = os.path.splitext(texfile)[0]
+            Path(base_path + ".aux").write_text("stable")
+            if not draftmode:
+                Path(base_path + ".pdf").write_text("pdf")
+            return True
+
+        def publish_and_build_pdf():
+            published = publish_content(self.tuto, self.tuto.load_version())
+            self.tuto.public_version = published
+            self.tuto.sha_public = self.tuto.sha_draft
+            self.tuto.save()
+            for event in PublicationEvent.objects.filter(state_of_processing="REQUESTED", format_requested="pdf"):
+                self.assertEqual(process_publication_event(event.pk), (event.pk, "SUCCESS"))
+            return published
+
+        latex = "\\documentclass{article}\\begin{document}%s\\end{document}"
+        with patch.object(publicator, "tex_compiler", side_effect=fake_tex_compiler) as tex_compiler, patch(
+            "zds.tutorialv2.publication_utils.render_markdown", return_value=(latex % "First version", {}, [])
+        ) as render_latex:
+            published = publish_and_build_pdf()
+            self.assertEqual(tex_compiler.call_count, 3)
+            self.assertTrue(published.has_type("pdf"))
+
+            # the LaTeX did not change (the images were downloaded again), the previous PDF is kept
+            publish_and_build_pdf()
+            self.assertEqual(tex_compiler.call_count, 3)
+            self.assertTrue(published.has_type("pdf"))
+
+            # the auxiliary files of the previous build survived the publication
+            render_latex.return_value = (latex % "Second version", {}, [])
+            publish_and_build_pdf()
+            self.assertEqual(tex_compiler.call_count, 5)
+
+    def test_incremental_publication(self):
+        def fake_render_markdown(md, **kwargs):
+            def render(node):
+                if "children" not in node:
+                    return {"text": "<p>{}</p>".format(node.get("text", ""))}, len(node.get("text", ""))
+                rendered = {key: "<p>{}</p>".format(node.get(key, "")) for key in ("introduction", "conclusion")}
+                signs = len(node.get("introduction", "")) + len(node.get("conclusion", ""))
+                rendered["children"] = []
+                for child in node["children"]:
+                    rendered_child, child_signs = render(child)
+                    rendered["children"].append(rendered_child)
+                    signs += child_signs
+                return rendered, signs
+
+            rendered, signs = render(md)
+            return rendered, {"stats": {"signs": signs}}, []
+
+        self.overridden_zds_app["content"]["extra_content_generation_policy"] = "NOTHING"
+        chapter2 = ContainerFactory(parent=self.part1, db_object=self.tuto)
+        ExtractFactory(container=self.chapter1, db_object=self.tuto)
+        extract = ExtractFactory(container=chapter2, db_object=self.tuto)
+        self.tuto.sha_draft = extract.repo_update("Extract", "Some text")
+        self.tuto.save()
+
+        with patch("zds.tutorialv2.publish_container.render_markdown", side_effect=fake_render_markdown) as render:
+            published = publish_content(self.tuto, self.tuto.load_version())
+            # each container is rendered on its own
+            containers_count = len(list(iter_published_containers(self.tuto.load_version())))
+            self.assertEqual(render.call_count, containers_count)
+            self.tuto.public_version = published
+            self.tuto.save()
+            chapter1_path = Path(published.get_prod_path(), self.chapter1.get_prod_path(relative=True))
+            chapter2_path = Path(published.get_prod_path(), chapter2.get_prod_path(relative=True))
+            chapter1_inode = chapter1_path.stat().st_ino
+            info_path = Path(published.get_prod_path(), PUBLICATION_INFO_FILENAME)
+            info_inode = info_path.stat().st_ino
+            char_count = published.char_count
+
+            # change an extract of the second chapter
+            self.tuto.sha_draft = extract.repo_update("Extract", "Some other text")
+            self.tuto.save()
+            render.reset_mock()
+            published = publish_content(self.tuto, self.tuto.load_version())
+
+            # only the second chapter was rendered, the signs of the other containers are the ones of the previous
+            # publication
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(chapter1_path.stat().st_ino, chapter1_inode)
+            # the information about the publication is not written through a link to the previous one
+            self.assertNotEqual(info_path.stat().st_ino, info_inode)
+            self.assertIn("Some other text", chapter2_path.read_text())
+            self.assertEqual(published.char_count, char_count + len("Some other text") - len("Some text"))
+            self.assertEqual(published.load_public_version().title, self.tuto.title)
+
+            # the rendering changed (e.g. zmarkdown or the templates were upgraded): whole publication, even without
+            # any change in the content
+            self.tuto.public_version = published
+            self.tuto.save()
+            char_count = published.char_count
+            render.reset_mock()
+            with patch("zds.tutorialv2.publication_utils.get_rendering_fingerprint", return_value="upgraded"):
+                published = publish_content(self.tuto, self.tuto.load_version())
+            self.assertEqual(render.call_count, containers_count)
+            self.assertNotEqual(chapter1_path.stat().st_ino, chapter1_inode)
+            self.assertEqual(published.char_count, char_count)
+
+            # a change in the structure means a whole publication
+            self.tuto.public_version = published
+            self.tuto.sha_draft = self.tuto.load_version().repo_update("New title", "intro", "conclusion")
+            self.tuto.save()
+            render.reset_mock()
+            publish_content(self.tuto, self.tuto.load_version())
+            self.assertEqual(render.call_count, containers_count)
+
+        self.overridden_zds_app["content"]["extra_content_generation_policy"] = "SYNC"
+
     def test_image_with_non_ascii_chars(self):
         """seen on #4144"""
         article = PublishableContentFactory(type="article", author_list=[self.user_author])
@@ -594,14 +979,8 @@ class UtilsExportOnlyReadyToPublishTests(TutorialTestMixin, TestCase):
     def get_latex_file_path(self, published: PublishedContent):
         """
         Returns the LaTeX file path of a published content.
-        TODO: factorize this method with what is done in zds.tutorialv2.publication_utils.publish_content()
         """
-        tmp_path = os.path.join(
-            settings.ZDS_APP["content"]["repo_public_path"], published.content_public_slug + "__building"
-        )
-        build_extra_contents_path = os.path.join(tmp_path, settings.ZDS_APP["content"]["extra_contents_dirname"])
-        base_name = os.path.join(build_extra_contents_path, published.content_public_slug)
-        return base_name + ".tex"
+        return str(get_latex_build_directory(published.content_pk) / (published.content_public_slug + ".tex"))
 
     def create_content(self):
         """
@@ -1329,7 +1329,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path = os.path.join(tempfile.gettempdir(), "__draft1.zip")
         f = open(draft_zip_path, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         versioned = PublishableContent.objects.get(pk=tuto_pk).load_version()
@@ -1381,7 +1381,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path_2 = os.path.join(tempfile.gettempdir(), "__draft2.zip")
         f = open(draft_zip_path_2, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         versioned = PublishableContent.objects.get(pk=tuto_pk).load_version()
@@ -1409,7 +1409,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path_3 = os.path.join(tempfile.gettempdir(), "__draft3.zip")
         f = open(draft_zip_path_3, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         archive = zipfile.ZipFile(draft_zip_path_3, "r")
@@ -1488,7 +1488,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path = os.path.join(tempfile.gettempdir(), "__draft1.zip")
         f = open(draft_zip_path, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         first_version = PublishableContent.objects.get(pk=tuto_pk).load_version()
@@ -1605,7 +1605,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path = os.path.join(tempfile.gettempdir(), "__draft1.zip")
         f = open(draft_zip_path, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         first_version = PublishableContent.objects.get(pk=tuto_pk).load_version()
@@ -1708,7 +1708,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path = os.path.join(tempfile.gettempdir(), "__draft1.zip")
         f = open(draft_zip_path, "wb")
-        f.write(result.content)
+        f.write(b"".join(result.streaming_content))
         f.close()
 
         # create the archive with images:
@@ -1811,7 +1811,7 @@ class ContentTests(TutorialTestMixin, TestCase):
         self.assertEqual(result.status_code, 200)
         draft_zip_path = os.path.join(tempfile.gettempdir(), "__draft1.zip")
         with open(draft_zip_path, "wb") as f:
-            f.write(result.content)
+            f.write(b"".join(result.streaming_content))
 
         # Update readiness of part 2 and part1/chapter1
         # Failure to import this information defaults also to True, this is to make sure.
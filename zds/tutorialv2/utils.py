@@ -1,21 +1,31 @@
 from collections import OrderedDict, namedtuple
+from hashlib import sha256
 import os
 import logging
+import re
+import threading
+import time
+import zipfile
 from urllib.parse import urlsplit, urlunsplit, quote
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.http import Http404
 from django.utils.translation import gettext_lazy as _
 from git import Repo, Actor
+from git.objects.commit import Commit
 
 from django.conf import settings
 from zds.tutorialv2 import signals
 from zds.tutorialv2.models import CONTENT_TYPE_LIST
 from zds.utils import get_current_user
 from zds.utils.models import Licence
+from zds.utils.templatetags.emarkdown import prefetch_markdown
 from zds.utils.validators import slugify_raise_on_invalid, InvalidSlugError, check_slug
 
 logger = logging.getLogger(__name__)
 
+FULL_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
 
 def all_is_string_appart_from_given_keys(dict_representation, keys=("children",)):
     """check all keys are string appart from the children key
@@ -573,6 +583,68 @@ def clone_repo(old_path, new_path):
     return new_repo
 
 
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class ZipOutput:
+    """Non-seekable file object keeping what ``zipfile`` writes until it is sent (see ``stream_zip_of_git_tree()``)"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def write_git_tree_into_zip(zip_file, git_tree):
+    """Recursively add the files of a git tree into a zip archive. Each blob is copied by chunks, straight from the
+    repository, so that it is never completely loaded in memory. This is a generator, yielding after each chunk.
+
+    :param zip_file: a ``zipfile`` object (with writing permissions)
+    :param git_tree: Git tree (from ``repository.commit(sha).tree``)
+    """
+    for blob in git_tree.blobs:  # first, add files :
+        info = zipfile.ZipInfo(blob.path, time.localtime()[:6])
+        info.compress_type = zip_file.compression
+        info.external_attr = 0o600 << 16
+        info.file_size = blob.size
+        data_stream = blob.data_stream
+        with zip_file.open(info, "w") as entry:
+            for chunk in iter(lambda: data_stream.read(ZIP_CHUNK_SIZE), b""):
+                entry.write(chunk)
+                yield
+    for subtree in git_tree.trees:  # then, recursively add dirs :
+        yield from write_git_tree_into_zip(zip_file, subtree)
+
+
+def stream_zip_of_git_tree(git_tree):
+    """Build a zip archive of a git tree by chunks, so that it can be sent (e.g. with a ``StreamingHttpResponse``)
+    while it is built, with a memory usage that does not depend on the size of the content.
+
+    :param git_tree: Git tree (from ``repository.commit(sha).tree``)
+    :return: the successive chunks of the archive
+    :rtype: collections.Iterable[bytes]
+    """
+    output = ZipOutput()
+    with zipfile.ZipFile(output, "w") as zip_file:
+        for __ in write_git_tree_into_zip(zip_file, git_tree):
+            if output.size >= ZIP_CHUNK_SIZE:
+                yield output.pop()
+    yield output.pop()
+
+
 def get_commit_author():
     """get a dictionary that represent the commit author with ``author`` and ``comitter`` key. If there is no users,
     bot account pk is used.
@@ -702,6 +774,92 @@ class InvalidOperationError(RuntimeError):
     pass
 
 
+def prefetch_container_markdown(container, js_support=False):
+    """Render the introduction, the conclusion and the extracts of a container at once (see ``prefetch_markdown()``),
+    before the template renders them one by one with the ``emarkdown`` filter.
+
+    :param container: the container
+    :type container: zds.tutorialv2.models.versioned.Container
+    :param js_support: whether jsfiddle is enabled for the content
+    :type js_support: bool
+    """
+    texts = [container.get_introduction(), container.get_conclusion()]
+    texts.extend(child.get_text() for child in container.children if getattr(child, "text", None))
+    prefetch_markdown(texts, disable_jsfiddle=not js_support)
+
+
+_blob_indexes = OrderedDict()
+_blob_indexes_lock = threading.Lock()
+
+
+def _get_cached_blob_index(key, build):
+    with _blob_indexes_lock:
+        index = _blob_indexes.get(key)
+        if index is not None:
+            _blob_indexes.move_to_end(key)
+            return index
+
+    index = build()
+
+    with _blob_indexes_lock:
+        _blob_indexes[key] = index
+        while len(_blob_indexes) > settings.ZDS_APP["content"]["blob_index_cache_size"]:
+            _blob_indexes.popitem(last=False)
+
+    return index
+
+
+def get_blob_index(tree):
+    """Return a mapping between the (normalized) paths of the files contained into a tree and the sha of their blobs.
+
+    Since a git tree never changes, the mapping is built once (by walking the whole tree) and then kept in an LRU of
+    ``ZDS_APP["content"]["blob_index_cache_size"]`` entries.
+
+    :param tree: Git Tree object
+    :type tree: git.objects.tree.Tree
+    :rtype: dict
+    """
+    return _get_cached_blob_index(
+        (tree.repo.git_dir, "tree", tree.hexsha),
+        lambda: {os.path.normpath(item.path): item.binsha for item in tree.traverse() if item.type == "blob"},
+    )
+
+
+def get_commit_blob_index(repository, sha):
+    """Same as ``get_blob_index()`` for the tree of a given commit, without resolving the commit again when its index
+    is already known.
+
+    :param repository: the repository
+    :type repository: git.Repo
+    :param sha: sha of the commit
+    :type sha: str
+    :rtype: dict
+    """
+    if not FULL_SHA_PATTERN.match(str(sha)):  # not immutable (e.g. a branch name), so resolve it first
+        sha = repository.commit(sha).hexsha
+    return _get_cached_blob_index(
+        (repository.git_dir, "commit", sha), lambda: get_blob_index(repository.commit(sha).tree)
+    )
+
+
+def read_blob(repository, binsha):
+    """Return the data contained into a blob
+
+    :param repository: the repository
+    :type repository: git.Repo
+    :param binsha: binary sha of the blob (or ``None``)
+    :type binsha: bytes
+    :return: contains, or ``None`` if there is no blob
+    :rtype: str
+    """
+    if binsha is None:
+        return None
+    try:
+        return repository.odb.stream(binsha).read().decode()
+    except OSError:  # in case of deleted files, or the system cannot get the lock, juste return ""
+        return ""
+
+
 def get_blob(tree, path):
     """Return the data contained into a given file
 
@@ -712,24 +870,150 @@ def get_blob(tree, path):
     :return: contains
     :rtype: bytearray
     """
-    # get all extracts
-    for blob in tree.blobs:
-        try:
-            if os.path.abspath(blob.path) == os.path.abspath(path):
-                data = blob.data_stream.read().decode()
-                return data
-        except OSError:  # in case of deleted files, or the system cannot get the lock, juste return ""
-            return ""
-    # traverse directories when we are at root or in a part or chapter
-    if len(tree.trees) > 0:
-        for subtree in tree.trees:
-            result = get_blob(subtree, path)
-            if result is not None:
-                return result
+    return read_blob(tree.repo, get_blob_index(tree).get(os.path.normpath(path)))
+
+
+def get_commit_blob(repository, sha, path):
+    """Return the data contained into a given file of a given commit
+
+    :param repository: the repository
+    :type repository: git.Repo
+    :param sha: sha of the commit
+    :type sha: str
+    :param path: Path to file
+    :type path: str
+    :return: contains
+    :rtype: str
+    """
+    return read_blob(repository, get_commit_blob_index(repository, sha).get(os.path.normpath(path)))
+
+
+class CommitHistory:
+    """Lazy list of the commits reachable from a revision (the most recent first), made to be paginated: only the
+    commits of the requested slice are read from the repository (with ``git rev-list --skip --max-count``), and the
+    number of commits is cached for each head, since the history of a given commit never changes.
+    """
+
+    def __init__(self, repository, rev="HEAD"):
+        """
+        :param repository: the repository
+        :type repository: git.Repo
+        :param rev: the revision from which the history is read
+        :type rev: str
+        """
+        self.repository = repository
+        self.head_sha = repository.commit(rev).hexsha
+        self._count = None
+
+    def count(self):
+        """
+        :return: the number of commits of the history
+        :rtype: int
+        """
+        if self._count is None:
+            cache_key = "git-history-count-" + self.head_sha
+            self._count = cache.get(cache_key)
+            if self._count is None:
+                self._count = int(self.repository.git.rev_list("--count", self.head_sha))
+                cache.set(cache_key, self._count, settings.ZDS_APP["content"]["commits_count_timeout"])
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count())
+            if step != 1:
+                raise ValueError("Only contiguous slices of the history can be read.")
+            if stop <= start:
+                return []
+            return list(Commit.iter_items(self.repository, self.head_sha, skip=start, max_count=stop - start))
+        if index < 0:
+            index += self.count()
+        commits = self[index : index + 1] if index >= 0 else []
+        if not commits:
+            raise IndexError("No such commit in the history.")
+        return commits[0]
+
+
+_manifests = OrderedDict()
+_manifests_lock = threading.Lock()
+
+
+def get_manifest_cache_key(content_pk, sha, public, path):
+    """Return the key of a manifest in the manifest cache, or ``None`` if it cannot be cached.
+
+    Only manifests of a given sha can be cached, since they never change. The path of the repository (or of the
+    public directory) is part of the key, so that moving it (e.g. on slug change) does not use an old manifest.
+
+    :param content_pk: pk of the content
+    :type content_pk: int
+    :param sha: version of the content
+    :type sha: str
+    :param public: whether it is the manifest of the public version
+    :type public: bool
+    :param path: path of the repository or of the public directory
+    :type path: str
+    :rtype: str
+    """
+    if not FULL_SHA_PATTERN.match(str(sha)):
         return None
-    else:
+    return "manifest-" + sha256(f"{content_pk}:{sha}:{bool(public)}:{path}".encode("utf-8")).hexdigest()
+
+
+def get_cached_manifest(key):
+    """Return the (raw) manifest stored in the process memory or, if enabled, in the Django cache.
+
+    Raw JSON is stored, so that each caller gets its own copy of the manifest once parsed.
+
+    :param key: key of the manifest (see ``get_manifest_cache_key()``)
+    :type key: str
+    :return: the manifest, or ``None`` if not cached
+    :rtype: str
+    """
+    if key is None:
         return None
 
+    with _manifests_lock:
+        data = _manifests.get(key)
+        if data is not None:
+            _manifests.move_to_end(key)
+            return data
+
+    if settings.ZDS_APP["content"]["manifest_cache"]["use_django_cache"]:
+        data = cache.get(key)
+        if data is not None:
+            _set_local_manifest(key, data)
+
+    return data
+
+
+def set_cached_manifest(key, data):
+    """Store a (raw) manifest in the manifest cache (see ``get_cached_manifest()``).
+
+    :param key: key of the manifest (see ``get_manifest_cache_key()``)
+    :type key: str
+    :param data: raw JSON
+    :type data: str
+    """
+    if key is None:
+        return
+
+    _set_local_manifest(key, data)
+
+    config = settings.ZDS_APP["content"]["manifest_cache"]
+    if config["use_django_cache"]:
+        cache.set(key, data, config["timeout"])
+
+
+def _set_local_manifest(key, data):
+    with _manifests_lock:
+        _manifests[key] = data
+        _manifests.move_to_end(key)
+        while len(_manifests) > settings.ZDS_APP["content"]["manifest_cache"]["local_size"]:
+            _manifests.popitem(last=False)
+
 
 class BadArchiveError(Exception):
     """The exception that is raised when a bad archive is sent"""
@@ -28,6 +28,8 @@ from zds.tutorialv2.utils import (
     BadManifestError,
     default_slug_pool,
     init_new_repo,
+    stream_zip_of_git_tree,
+    write_git_tree_into_zip,
 )
 from zds.utils.validators import InvalidSlugError
 from zds.utils.uuslug_wrapper import slugify
@@ -49,31 +51,17 @@ class DownloadContent(LoginRequiredMixin, SingleContentDownloadViewMixin):
         :param zip_file: a ``zipfile`` object (with writing permissions)
         :param git_tree: Git tree (from ``repository.commit(sha).tree``)
         """
-        for blob in git_tree.blobs:  # first, add files :
-            zip_file.writestr(blob.path, blob.data_stream.read())
-        if git_tree.trees:  # then, recursively add dirs :
-            for subtree in git_tree.trees:
-                DownloadContent.insert_into_zip(zip_file, subtree)
+        for __ in write_git_tree_into_zip(zip_file, git_tree):
+            pass
 
     def get_contents(self):
-        """get the zip file stream
+        """get the zip file stream, built while it is sent
 
-        :return: a zip file
-        :rtype: byte
+        :return: the chunks of the zip file
+        :rtype: collections.Iterable[bytes]
         """
         versioned = self.versioned_object
-
-        # create and fill zip
-        path = self.object.get_repo_path()
-        zip_path = path + self.get_filename()
-        zip_file = zipfile.ZipFile(zip_path, "w")
-        self.insert_into_zip(zip_file, versioned.repository.commit(versioned.current_version).tree)
-        zip_file.close()
-
-        # return content
-        response = open(zip_path, "rb").read()
-        os.remove(zip_path)
-        return response
+        return stream_zip_of_git_tree(versioned.repository.commit(versioned.current_version).tree)
 
     def get_filename(self):
         return self.get_object().slug + ".zip"
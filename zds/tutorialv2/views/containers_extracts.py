@@ -26,6 +26,7 @@ from zds.tutorialv2.utils import (
     search_extract_or_404,
     try_adopt_new_child,
     TooDeepContainerError,
+    prefetch_container_markdown,
 )
 
 logger = logging.getLogger(__name__)
@@ -126,6 +127,7 @@ class DisplayContainer(LoginRequiredMixin, SingleContentDetailViewMixin):
         else:
             is_js = ""
         context["is_js"] = is_js
+        prefetch_container_markdown(container, self.object.js_support)
 
         return context
 
@@ -41,7 +41,7 @@ from zds.tutorialv2.mixins import (
     FormWithPreview,
 )
 from zds.tutorialv2.models.database import PublishableContent, Validation, ContentContribution, ContentSuggestion
-from zds.tutorialv2.utils import init_new_repo
+from zds.tutorialv2.utils import init_new_repo, prefetch_container_markdown
 from zds.tutorialv2.views.authors import RemoveAuthorFromContent
 from zds.tutorialv2.views.goals import EditGoalsForm
 from zds.utils.models import get_hat_from_settings
@@ -198,6 +198,7 @@ class DisplayContent(LoginRequiredMixin, SingleContentDetailViewMixin):
         else:
             is_js = ""
         context["is_js"] = is_js
+        prefetch_container_markdown(self.versioned_object, self.object.js_support)
 
         self.get_forms(context)
 
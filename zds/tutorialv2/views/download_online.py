@@ -61,12 +61,10 @@ class DownloadOnlineContent(SingleOnlineContentViewMixin, DownloadViewMixin):
     def get_contents(self):
         path = os.path.join(self.public_content_object.get_extra_contents_directory(), self.get_filename())
         try:
-            response = open(path, "rb").read()
+            return open(path, "rb")
         except OSError:
             raise Http404("Le fichier n'existe pas.")
 
-        return response
-
 
 class DownloadOnlineArticle(DownloadOnlineContent):
 
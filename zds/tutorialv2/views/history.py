@@ -2,12 +2,13 @@ import logging
 
 from django.conf import settings
 from django.http import Http404
-from git import objects, GitCommandError
+from git import GitCommandError
 from gitdb.exc import BadName, BadObject
 
 from zds.member.decorator import LoggedWithReadWriteHability
 from zds.tutorialv2.mixins import SingleContentDetailViewMixin
 from zds.tutorialv2.models.database import PublishableContent
+from zds.tutorialv2.utils import CommitHistory
 from zds.utils.paginator import make_pagination
 
 logger = logging.getLogger(__name__)
@@ -26,9 +27,9 @@ class DisplayHistory(LoggedWithReadWriteHability, SingleContentDetailViewMixin):
         context = super().get_context_data(**kwargs)
 
         repo = self.versioned_object.repository
-        commits = list(objects.commit.Commit.iter_items(repo, "HEAD"))
+        commits = CommitHistory(repo)
 
-        # Pagination of commits
+        # Pagination of commits (only the ones of the page are read)
         make_pagination(
             context, self.request, commits, settings.ZDS_APP["content"]["commits_per_page"], context_list_name="commits"
         )
@@ -4,7 +4,7 @@ from django.conf import settings
 
 from zds import __version__, git_version
 
-from .header_notifications import get_header_notifications
+from .header_notifications import get_header_counters
 
 
 def get_version():
@@ -34,13 +34,17 @@ def version(request):
 
 
 def header_notifications(request):
+    """
+    A context processor with the counters displayed in the header. The lists themselves are loaded when the
+    dropdowns are opened (see ``zds.notification.views.header_dropdown``).
+    """
     user = request.user
-    results = get_header_notifications(user)
+    results = get_header_counters(user)
     if results is None:
         # Unauthorized
         return {}
     # Prefix every key with `header_`
-    return {"header_" + k: v for k, v in results.items()}
+    return {"header_" + k: v is not False and {"total": v} for k, v in results.items()}
 
 
 def app_settings(request):
@@ -1,4 +1,9 @@
+from uuid import uuid4
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.utils.translation import gettext_lazy as _
 
 from zds.forum.models import Post
@@ -44,32 +49,106 @@ def _alerts_to_list(alerts_query):
     return [_alert_to_dict(a) for a in query]
 
 
-def get_header_notifications(user):
+HEADER_LISTS = ("general_notifications", "private_topic_notifications", "alerts")
+ALERTS_VERSION_KEY = "header_counters_alerts_version"
+
+
+def _header_counters_key(user_pk):
+    return f"header_counters_user_pk={user_pk}"
+
+
+def invalidate_header_counters(user_pks):
+    """Forget the cached header counters of the given users, because their unread notifications changed (or because
+    they are deleted, so that their counters are not used by a new user with the same pk).
+
+    :param user_pks: the pks of the users
+    :type user_pks: iterable of int
+    """
+    cache.delete_many([_header_counters_key(user_pk) for user_pk in user_pks])
+
+
+def invalidate_alerts_counter():
+    """Forget the cached number of unsolved alerts (of all the staff members)."""
+    cache.set(ALERTS_VERSION_KEY, uuid4().hex, None)
+
+
+def _compute_header_counters(user, with_alerts, alerts_version):
+    private_topic = ContentType.objects.get_for_model(PrivateTopic)
+    counts = Notification.objects.filter(subscription__user=user, is_read=False).aggregate(
+        total=Count("pk"), private=Count("pk", filter=Q(subscription__content_type=private_topic))
+    )
+    return {
+        "general_notifications": counts["total"] - counts["private"],
+        "private_topic_notifications": counts["private"],
+        "alerts": with_alerts and Alert.objects.filter(solved=False).count(),
+        "alerts_version": alerts_version,
+    }
+
+
+def get_header_counters(user):
+    """Get the numbers displayed in the header: unread notifications, unread private topics and, for the staff,
+    unsolved alerts.
+
+    They are cached, so that they usually cost a single cache lookup per page.
+
+    :param user: the user
+    :return: the counters, by kind of list, or ``None`` if the user is not authenticated
+    :rtype: dict
+    """
     if not user.is_authenticated:
         return None
 
-    private_topic = ContentType.objects.get_for_model(PrivateTopic)
+    with_alerts = user.has_perm("forum.change_post")
+    key = _header_counters_key(user.pk)
+    cached = cache.get_many([key, ALERTS_VERSION_KEY])
+    counters = cached.get(key)
+    alerts_version = cached.get(ALERTS_VERSION_KEY)
+
+    if (
+        counters is None
+        or (counters["alerts"] is False) == with_alerts
+        or (with_alerts and counters["alerts_version"] != alerts_version)
+    ):
+        if alerts_version is None:
+            alerts_version = uuid4().hex
+            cache.set(ALERTS_VERSION_KEY, alerts_version, None)
+        counters = _compute_header_counters(user, with_alerts, alerts_version)
+        cache.set(key, counters, settings.ZDS_APP["notification"]["header_counters_timeout"])
+
+    return {kind: counters[kind] for kind in HEADER_LISTS}
+
+
+def get_header_list(user, kind):
+    """Get the (ten) last items of one of the lists displayed in the header.
+
+    :param user: the user
+    :param kind: one of ``HEADER_LISTS``
+    :return: the items, or ``None`` if the user cannot see this list
+    :rtype: list
+    """
+    if kind == "alerts":
+        if not user.has_perm("forum.change_post"):
+            return None
+        return _alerts_to_list(Alert.objects.filter(solved=False))
 
+    private_topic = ContentType.objects.get_for_model(PrivateTopic)
     notifications = Notification.objects.filter(subscription__user=user, is_read=False)
+    if kind == "private_topic_notifications":
+        return _notifications_to_list(notifications.filter(subscription__content_type=private_topic))
+    return _notifications_to_list(notifications.exclude(subscription__content_type=private_topic))
 
-    general_notifications = notifications.exclude(subscription__content_type=private_topic)
 
-    private_notifications = notifications.filter(subscription__content_type=private_topic)
+def get_header_notifications(user):
+    """Get both the counters and the lists displayed in the header.
 
-    alerts = Alert.objects.filter(solved=False)
+    :param user: the user
+    :rtype: dict
+    """
+    counters = get_header_counters(user)
+    if counters is None:
+        return None
 
     return {
-        "general_notifications": {
-            "total": general_notifications.count(),
-            "list": _notifications_to_list(general_notifications),
-        },
-        "private_topic_notifications": {
-            "total": private_notifications.count(),
-            "list": _notifications_to_list(private_notifications),
-        },
-        "alerts": user.has_perm("forum.change_post")
-        and {
-            "total": alerts.count(),
-            "list": _alerts_to_list(alerts),
-        },
+        kind: counters[kind] is not False and {"total": counters[kind], "list": get_header_list(user, kind)}
+        for kind in HEADER_LISTS
     }
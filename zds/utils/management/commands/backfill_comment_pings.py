@@ -0,0 +1,33 @@
+from django.core.management import BaseCommand
+
+from zds.utils.models import Comment
+from zds.utils.templatetags.emarkdown import render_markdown
+
+
+class Command(BaseCommand):
+    help = "Store the pinged usernames of the comments for which they are unknown"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, dest="batch_size", default=500)
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(pings__isnull=True).order_by("pk")
+        total = comments.count()
+        done = 0
+        last_pk = 0
+
+        while True:
+            batch = list(comments.filter(pk__gt=last_pk).values_list("pk", "text")[: options["batch_size"]])
+            if not batch:
+                break
+
+            for pk, text in batch:
+                html, metadata, _ = render_markdown(text)
+                if text and not html:  # rendering failed, pings remain unknown
+                    continue
+                # `update()` is used to avoid the side effects of `save()` (pings notifications, spam alerts, etc)
+                Comment.objects.filter(pk=pk).update(pings=metadata.get("ping", []))
+
+            done += len(batch)
+            last_pk = batch[-1][0]
+            self.stdout.write(f"{done}/{total} comments processed")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from zds.utils.profiling import clear_profiling_report, get_profiling_report
+
+SORT_FIELDS = ("queries", "max_queries", "duplicates", "db_time", "duration", "zmd", "es")
+
+
+class Command(BaseCommand):
+    """
+    `python manage.py profiling_report`; print the views which cost the most, according to the requests recorded by
+    the `ProfilingMiddleware` (see ``ZDS_APP["profiling"]``).
+
+    """
+
+    help = "Print the views which run the most SQL queries (or take the most time...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sort", choices=SORT_FIELDS, default="queries", help="Criterion (mean by request).")
+        parser.add_argument("--limit", type=int, default=20, help="Number of views printed.")
+        parser.add_argument("--clear", action="store_true", help="Forget the recorded requests.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            clear_profiling_report()
+            self.stdout.write("Cleared the profiling report.")
+            return
+
+        report = sorted(get_profiling_report(), key=lambda view: view[options["sort"]], reverse=True)
+        if not report:
+            self.stdout.write("No request was profiled (is ZDS_APP['profiling']['enabled'] set?).")
+            return
+
+        self.stdout.write(
+            f"{'view':<50} {'requests':>8} {'queries':>8} {'max':>5} {'dupl.':>6} "
+            f"{'db (ms)':>8} {'total (ms)':>10} {'zmd':>5} {'es':>5}"
+        )
+        for view in report[: options["limit"]]:
+            self.stdout.write(
+                f"{view['view_name']:<50} {view['requests']:>8} {view['queries']:>8.1f} {view['max_queries']:>5} "
+                f"{view['duplicates']:>6.1f} {view['db_time'] * 1000:>8.1f} {view['duration'] * 1000:>10.1f} "
+                f"{view['zmd']:>5.1f} {view['es']:>5.1f}"
+            )
+            for sql, count in view["duplicated_fingerprints"]:
+                self.stdout.write(f"    {count} × {sql[:150]}")
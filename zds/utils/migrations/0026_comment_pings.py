@@ -0,0 +1,18 @@
+# Generated by Django 3.2.14 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("utils", "0025_move_helpwriting"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="pings",
+            field=models.JSONField(blank=True, default=None, null=True, verbose_name="Membres mentionnés"),
+        ),
+    ]
@@ -415,6 +415,10 @@ class Comment(models.Model):
 
     is_potential_spam = models.BooleanField("Est potentiellement du spam", default=False)
 
+    # Usernames pinged by the last rendering of `text`, so that editing a comment does not need to render the
+    # previous text again. `None` means that they are unknown (see the `backfill_comment_pings` command).
+    pings = models.JSONField("Membres mentionnés", null=True, blank=True, default=None)
+
     def update_content(self, text, on_error=None):
         """
         Updates the content of this comment.
@@ -436,7 +440,12 @@ class Comment(models.Model):
         if not hasattr(self, "old_text"):
             self.old_text = self.text
 
-        _, old_metadata, _ = render_markdown(self.text)
+        if self.pings is not None:
+            old_metadata = {"ping": self.pings}
+        elif not self.text:
+            old_metadata = {}
+        else:
+            _, old_metadata, _ = render_markdown(self.text)
         html, new_metadata, _ = render_markdown(text, on_error=on_error)
 
         # These attributes will be used by `_save_compute_pings` to create notifications if needed.
@@ -447,6 +456,7 @@ class Comment(models.Model):
 
         self.text = text
         self.text_html = html
+        self.pings = new_metadata.get("ping", [])
 
     def save(self, *args, **kwargs):
         """
@@ -1,13 +1,139 @@
+from hashlib import sha1
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
 from django.views.generic import ListView
 from django.views.generic.list import MultipleObjectMixin
 from django.core.paginator import Paginator, EmptyPage
 from django.http import Http404
 
 
+class KeysetPaginator(Paginator):
+    """
+    A paginator fetching the items of a page by seeking from the last item of the previous page (its *anchor*)
+    instead of skipping all the previous items with an OFFSET, so that the deep pages of a list cost the same as the
+    first one.
+
+    The anchor of each page is cached: it is computed once (by a query on the ordering fields only), and the anchor of
+    the next page is stored while fetching a page.
+
+    :param object_list: the queryset to paginate
+    :param per_page: number of items in a page
+    :param keys: the fields ordering the list (as given to ``order_by()``), which must identify an item. The items
+                 whose value of a field is null are listed after the others (whatever the order of the field).
+    :param cache_key: prefix of the cache keys of the anchors, identifying the list (no cache if ``None``)
+    """
+
+    def __init__(self, object_list, per_page, keys, cache_key=None, orphans=0, allow_empty_first_page=True):
+        if orphans:
+            raise ValueError("Orphans are not supported by the keyset pagination")
+        self.keys = keys
+        self.cache_key = cache_key
+        # the null values are only taken care of for nullable fields, not to prevent the use of indexes
+        self.nullable_keys = {field for field in keys if self.is_nullable(object_list.model, field.lstrip("-"))}
+        ordering = []
+        for field in keys:
+            if field not in self.nullable_keys:
+                ordering.append(field)
+            elif field.startswith("-"):
+                ordering.append(F(field[1:]).desc(nulls_last=True))
+            else:
+                ordering.append(F(field).asc(nulls_last=True))
+        super().__init__(object_list.order_by(*ordering), per_page, orphans, allow_empty_first_page)
+
+    @staticmethod
+    def is_nullable(model, field):
+        """Check if a field (possibly through relations, like ``last_message__pubdate``) may be null."""
+        for name in field.split("__"):
+            model_field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+            if model_field.null:
+                return True
+            model = model_field.related_model
+        return False
+
+    def page(self, number):
+        number = self.validate_number(number)
+        previous_item = None
+        if number == 1:
+            object_list = list(self.object_list[: self.per_page])
+        else:
+            # fetch the last item of the previous page too, as some lists display it
+            object_list = list(self.object_list.filter(self.seek(self.get_anchor(number), True))[: self.per_page + 1])
+            if object_list:
+                previous_item = object_list.pop(0)
+
+        if object_list and number < self.num_pages:
+            self.set_anchor(number + 1, self.get_key(object_list[-1]))
+
+        page = self._get_page(object_list, number, self)
+        page.previous_item = previous_item
+        return page
+
+    def get_key(self, item):
+        """Get the values of the ordering fields of an item."""
+        key = []
+        for field in self.keys:
+            value = item
+            for attribute in field.lstrip("-").split("__"):
+                value = getattr(value, attribute)
+                if value is None:  # e.g. a null foreign key
+                    break
+            key.append(value)
+        return key
+
+    def seek(self, anchor, including_anchor=False):
+        """Build the condition selecting the items after the anchor."""
+        condition = Q()
+        for i, field in enumerate(self.keys):
+            name = field.lstrip("-")
+            value = anchor[i]
+            last_key = i == len(self.keys) - 1
+            if value is None:
+                # the null values come last, so only the anchor itself can come after
+                if not (including_anchor and last_key):
+                    continue
+                after = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if field.startswith("-") else "gt"
+                if including_anchor and last_key:
+                    lookup += "e"
+                after = Q(**{f"{name}__{lookup}": value})
+                if field in self.nullable_keys:
+                    after |= Q(**{f"{name}__isnull": True})
+
+            equal_keys = Q()
+            for previous, previous_value in zip(self.keys[:i], anchor):
+                previous = previous.lstrip("-")
+                if previous_value is None:
+                    equal_keys &= Q(**{f"{previous}__isnull": True})
+                else:
+                    equal_keys &= Q(**{previous: previous_value})
+            condition |= equal_keys & after
+        return condition
+
+    def get_anchor(self, number):
+        """Get the key of the last item before the given page."""
+        anchor = cache.get(self._anchor_cache_key(number)) if self.cache_key else None
+        if anchor is None:
+            fields = [field.lstrip("-") for field in self.keys]
+            anchor = list(self.object_list.values_list(*fields)[(number - 1) * self.per_page - 1])
+            self.set_anchor(number, anchor)
+        return anchor
+
+    def set_anchor(self, number, anchor):
+        if self.cache_key:
+            cache.set(self._anchor_cache_key(number), anchor, settings.ZDS_APP["paginator"]["keyset_anchors_timeout"])
+
+    def _anchor_cache_key(self, number):
+        return f"{self.cache_key}_{self.per_page}_{number}"
+
+
 class ZdSPagingListView(ListView):
     paginator = None
     page = 1
+    # if defined, the pages are fetched with a ``KeysetPaginator`` ordered by these fields
+    paginate_keys = None
 
     def get_context_data(self, **kwargs):
         """
@@ -39,15 +165,31 @@ class ZdSPagingListView(ListView):
         context.update(kwargs)
         return super(MultipleObjectMixin, self).get_context_data(**context)
 
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        if self.paginate_keys is None:
+            return super().get_paginator(queryset, per_page, orphans, allow_empty_first_page, **kwargs)
+        return KeysetPaginator(
+            queryset, per_page, self.paginate_keys, self.get_keyset_cache_key(queryset), orphans, allow_empty_first_page
+        )
+
+    def get_keyset_cache_key(self, queryset):
+        """
+        Get the prefix of the cache keys of the anchors of the pages, when the keyset pagination is used. The anchors
+        of a list must be forgotten when the items can be inserted elsewhere than at its end.
+        """
+        return "keyset_" + sha1(str(queryset.query).encode()).hexdigest()
+
     def build_list_with_previous_item(self, queryset):
         """
         For some list paginated, we would like to display the last item of the previous page.
         This function returns the list paginated with this previous item.
         """
-        original_list = queryset.all()
+        original_list = queryset if isinstance(queryset, list) else queryset.all()
         items_list = []
         # If necessary, add the last item in the previous page.
-        if self.page.number != 1:
+        if getattr(self.page, "previous_item", None) is not None:
+            items_list.append(self.page.previous_item)
+        elif self.page.number != 1:
             last_page = self.paginator.page(self.page.number - 1).object_list
             last_item = last_page[len(last_page) - 1]
             items_list.append(last_item)
@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+PROFILING_VIEWS_CACHE_KEY = "profiling-views"
+PROFILING_SAMPLES_CACHE_KEY = "profiling-samples-{}"
+
+# a context variable rather than a thread local, so that the calls made from other threads (like the ones of
+# ``render_markdown_many()``) are recorded too when the tasks are run in a copy of the context
+_current_profile = ContextVar("current_profile", default=None)
+
+
+def fingerprint(sql):
+    """Normalize a SQL query, so that the queries which only differ by their parameters (like the ones of a N+1
+    pattern) share the same fingerprint.
+
+    :param sql: the query, with placeholders for the parameters
+    :type sql: str
+    :rtype: str
+    """
+
+    sql = re.sub(r"\b\d+\b", "?", sql)
+    sql = re.sub(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)", "(...)", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class RequestProfile:
+    """What a request (or any block of code, see ``profile_block()``) costs: its SQL queries (number, duration and
+    fingerprints) and its calls to the other services (zmarkdown, Elasticsearch).
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.calls = Counter()
+        self.calls_time = Counter()
+        self.calls_lock = threading.Lock()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Wrapper of the execution of the SQL queries (see ``django.db.connection.execute_wrapper()``)."""
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def record_call(self, service, duration):
+        with self.calls_lock:
+            self.calls[service] += 1
+            self.calls_time[service] += duration
+
+    @property
+    def duplicates(self):
+        """Number of queries which repeat an earlier one (up to the parameters)."""
+        return sum(count - 1 for count in self.fingerprints.values())
+
+    def duplicated_fingerprints(self, number=3):
+        """
+        :param number: maximum number of fingerprints
+        :type number: int
+        :return: the fingerprints of the queries run more than once, and how many times, the most repeated first
+        :rtype: list[tuple[str, int]]
+        """
+        return [(sql, count) for sql, count in self.fingerprints.most_common(number) if count > 1]
+
+    def to_sample(self):
+        return {
+            "queries": self.queries,
+            "duplicates": self.duplicates,
+            "db_time": self.db_time,
+            "duration": self.duration,
+            "zmd": self.calls["zmd"],
+            "es": self.calls["es"],
+            "duplicated_fingerprints": self.duplicated_fingerprints(),
+        }
+
+
+@contextmanager
+def profile_block():
+    """Profile the code run in the block, in this context (and the tasks run in a copy of it).
+
+    :return: the profile, filled at the end of the block
+    :rtype: RequestProfile
+    """
+
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield profile
+    finally:
+        profile.duration = time.perf_counter() - start
+        _current_profile.reset(token)
+
+
+def record_call(service, duration):
+    """Record a call to another service in the profile of the current request, if it is profiled.
+
+    :param service: the service, either "zmd" or "es"
+    :type service: str
+    :param duration: duration of the call, in seconds
+    :type duration: float
+    """
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record_call(service, duration)
+
+
+def store_profile(view_name, profile):
+    """Keep the profile of a request to a view, with the last ``ZDS_APP["profiling"]["samples_per_view"]`` ones.
+
+    The samples are kept in the cache, so that the ones of all the workers are gathered. The updates are not atomic:
+    a few samples may be lost, which is fine for statistics.
+
+    :param view_name: the name of the view
+    :type view_name: str
+    :param profile: the profile
+    :type profile: RequestProfile
+    """
+
+    config = settings.ZDS_APP["profiling"]
+    samples_key = PROFILING_SAMPLES_CACHE_KEY.format(view_name)
+    samples = cache.get(samples_key, [])
+    samples.append(profile.to_sample())
+    cache.set(samples_key, samples[-config["samples_per_view"] :], timeout=config["timeout"])
+
+    views = cache.get(PROFILING_VIEWS_CACHE_KEY, set())
+    if view_name not in views:
+        views.add(view_name)
+        cache.set(PROFILING_VIEWS_CACHE_KEY, views, timeout=config["timeout"])
+
+
+def get_profiling_report():
+    """
+    :return: the statistics of each profiled view: the number of requests, the mean and maximal number of queries,
+             the mean number of duplicated queries, database time, duration and calls to zmarkdown and Elasticsearch,
+             and the most repeated queries
+    :rtype: list[dict]
+    """
+
+    views = sorted(cache.get(PROFILING_VIEWS_CACHE_KEY, set()))
+    all_samples = cache.get_many([PROFILING_SAMPLES_CACHE_KEY.format(view_name) for view_name in views])
+
+    report = []
+    for view_name in views:
+        samples = all_samples.get(PROFILING_SAMPLES_CACHE_KEY.format(view_name))
+        if not samples:
+            continue
+
+        def mean(field):
+            return sum(sample[field] for sample in samples) / len(samples)
+
+        duplicated = Counter()
+        for sample in samples:
+            for sql, count in sample["duplicated_fingerprints"]:
+                duplicated[sql] = max(duplicated[sql], count)
+
+        report.append(
+            {
+                "view_name": view_name,
+                "requests": len(samples),
+                "queries": mean("queries"),
+                "max_queries": max(sample["queries"] for sample in samples),
+                "duplicates": mean("duplicates"),
+                "db_time": mean("db_time"),
+                "duration": mean("duration"),
+                "zmd": mean("zmd"),
+                "es": mean("es"),
+                "duplicated_fingerprints": duplicated.most_common(3),
+            }
+        )
+    return report
+
+
+def clear_profiling_report():
+    views = cache.get(PROFILING_VIEWS_CACHE_KEY, set())
+    cache.delete_many([PROFILING_SAMPLES_CACHE_KEY.format(view_name) for view_name in views])
+    cache.delete(PROFILING_VIEWS_CACHE_KEY)
@@ -1,14 +1,25 @@
+import contextvars
 import re
 import json
 import logging
-from requests import post, HTTPError
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from requests import Session, ConnectionError, HTTPError, Timeout
+from requests.adapters import HTTPAdapter
 
 from django import template
 from django.conf import settings
+from django.core.cache import cache
 from django.template.defaultfilters import stringfilter
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
+from zds.utils.profiling import record_call
+
 logger = logging.getLogger(__name__)
 register = template.Library()
 """
@@ -27,9 +38,220 @@ FORMAT_ENDPOINTS = {
 }
 
 
+class RenderCache:
+    """Cache of the zmarkdown server responses, keyed by a hash of the markdown input, the output format and the
+    options, so that rendering the same text again does not need a new HTTP request.
+
+    Entries are kept in a local LRU, bounded to ``ZDS_APP["zmd"]["cache"]["local_size"]`` entries, and, if
+    ``ZDS_APP["zmd"]["cache"]["use_django_cache"]`` is set, in the Django cache, in order to share them between
+    workers. Only the HTML renderings are cached, since the other formats may download images as a side effect.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_config():
+        return settings.ZDS_APP["zmd"].get("cache", {})
+
+    @staticmethod
+    def make_key(md_input, output_format, opts):
+        """
+        :param md_input: markdown input (or manifest, if ``full_json`` is used)
+        :param str output_format: output format
+        :param dict opts: options sent to the zmarkdown server
+        :return: the key of the rendering
+        :rtype: str
+        """
+        payload = json.dumps([output_format, opts, md_input], sort_keys=True, default=str)
+        return "zmd-render-" + sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        :param str key: the key of the rendering
+        :return: the raw response of the zmarkdown server, or ``None`` on a miss
+        :rtype: str|None
+        """
+        config = self.get_config()
+
+        with self._lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+
+        if value is None and config.get("use_django_cache", False):
+            value = cache.get(key)
+            if value is not None:
+                self._set_local(key, value)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, key, value):
+        """
+        :param str key: the key of the rendering
+        :param str value: the raw response of the zmarkdown server
+        """
+        config = self.get_config()
+
+        self._set_local(key, value)
+        if config.get("use_django_cache", False):
+            cache.set(key, value, config.get("timeout", 60 * 60 * 24))
+
+    def _set_local(self, key, value):
+        local_size = self.get_config().get("local_size", 0)
+        if local_size <= 0:
+            return
+
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > local_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        :return: the number of hits and misses, and the number of entries in the local LRU
+        :rtype: dict
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "local_entries": len(self.entries)}
+
+
+render_cache = RenderCache()
+
+
+class LatencyHistogram:
+    """Histogram of the durations of the requests to an endpoint, in seconds."""
+
+    buckets = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, duration):
+        self.counts[bisect_left(self.buckets, duration)] += 1
+        self.count += 1
+        self.total += duration
+
+    def to_dict(self):
+        """
+        :return: the number of requests below each bucket bound (cumulated), the number of requests and their
+                 total duration
+        :rtype: dict
+        """
+        cumulated = 0
+        counts = {}
+        for bound, count in zip(self.buckets + ("+inf",), self.counts):
+            cumulated += count
+            counts[str(bound)] = cumulated
+        return {"buckets": counts, "count": self.count, "sum": self.total}
+
+
+class ZMarkdownClient:
+    """HTTP client of the zmarkdown server, shared by the whole process.
+
+    It keeps a ``requests.Session``, so that connections to the server are kept alive and reused (up to
+    ``ZDS_APP["zmd"]["pool_size"]`` of them), and retries a failed request (connection error, timeout or server
+    error) up to ``MAX_ATTEMPTS`` times, with an exponential backoff starting at ``ZDS_APP["zmd"]["retry_backoff"]``
+    seconds. The duration of the requests is recorded for each endpoint.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._lock = threading.Lock()
+        self.latencies = {endpoint: LatencyHistogram() for endpoint in FORMAT_ENDPOINTS.values()}
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    pool_size = settings.ZDS_APP["zmd"].get("pool_size", 10)
+                    session = Session()
+                    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                    self._session = session
+        return self._session
+
+    @staticmethod
+    def get_timeout(output_format, full_json=False):
+        """
+        :param str output_format: output format
+        :param bool full_json: whether a manifest is rendered
+        :return: the timeout of the request, in seconds
+        :rtype: int
+        """
+        timeouts = settings.ZDS_APP["zmd"].get("timeouts", {})
+        if full_json:
+            return timeouts.get("manifest", 120)
+        return timeouts.get(output_format, 10)
+
+    def post(self, output_format, payload, timeout):
+        """Send a rendering request to the server.
+
+        :param str output_format: output format
+        :param dict payload: the JSON body of the request
+        :param int timeout: timeout of each attempt
+        :return: the response of the server
+        :rtype: requests.Response
+        """
+        endpoint = FORMAT_ENDPOINTS[output_format]
+        url = "{}{}".format(settings.ZDS_APP["zmd"]["server"], endpoint)
+        backoff = settings.ZDS_APP["zmd"].get("retry_backoff", 0.1)
+
+        attempt = 1
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.session.post(url, json=payload, timeout=timeout)
+            except (ConnectionError, Timeout):
+                if attempt >= MAX_ATTEMPTS:
+                    raise
+                logger.warning(f"Could not reach the markdown server on {endpoint} (attempt {attempt})")
+            else:
+                duration = time.monotonic() - start
+                record_call("zmd", duration)
+                with self._lock:
+                    self.latencies[endpoint].observe(duration)
+                if response.status_code < 500 or attempt >= MAX_ATTEMPTS:
+                    return response
+                logger.warning(f"The markdown server replied with status {response.status_code} (attempt {attempt})")
+
+            time.sleep(backoff * 2 ** (attempt - 1))
+            attempt += 1
+
+    def stats(self):
+        """
+        :return: the latency histogram of each endpoint
+        :rtype: dict
+        """
+        with self._lock:
+            return {endpoint: histogram.to_dict() for endpoint, histogram in self.latencies.items()}
+
+
+zmd_client = ZMarkdownClient()
+
+
 def _render_markdown_once(md_input, *, output_format="html", **kwargs):
     """
-    Returns None on error (error details are logged). No retry mechanism.
+    Returns None on error (error details are logged). Retries are handled by ``zmd_client``.
     """
 
     def log_args():
@@ -42,39 +264,48 @@ def _render_markdown_once(md_input, *, output_format="html", **kwargs):
     if settings.ZDS_APP["zmd"]["disable_pings"] is True:
         kwargs["disable_ping"] = True
 
-    endpoint = FORMAT_ENDPOINTS[output_format]
+    # latex may be really long to generate but it is also restrained by server configuration
+    timeout = zmd_client.get_timeout(output_format, full_json)
+    real_input = str(md_input)
+    if output_format.startswith("tex") or full_json:
+        # use manifest renderer
+        real_input = md_input
+
+    cache_key = None
+    raw_response = None
+    if output_format == "html":
+        cache_key = render_cache.make_key(real_input, output_format, dict(kwargs, full_json=full_json))
+        raw_response = render_cache.get(cache_key)
+
+    if raw_response is None:
+        try:
+            response = zmd_client.post(
+                output_format,
+                {
+                    "opts": kwargs,
+                    "md": real_input,
+                },
+                timeout,
+            )
+        except HTTPError:
+            logger.exception("An HTTP error happened, markdown rendering failed")
+            log_args()
+            return "", {}, []
 
-    try:
-        timeout = 10
-        real_input = str(md_input)
-        if output_format.startswith("tex") or full_json:
-            # latex may be really long to generate but it is also restrained by server configuration
-            timeout = 120
-            # use manifest renderer
-            real_input = md_input
-        response = post(
-            "{}{}".format(settings.ZDS_APP["zmd"]["server"], endpoint),
-            json={
-                "opts": kwargs,
-                "md": real_input,
-            },
-            timeout=timeout,
-        )
-    except HTTPError:
-        logger.exception("An HTTP error happened, markdown rendering failed")
-        log_args()
-        return "", {}, []
+        if response.status_code == 413:
+            return "", {}, [{"message": str(_("Texte trop volumineux."))}]
 
-    if response.status_code == 413:
-        return "", {}, [{"message": str(_("Texte trop volumineux."))}]
+        if response.status_code != 200:
+            logger.error(f"The markdown server replied with status {response.status_code} (expected 200)")
+            log_args()
+            return "", {}, []
 
-    if response.status_code != 200:
-        logger.error(f"The markdown server replied with status {response.status_code} (expected 200)")
-        log_args()
-        return "", {}, []
+        raw_response = response.text
+        if cache_key is not None:
+            render_cache.set(cache_key, raw_response)
 
     try:
-        content, metadata, messages = response.json()
+        content, metadata, messages = json.loads(raw_response)
         logger.debug("Result %s, %s, %s", content, metadata, messages)
         if messages:
             logger.error("Markdown errors %s", json.dumps(messages))
@@ -113,15 +344,9 @@ def render_markdown(md_input, *, on_error=None, disable_jsfiddle=True, **kwargs)
 
     # Oops, something went wrong
 
-    attempts = kwargs.get("attempts", 0)
     inline = kwargs.get("inline", False) is True
 
-    if attempts < MAX_ATTEMPTS:
-        if not kwargs:
-            kwargs = dict()
-        return render_markdown(md_input, **dict(kwargs, attempts=attempts + 1))
-
-    logger.error("Max attempt count reached, giving up")
+    logger.error("Markdown rendering failed, giving up")
     logger.error(f"md_input: {md_input!r}")
     logger.error(f"kwargs: {kwargs!r}")
 
@@ -132,6 +357,69 @@ def render_markdown(md_input, *, on_error=None, disable_jsfiddle=True, **kwargs)
         return mark_safe(f'<div class="error ico-after"><p>{json.dumps(messages)}</p></div>'), metadata, []
 
 
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor():
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=settings.ZDS_APP["zmd"].get("batch_workers", 4), thread_name_prefix="zmd"
+                )
+    return _batch_executor
+
+
+def map_concurrently(function, items):
+    """Call ``function`` on each item, concurrently, through the pool of ``ZDS_APP["zmd"]["batch_workers"]``
+    threads used to render markdown in batch.
+
+    Each call runs in a copy of the context of the caller, so that its calls are profiled (see
+    ``zds.utils.profiling``).
+
+    Returns an iterator over the results, in the order of ``items``.
+
+    """
+    tasks = [(contextvars.copy_context(), item) for item in items]
+    return _get_batch_executor().map(lambda task: task[0].run(function, task[1]), tasks)
+
+
+def render_markdown_many(md_inputs, **kwargs):
+    """Render several markdown strings at once.
+
+    Identical inputs are only rendered once, and the different ones are rendered concurrently, through a pool
+    of ``ZDS_APP["zmd"]["batch_workers"]`` threads. The keyword arguments are the ones of ``render_markdown()``
+    and apply to every input.
+
+    Returns a list of ``(rendered_content, metadata, messages)`` tuples, in the order of ``md_inputs``.
+
+    """
+    md_inputs = [str(md_input) for md_input in md_inputs]
+    unique_inputs = list(OrderedDict.fromkeys(md_inputs))
+
+    if len(unique_inputs) <= 1:
+        renderings = [render_markdown(md_input, **kwargs) for md_input in unique_inputs]
+    else:
+        renderings = map_concurrently(lambda md_input: render_markdown(md_input, **kwargs), unique_inputs)
+
+    rendered = dict(zip(unique_inputs, renderings))
+    return [rendered[md_input] for md_input in md_inputs]
+
+
+def prefetch_markdown(md_inputs, **kwargs):
+    """Render several markdown strings at once (see ``render_markdown_many()``) so that they are in
+    ``render_cache`` when the templates render them one by one. Empty strings are skipped.
+
+    The keyword arguments must be the ones that the template filter will use, otherwise the cache will miss
+    (e.g. ``inline=True`` for ``emarkdown_inline``).
+    """
+    md_inputs = [md_input for md_input in md_inputs if md_input]
+    if md_inputs:
+        render_markdown_many(md_inputs, **kwargs)
+
+
 def render_markdown_stats(md_input, **kwargs):
     """
     Returns contents statistics (words and chars)
@@ -2,10 +2,10 @@ from collections import defaultdict, OrderedDict
 from django import template
 from django.conf import settings
 
-from zds.forum.models import Forum
+from zds.forum.models import Forum, get_readable_forum_pks
 from zds.tutorialv2.models.database import PublishedContent
 from zds.utils.models import CategorySubCategory, Tag
-from django.db.models import Count, Q
+from django.db.models import Count
 
 register = template.Library()
 
@@ -13,12 +13,7 @@ register = template.Library()
 @register.filter("topbar_forum_categories")
 def topbar_forum_categories(user):
     max_tags = settings.ZDS_APP["forum"]["top_tag_max"]
-    forums = (
-        Forum.objects.filter(Q(groups__isnull=True) | Q(groups__isnull=False, groups__in=user.groups.all()))
-        .select_related("category")
-        .distinct()
-        .all()
-    )
+    forums = Forum.objects.filter(pk__in=get_readable_forum_pks(user)).select_related("category").all()
 
     cats = defaultdict(list)
     for forum in forums:
@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+
+from zds.utils.profiling import profile_block
+
+
+class QueryBudgetMixin:
+    """Mixin of ``TestCase`` to check that a view stays within a budget of SQL queries, e.g.:
+
+    .. sourcecode:: python
+
+        with self.assertQueryBudget(20, max_duplicates=2):
+            self.client.get(reverse("forum:topic-list"))
+
+    Unlike ``assertNumQueries()``, the test keeps passing while the view does not run more queries than its budget,
+    and a failure lists the queries which are repeated (a N+1 pattern, most of the time).
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_duplicates=None):
+        with profile_block() as profile:
+            yield profile
+
+        message = "\n".join(f"    {count} × {sql}" for sql, count in profile.duplicated_fingerprints(number=5))
+        self.assertLessEqual(
+            profile.queries, max_queries, f"{profile.queries} queries, over the budget. Repeated queries:\n{message}"
+        )
+        if max_duplicates is not None:
+            self.assertLessEqual(
+                profile.duplicates,
+                max_duplicates,
+                f"{profile.duplicates} repeated queries, over the budget:\n{message}",
+            )
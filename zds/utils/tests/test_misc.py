@@ -5,7 +5,7 @@ from zds.member.tests.factories import ProfileFactory, StaffProfileFactory, User
 from zds.tutorialv2.tests.factories import PublishedContentFactory
 from zds.utils.misc import contains_utf8mb4, check_essential_accounts
 from zds.utils.models import Alert
-from zds.utils.context_processor import get_header_notifications
+from zds.utils.header_notifications import get_header_notifications
 
 
 class Misc(TestCase):
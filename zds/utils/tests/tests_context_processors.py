@@ -1,11 +1,17 @@
 from datetime import datetime, timedelta
 
-from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
 from zds.forum.tests.factories import ForumCategoryFactory, ForumFactory, PostFactory, TopicFactory
-from zds.member.tests.factories import ProfileFactory, StaffProfileFactory
+from zds.member.tests.factories import ProfileFactory, StaffProfileFactory, UserFactory
+from zds.mp.utils import send_mp
+from zds.notification.models import Notification, TopicAnswerSubscription
 from zds.utils.context_processor import header_notifications as notifications_processor
+from zds.utils.header_notifications import _header_counters_key, get_header_notifications
 from zds.utils.models import Alert
 
 
@@ -40,13 +46,34 @@ class AlertsTest(TestCase):
     def test_staff(self):
         alerts = AlertsTest.__alerts(self.staff.user)
         self.assertEqual(20, alerts["total"])
+        self.assertNotIn("list", alerts)
+
+        alerts = get_header_notifications(self.staff.user)["alerts"]
+        self.assertEqual(20, alerts["total"])
         self.assertEqual(10, len(alerts["list"]))
         self.assertEqual(self.alerts[-1].text, alerts["list"][0]["text"])
 
         self.alerts[5].delete()
         alerts = AlertsTest.__alerts(self.staff.user)
         self.assertEqual(19, alerts["total"])
-        self.assertEqual(10, len(alerts["list"]))
+
+        self.alerts[6].solve(self.staff.user)
+        alerts = AlertsTest.__alerts(self.staff.user)
+        self.assertEqual(18, alerts["total"])
+
+    def test_dropdown(self):
+        self.client.force_login(self.dummy_author.user)
+        response = self.client.get(reverse("notification:header-dropdown", args=["alerts"]))
+        self.assertEqual(403, response.status_code)
+
+        self.client.force_login(self.staff.user)
+        response = self.client.get(reverse("notification:header-dropdown", args=["alerts"]))
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, self.alerts[-1].text)
+        self.assertNotContains(response, self.alerts[0].text)
+
+        response = self.client.get(reverse("notification:header-dropdown", args=["unknown"]))
+        self.assertEqual(404, response.status_code)
 
     @staticmethod
     def __alerts(user):
@@ -60,3 +87,78 @@ class AlertsTest(TestCase):
         r = Request()
         r.user = user
         return notifications_processor(r)
+
+
+class HeaderCountersTest(TestCase):
+    def setUp(self):
+        self.author = ProfileFactory().user
+        self.user = ProfileFactory().user
+
+        self.category = ForumCategoryFactory(position=1)
+        self.forum = ForumFactory(category=self.category, position_in_category=1)
+        self.topic = TopicFactory(forum=self.forum, author=self.author)
+        PostFactory(topic=self.topic, author=self.author, position=1)
+
+    def test_counters(self):
+        subscription = TopicAnswerSubscription.objects.get_or_create_active(self.user, self.topic)
+        self.assertEqual(0, self.__counters()["header_general_notifications"]["total"])
+
+        PostFactory(topic=self.topic, author=self.author, position=2)
+        send_mp(self.author, [self.user], "Title", "Subtitle", "Message")
+        counters = self.__counters()
+        self.assertEqual(1, counters["header_general_notifications"]["total"])
+        self.assertEqual(1, counters["header_private_topic_notifications"]["total"])
+        self.assertFalse(counters["header_alerts"])
+
+        # the counters are cached...
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(2):  # the permissions of the user, which the header needs anyway
+            self.__counters(user)
+
+        # ... and updated when the notifications are read
+        subscription.refresh_from_db()
+        subscription.mark_notification_read()
+        counters = self.__counters()
+        self.assertEqual(0, counters["header_general_notifications"]["total"])
+        self.assertEqual(1, counters["header_private_topic_notifications"]["total"])
+
+    def test_counters_invalidation(self):
+        TopicAnswerSubscription.objects.get_or_create_active(self.user, self.topic)
+        PostFactory(topic=self.topic, author=self.author, position=2)
+        self.assertEqual(1, self.__counters()["header_general_notifications"]["total"])
+
+        # the user of the notification is not loaded to update the counters
+        notification = Notification.objects.select_related("subscription").get(subscription__user=self.user)
+        notification.is_read = True
+        with self.assertNumQueries(1):
+            notification.save(update_fields=["is_read"])
+        self.assertEqual(0, self.__counters()["header_general_notifications"]["total"])
+
+        # the counters of a deleted user are forgotten
+        UserFactory(username=settings.ZDS_APP["member"]["anonymous_account"])
+        UserFactory(username=settings.ZDS_APP["member"]["external_account"])
+        user_pk = self.user.pk
+        self.user.delete()
+        self.assertIsNone(cache.get(_header_counters_key(user_pk)))
+
+    def test_dropdown(self):
+        TopicAnswerSubscription.objects.get_or_create_active(self.user, self.topic)
+        PostFactory(topic=self.topic, author=self.author, position=2)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("notification:header-dropdown", args=["general_notifications"]))
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, self.topic.title)
+
+        response = self.client.get(reverse("notification:header-dropdown", args=["private_topic_notifications"]))
+        self.assertEqual(200, response.status_code)
+        self.assertNotContains(response, self.topic.title)
+
+    def __counters(self, user=None):
+        class Request:
+            pass
+
+        r = Request()
+        # a fresh instance, so that its permissions are not cached
+        r.user = user or User.objects.get(pk=self.user.pk)
+        return notifications_processor(r)
@@ -1,10 +1,19 @@
+import json
 from collections import namedtuple
 from textwrap import dedent
+from unittest.mock import MagicMock, patch
 
 from django.test import TestCase
 from django.template import Context, Template
 
-from zds.utils.templatetags.emarkdown import shift_heading
+from zds.utils.templatetags.emarkdown import (
+    shift_heading,
+    render_markdown,
+    render_markdown_many,
+    prefetch_markdown,
+    render_cache,
+    zmd_client,
+)
 
 
 class EMarkdownTest(TestCase):
@@ -108,3 +117,102 @@ class EMarkdownTest(TestCase):
         """
         )
         self.assertEqual(shift_heading(sharp_in_code_with_antiquotes, 1), result_sharp_in_code_with_antiquotes)
+
+
+class RenderCacheTest(TestCase):
+    def setUp(self):
+        render_cache.clear()
+
+        self.response = MagicMock(status_code=200, text=json.dumps(["<p>test</p>", {"ping": []}, []]))
+
+    def tearDown(self):
+        render_cache.clear()
+
+    def test_same_text_is_rendered_once(self):
+        with patch("zds.utils.templatetags.emarkdown.Session.post", return_value=self.response) as mocked_post:
+            first = render_markdown("test")
+            second = render_markdown("test")
+            self.assertEqual(mocked_post.call_count, 1)
+
+            # different options mean a different rendering
+            render_markdown("test", inline=True)
+            self.assertEqual(mocked_post.call_count, 2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(render_cache.stats(), {"hits": 1, "misses": 2, "local_entries": 2})
+
+    def test_errors_are_not_cached(self):
+        error_response = MagicMock(status_code=400)
+        with patch("zds.utils.templatetags.emarkdown.Session.post", return_value=error_response) as mocked_post:
+            render_markdown("test")
+            render_markdown("test")
+            self.assertEqual(mocked_post.call_count, 2)
+
+        self.assertEqual(render_cache.stats()["local_entries"], 0)
+
+    def test_lru_eviction(self):
+        with patch.dict(render_cache.get_config(), local_size=2):
+            with patch("zds.utils.templatetags.emarkdown.Session.post", return_value=self.response) as mocked_post:
+                render_markdown("first")
+                render_markdown("second")
+                render_markdown("first")
+                render_markdown("third")  # evicts "second", the least recently used
+                render_markdown("second")
+                self.assertEqual(mocked_post.call_count, 4)
+
+        self.assertEqual(render_cache.stats()["local_entries"], 2)
+
+
+class ZMarkdownClientTest(TestCase):
+    def setUp(self):
+        render_cache.clear()
+
+    def tearDown(self):
+        render_cache.clear()
+
+    def test_retry_with_backoff(self):
+        error_response = MagicMock(status_code=502)
+        response = MagicMock(status_code=200, text=json.dumps(["<p>test</p>", {}, []]))
+        count_before = zmd_client.stats()["/html"]["count"]
+
+        with patch(
+            "zds.utils.templatetags.emarkdown.Session.post", side_effect=[error_response, response]
+        ) as mocked_post, patch("zds.utils.templatetags.emarkdown.time.sleep") as mocked_sleep:
+            content, _, _ = render_markdown("test")
+
+        self.assertEqual(content, "<p>test</p>")
+        self.assertEqual(mocked_post.call_count, 2)
+        mocked_sleep.assert_called_once()
+        self.assertEqual(zmd_client.stats()["/html"]["count"], count_before + 2)
+
+    def test_session_is_reused(self):
+        self.assertIs(zmd_client.session, zmd_client.session)
+
+
+class RenderMarkdownManyTest(TestCase):
+    def setUp(self):
+        render_cache.clear()
+
+    def tearDown(self):
+        render_cache.clear()
+
+    def test_render_markdown_many(self):
+        def fake_render(md_input, **kwargs):
+            return f"<p>{md_input}</p>", {}, []
+
+        with patch("zds.utils.templatetags.emarkdown.render_markdown", side_effect=fake_render) as mocked_render:
+            results = render_markdown_many(["a", "b", "a", "c"], inline=True)
+
+        self.assertEqual([content for content, _, _ in results], ["<p>a</p>", "<p>b</p>", "<p>a</p>", "<p>c</p>"])
+        self.assertEqual(mocked_render.call_count, 3)  # "a" is rendered once
+        for call in mocked_render.call_args_list:
+            self.assertEqual(call.kwargs, {"inline": True})
+
+    def test_prefetch_markdown_fills_the_cache(self):
+        response = MagicMock(status_code=200, text=json.dumps(["<p>test</p>", {}, []]))
+        with patch("zds.utils.templatetags.emarkdown.Session.post", return_value=response) as mocked_post:
+            prefetch_markdown(["first", "", "second"], inline=True)
+            self.assertEqual(mocked_post.call_count, 2)
+
+            Template("{% load emarkdown %}{{ content|emarkdown_inline }}").render(Context({"content": "first"}))
+            self.assertEqual(mocked_post.call_count, 2)
@@ -1,7 +1,12 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.db import IntegrityError, transaction
 from django.contrib.auth.models import Group
 
+from zds.forum.tests.factories import PostFactory, create_category_and_forum, create_topic_in_forum
 from zds.member.models import Profile
 from zds.member.tests.factories import ProfileFactory
 from zds.utils.forms import TagValidator
@@ -100,3 +105,36 @@ class TagsTests(TestCase):
         # The user shoudn't have the hat through their profile anymore
         profile = Profile.objects.get(pk=profile.pk)  # reload
         self.assertNotIn(hat, profile.hats.all())
+
+
+class CommentPingsTests(TestCase):
+    def setUp(self):
+        self.author = ProfileFactory().user
+        _, forum = create_category_and_forum()
+        self.topic = create_topic_in_forum(forum, ProfileFactory())
+
+    def test_edit_renders_only_the_new_text(self):
+        post = PostFactory(topic=self.topic, author=self.author, position=2)
+
+        rendering = ("<p>test</p>", {"ping": ["someone"]}, [])
+        with patch("zds.utils.models.render_markdown", return_value=rendering) as mocked_render:
+            post.update_content("First version")
+            self.assertEqual(mocked_render.call_count, 2)  # pings of the factory text are unknown
+            self.assertEqual(post.pings, ["someone"])
+
+            post.update_content("Second version")
+            self.assertEqual(mocked_render.call_count, 3)
+            self.assertEqual(post.old_metadata, {"ping": ["someone"]})
+
+    def test_backfill_comment_pings(self):
+        post = PostFactory(topic=self.topic, author=self.author, position=2)
+        self.assertIsNone(post.pings)
+
+        with patch(
+            "zds.utils.management.commands.backfill_comment_pings.render_markdown",
+            return_value=("<p>test</p>", {"ping": ["someone"]}, []),
+        ):
+            call_command("backfill_comment_pings", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.pings, ["someone"])
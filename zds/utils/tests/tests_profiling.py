@@ -0,0 +1,94 @@
+from copy import deepcopy
+from io import StringIO
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from zds.forum.tests.factories import create_category_and_forum, create_topic_in_forum
+from zds.member.tests.factories import ProfileFactory
+from zds.utils.profiling import (
+    clear_profiling_report,
+    fingerprint,
+    get_profiling_report,
+    profile_block,
+    record_call,
+)
+from zds.utils.templatetags.emarkdown import render_markdown_many
+from zds.utils.tests import QueryBudgetMixin
+
+overridden_zds_app = deepcopy(settings.ZDS_APP)
+overridden_zds_app["profiling"]["enabled"] = True
+
+
+@override_settings(ZDS_APP=overridden_zds_app)
+class ProfilingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        clear_profiling_report()
+        self.profile = ProfileFactory()
+        _, self.forum = create_category_and_forum()
+        for _ in range(3):
+            create_topic_in_forum(self.forum, self.profile)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT "a" FROM "b" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT "a" FROM "b"\n WHERE "id" IN (%s, %s) LIMIT 1'),
+        )
+        self.assertNotEqual(fingerprint('SELECT "a" FROM "b"'), fingerprint('SELECT "a" FROM "c"'))
+
+    def test_profile_block(self):
+        ProfileFactory()
+        ProfileFactory()
+        with profile_block() as profile:
+            for user in User.objects.all():
+                user.profile.pk
+            record_call("zmd", 0.1)
+
+        self.assertEqual(profile.queries, 1 + User.objects.count())
+        self.assertEqual(profile.duplicates, User.objects.count() - 1)
+        self.assertEqual(profile.duplicated_fingerprints()[0][1], User.objects.count())
+        self.assertEqual(profile.calls["zmd"], 1)
+
+        # calls outside of a profiled block are ignored
+        record_call("zmd", 0.1)
+        self.assertEqual(profile.calls["zmd"], 1)
+
+    def test_profile_batch_render(self):
+        # different texts, not to be rendered from the cache
+        texts = [f"Texte {uuid4().hex}" for _ in range(3)]
+        with profile_block() as profile:
+            render_markdown_many(texts)
+
+        # the texts are rendered by other threads
+        self.assertEqual(profile.calls["zmd"], 3)
+
+    def test_middleware_and_report(self):
+        self.client.get(self.forum.get_absolute_url())
+        self.client.get(self.forum.get_absolute_url())
+        self.client.get(reverse("homepage"))
+
+        report = {view["view_name"]: view for view in get_profiling_report()}
+        self.assertEqual(report["forum:topics-list"]["requests"], 2)
+        self.assertGreater(report["forum:topics-list"]["queries"], 0)
+        self.assertEqual(report["homepage"]["requests"], 1)
+
+        out = StringIO()
+        call_command("profiling_report", "--sort", "db_time", stdout=out)
+        self.assertIn("forum:topics-list", out.getvalue())
+
+        call_command("profiling_report", "--clear", stdout=StringIO())
+        self.assertEqual(get_profiling_report(), [])
+
+    def test_query_budget(self):
+        url = self.forum.get_absolute_url()
+        with self.assertQueryBudget(100):
+            self.client.get(url)
+
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(1):
+                self.client.get(url)